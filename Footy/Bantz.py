@@ -0,0 +1,137 @@
+from __future__ import annotations
+import random
+import threading
+from types import ModuleType
+from typing import Any, Iterable, Optional
+
+from Footy import SupportedBantzStrings
+from Footy import UnsupportedBantzStrings
+from Footy.Match import Match
+from Footy.MatchStates import (
+    MatchState,
+    drawing,
+    teamLeadByOne,
+    teamExtendingLead,
+    teamLosingLead,
+    teamDeficitOfOne,
+    teamExtendingDeficit,
+    teamLosingDeficit,
+)
+from Footy.TeamData import allTeams, myTeamMapping
+
+# The events there are phrases for, named as the lists in the bantz strings modules
+EVENTS = (
+    'teamMatchStarted',
+    'drawing',
+    'teamLeadByOne',
+    'teamExtendingLead',
+    'teamLosingLead',
+    'teamDeficitOfOne',
+    'teamExtendingDeficit',
+    'teamLosingDeficit',
+    'teamWon',
+    'teamLost',
+    'teamDrew',
+)
+
+# The event for a goal which puts the match in each state
+_goalEvents: dict[MatchState, str] = {
+    drawing: 'drawing',
+    teamLeadByOne: 'teamLeadByOne',
+    teamExtendingLead: 'teamExtendingLead',
+    teamLosingLead: 'teamLosingLead',
+    teamDeficitOfOne: 'teamDeficitOfOne',
+    teamExtendingDeficit: 'teamExtendingDeficit',
+    teamLosingDeficit: 'teamLosingDeficit',
+}
+
+def EventFor(match: Match, teamName: Optional[str] = None) -> Optional[str]:
+    # Work out which event the latest changes to the match are from the side of the team, by default the match's own team
+    if teamName is None:
+        teamName = match.teamName
+
+    changes = match.matchChanges
+    if changes.fullTime:
+        teamScore, oppositionScore = match.ScoresFor(teamName)
+        if teamScore > oppositionScore:
+            return 'teamWon'
+        if teamScore < oppositionScore:
+            return 'teamLost'
+        return 'teamDrew'
+    elif changes.firstHalfStarted:
+        return 'teamMatchStarted'
+    elif changes.goalScored:
+        return _goalEvents.get(match.StateFor(teamName))
+
+    return None
+
+def RenderPhrases(teamDetails: dict[str, Any], strings: ModuleType) -> dict[str, tuple[str, ...]]:
+    # Fill in the team's details in every phrase for every event
+    return {event: tuple(phrase.format(**teamDetails) for phrase in getattr(strings, event)) for event in EVENTS}
+
+class ShuffleBag:
+    __slots__ = ('size', '_remaining', '_last')
+
+    def __init__(self, size: int) -> None:
+        # The number of phrases in the pool, the indices not yet drawn this time round, and the last one drawn
+        self.size = size
+        self._remaining: list[int] = []
+        self._last = -1
+
+    def Draw(self, generator: random.Random) -> int:
+        # Refill the bag in a new order once every phrase has been used
+        if not self._remaining:
+            self._remaining = list(range(self.size))
+            generator.shuffle(self._remaining)
+
+            # Don't repeat the last phrase straight away when starting again
+            if self.size > 1 and self._remaining[-1] == self._last:
+                self._remaining[0], self._remaining[-1] = self._remaining[-1], self._remaining[0]
+
+        self._last = self._remaining.pop()
+        return self._last
+
+class Bantz:
+    def __init__(self, teams: dict[str, dict[str, Any]] = allTeams, supportedTeams: Iterable[str] = myTeamMapping, seed: Optional[int] = None) -> None:
+        # Supported teams get the nice phrases, everyone else gets abuse
+        self._supportedTeams = frozenset(supportedTeams)
+
+        # Render every phrase for every team and event once, so sending a message is only a lookup
+        self._phrases: dict[tuple[str, str], tuple[str, ...]] = {}
+        for teamName, teamDetails in teams.items():
+            self._AddTeam(teamName, teamDetails)
+
+        # A shuffle bag for each chat, team and event, created when first used
+        self._bags: dict[tuple[int, str, str], ShuffleBag] = {}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _AddTeam(self, teamName: str, teamDetails: dict[str, Any]) -> None:
+        strings = SupportedBantzStrings if teamName in self._supportedTeams else UnsupportedBantzStrings
+        for event, phrases in RenderPhrases(teamDetails, strings).items():
+            self._phrases[(teamName, event)] = phrases
+
+    def Phrases(self, teamName: str, event: str) -> tuple[str, ...]:
+        # Get the rendered phrases, a team followed with its whole competition may not be in the team data
+        if (phrases := self._phrases.get((teamName, event))) is None:
+            with self._lock:
+                self._AddTeam(teamName, {'team': teamName, 'name': ''})
+            phrases = self._phrases[(teamName, event)]
+
+        return phrases
+
+    def Messages(self, teamName: str, event: str, chatIds: Iterable[int]) -> dict[str, list[int]]:
+        # Pick a phrase for each chat from its own shuffle bag, so a chat doesn't see a phrase again until it's seen them all,
+        # grouping the chats by phrase so each different message is only broadcast once
+        phrases = self.Phrases(teamName, event)
+        messages: dict[str, list[int]] = {}
+        if not phrases:
+            return messages
+
+        with self._lock:
+            for chatId in chatIds:
+                if (bag := self._bags.get((chatId, teamName, event))) is None:
+                    bag = self._bags[(chatId, teamName, event)] = ShuffleBag(len(phrases))
+                messages.setdefault(phrases[bag.Draw(self._random)], []).append(chatId)
+
+        return messages
@@ -0,0 +1,85 @@
+import json
+import os
+from pathlib import Path
+import time
+from typing import Iterable
+
+import Footy.Log as Log
+from Footy.Match import Match
+
+# Log through the checkpoint subsystem's logger
+log = Log.GetLogger('checkpoint')
+
+# File the live matches are saved to, this is excluded from git
+CHECKPOINT_FILE = Path('checkpoint.json')
+
+# A checkpoint older than this is from a previous match day, so restoring it would only resend stale results
+MAX_CHECKPOINT_AGE = 3 * 60 * 60
+
+class MatchCheckpoint:
+    def __init__(self, path: Path = CHECKPOINT_FILE, maxAge: float = MAX_CHECKPOINT_AGE) -> None:
+        # Where the checkpoint is kept and how old it can be when restored
+        self.path = path
+        self.maxAge = maxAge
+
+        # The matches last written, so the file is only rewritten when something has changed
+        self._lastMatches: list[dict] = []
+
+    def Save(self, matches: Iterable[Match]) -> None:
+        # Get the data to save and skip the write if nothing has changed since the last one
+        checkpointMatches = [match.ToCheckpoint() for match in matches]
+        if checkpointMatches == self._lastMatches:
+            return
+
+        tempPath = self.path.with_name(f'{self.path.name}.tmp')
+
+        try:
+            # Write to a temporary file and make sure it's on disk
+            with open(tempPath, 'w', encoding='utf-8') as checkpointFile:
+                json.dump({'savedAt': time.time(), 'matches': checkpointMatches}, checkpointFile)
+                checkpointFile.flush()
+                os.fsync(checkpointFile.fileno())
+
+            # Replace the checkpoint in one step so a crash leaves either the old or the new one
+            os.replace(tempPath, self.path)
+            self._lastMatches = checkpointMatches
+        except OSError as error:
+            log.warning('Could not save checkpoint: %s', error)
+
+    def Load(self) -> list[Match]:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as checkpointFile:
+                checkpoint = json.load(checkpointFile)
+        except FileNotFoundError:
+            # No checkpoint, so nothing to restore
+            return []
+        except (OSError, ValueError) as error:
+            log.warning('Could not load checkpoint: %s', error)
+            return []
+
+        # Get when it was saved and the matches, a file of the wrong shape is as bad as a corrupt one
+        try:
+            age = time.time() - float(checkpoint['savedAt'])
+            checkpointMatches = list(checkpoint['matches'])
+        except (KeyError, TypeError, ValueError) as error:
+            log.warning('Could not load checkpoint: %s', error)
+            return []
+
+        # Ignore a checkpoint from a previous match day
+        if age > self.maxAge:
+            log.info('Ignoring checkpoint saved %.0f minutes ago', age / 60)
+            return []
+
+        # Recreate the matches, skipping any which can't be restored
+        matches: list[Match] = []
+        for checkpointMatch in checkpointMatches:
+            try:
+                matches.append(Match.FromCheckpoint(checkpointMatch))
+            except (KeyError, TypeError, ValueError) as error:
+                log.warning('Could not restore match from checkpoint: %s', error)
+
+        # Remember what was restored so an unchanged poll doesn't rewrite it
+        self._lastMatches = [match.ToCheckpoint() for match in matches]
+
+        log.info('Restored %d matches from checkpoint saved %.0fs ago', len(matches), age)
+        return matches
@@ -0,0 +1,30 @@
+from typing import Optional
+
+premierLeague = 2021
+championsLeague = 2001
+
+# The competitions followed by default
+defaultCompetitions = [premierLeague, championsLeague]
+
+# The name of each competition and the other names it can be followed by, in lower case
+competitionNames = {
+    premierLeague: 'Premier League',
+    championsLeague: 'Champions League',
+}
+
+competitionAliases = {
+    'premier league': premierLeague,
+    'the premier league': premierLeague,
+    'prem': premierLeague,
+    'pl': premierLeague,
+    'epl': premierLeague,
+    'champions league': championsLeague,
+    'the champions league': championsLeague,
+    'uefa champions league': championsLeague,
+    'ucl': championsLeague,
+    'cl': championsLeague,
+}
+
+def FindCompetition(text: str) -> Optional[int]:
+    # Get the competition ID for a name, ignoring case and extra spaces
+    return competitionAliases.get(' '.join(text.lower().split()))
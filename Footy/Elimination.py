@@ -0,0 +1,177 @@
+from collections import deque
+from typing import Optional
+
+# A remaining fixture as the home and away team names
+Fixture = tuple[str, str]
+
+# Most outcomes the exact search tries across all the teams, after which the flow bound is used alone for the teams left,
+# a count rather than a time limit so the answer for a table is the same however busy the machine is,
+# this is a few tenths of a second of searching at most
+MAX_SEARCH_NODES = 300000
+
+class _FlowNetwork:
+    def __init__(self, nodeCount: int) -> None:
+        # Adjacency list of edge indices for each node, with the edges stored as parallel lists
+        self.adjacency: list[list[int]] = [[] for _ in range(nodeCount)]
+        self.edgeTo: list[int] = []
+        self.edgeCapacity: list[int] = []
+
+    def AddEdge(self, fromNode: int, toNode: int, capacity: int) -> None:
+        # Add the edge and its residual, the residual is always the edge index xor 1
+        self.adjacency[fromNode].append(len(self.edgeTo))
+        self.edgeTo.append(toNode)
+        self.edgeCapacity.append(capacity)
+
+        self.adjacency[toNode].append(len(self.edgeTo))
+        self.edgeTo.append(fromNode)
+        self.edgeCapacity.append(0)
+
+    def MaxFlow(self, source: int, sink: int) -> int:
+        # Dinic's algorithm, repeatedly build a level graph and push blocking flows along it
+        flow = 0
+
+        while True:
+            # Breadth first search from the source to assign the levels
+            level = [-1] * len(self.adjacency)
+            level[source] = 0
+            queue = deque([source])
+            while queue:
+                node = queue.popleft()
+                for edge in self.adjacency[node]:
+                    if self.edgeCapacity[edge] > 0 and level[self.edgeTo[edge]] < 0:
+                        level[self.edgeTo[edge]] = level[node] + 1
+                        queue.append(self.edgeTo[edge])
+
+            # If the sink can't be reached the flow is at its maximum
+            if level[sink] < 0:
+                return flow
+
+            # Push flow along the level graph until it is blocked
+            nextEdge = [0] * len(self.adjacency)
+            while (pushed := self._Push(source, sink, 1 << 30, level, nextEdge)) > 0:
+                flow += pushed
+
+    def _Push(self, node: int, sink: int, limit: int, level: list[int], nextEdge: list[int]) -> int:
+        if node == sink:
+            return limit
+
+        # Try each edge out of the node that goes one level further, remembering where we got to
+        while nextEdge[node] < len(self.adjacency[node]):
+            edge = self.adjacency[node][nextEdge[node]]
+            toNode = self.edgeTo[edge]
+
+            if self.edgeCapacity[edge] > 0 and level[toNode] == level[node] + 1:
+                if (pushed := self._Push(toNode, sink, min(limit, self.edgeCapacity[edge]), level, nextEdge)) > 0:
+                    self.edgeCapacity[edge] -= pushed
+                    self.edgeCapacity[edge ^ 1] += pushed
+                    return pushed
+
+            nextEdge[node] += 1
+
+        return 0
+
+def _FlowBoundEliminated(slack: dict[str, int], games: list[Fixture], pointsForDraw: int) -> bool:
+    # Every game hands out at least two draws worth of points, so if those points can't be shared out
+    # without a team going over its slack then no real set of results can do it either
+    teams = list(slack)
+    teamNode = {team: 1 + len(games) + index for index, team in enumerate(teams)}
+    source = 0
+    sink = 1 + len(games) + len(teams)
+
+    network = _FlowNetwork(sink + 1)
+
+    # Each game sends its points to either of the two teams playing
+    for index, (homeTeam, awayTeam) in enumerate(games):
+        network.AddEdge(source, 1 + index, 2 * pointsForDraw)
+        network.AddEdge(1 + index, teamNode[homeTeam], 2 * pointsForDraw)
+        network.AddEdge(1 + index, teamNode[awayTeam], 2 * pointsForDraw)
+
+    # Each team can take at most its slack
+    for team in teams:
+        network.AddEdge(teamNode[team], sink, slack[team])
+
+    return network.MaxFlow(source, sink) < 2 * pointsForDraw * len(games)
+
+def _SearchForResults(slack: dict[str, int], games: list[Fixture], pointsForWin: int, pointsForDraw: int, maxNodes: int) -> tuple[Optional[bool], int]:
+    # Depth first search for a set of results which keeps every team within its slack, returns True if there is one,
+    # False if there isn't and None if the search gave up after trying the most outcomes allowed, along with the number tried
+    nodes = 0
+
+    # Play the games of the teams with the least slack first, so dead ends are found early
+    games = sorted(games, key=lambda game: min(slack[game[0]], slack[game[1]]))
+
+    def Search(index: int, pointsLeft: int) -> Optional[bool]:
+        nonlocal nodes
+
+        if index == len(games):
+            return True
+
+        # Give up once the search has tried too many outcomes, after that every call gives up
+        if nodes >= maxNodes:
+            return None
+        nodes += 1
+
+        # There's no way through if the slack left can't absorb a draw in every game left
+        if pointsLeft < 2 * pointsForDraw * (len(games) - index):
+            return False
+
+        homeTeam, awayTeam = games[index]
+
+        # Try a draw first as it spreads the points, then a win for whichever team has more slack
+        outcomes = [(pointsForDraw, pointsForDraw), (pointsForWin, 0), (0, pointsForWin)]
+        if slack[awayTeam] > slack[homeTeam]:
+            outcomes[1], outcomes[2] = outcomes[2], outcomes[1]
+
+        result: Optional[bool] = False
+        for homePoints, awayPoints in outcomes:
+            if homePoints <= slack[homeTeam] and awayPoints <= slack[awayTeam]:
+                slack[homeTeam] -= homePoints
+                slack[awayTeam] -= awayPoints
+                found = Search(index + 1, pointsLeft - homePoints - awayPoints)
+                slack[homeTeam] += homePoints
+                slack[awayTeam] += awayPoints
+
+                if found:
+                    return True
+                if found is None:
+                    result = None
+
+        return result
+
+    result = Search(0, sum(slack.values()))
+    return result, nodes
+
+def CanTeamsWinTheLeague(points: dict[str, int], fixtures: list[Fixture], pointsForWin: int = 3, pointsForDraw: int = 1, maxSearchNodes: Optional[int] = None) -> dict[str, bool]:
+    # Work out for every team whether there is any set of results that lets it finish top, level on points counts as top
+    canWin: dict[str, bool] = {}
+
+    # The searches for all the teams share one budget of outcomes to try
+    nodesLeft = maxSearchNodes if maxSearchNodes is not None else MAX_SEARCH_NODES
+
+    for team in points:
+        # Best case the team wins all of its remaining games
+        teamMaxPoints = points[team] + pointsForWin * sum(team in fixture for fixture in fixtures)
+
+        # The number of points each other team can still get without going above the team
+        slack = {otherTeam: teamMaxPoints - otherPoints for otherTeam, otherPoints in points.items() if otherTeam != team}
+
+        # If any team is already out of reach the team can't win
+        if any(otherSlack < 0 for otherSlack in slack.values()):
+            canWin[team] = False
+            continue
+
+        # The games the team isn't involved in still have to be played by the other teams
+        otherGames = [fixture for fixture in fixtures if team not in fixture]
+
+        # Rule the team out if even sharing the fewest possible points can't keep everyone else below it
+        if _FlowBoundEliminated(slack, otherGames, pointsForDraw):
+            canWin[team] = False
+            continue
+
+        # Otherwise look for a real set of results, if the budget runs out before the search finishes the team
+        # is assumed to still be able to win, as the flow bound couldn't rule it out
+        found, nodes = _SearchForResults(slack, otherGames, pointsForWin, pointsForDraw, nodesLeft)
+        nodesLeft -= nodes
+        canWin[team] = found is not False
+
+    return canWin
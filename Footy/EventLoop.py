@@ -0,0 +1,45 @@
+import asyncio
+import concurrent.futures
+import threading
+from typing import Awaitable, Optional, TypeVar
+
+T = TypeVar('T')
+
+# Seconds between checks that the shared event loop is still running while waiting for a result
+LOOP_CHECK_INTERVAL = 1.0
+
+# The shared event loop the blocking API runs its downloads on, its thread and a lock to make sure only one is ever started
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loopThread: Optional[threading.Thread] = None
+_loopLock = threading.Lock()
+
+def GetEventLoop() -> asyncio.AbstractEventLoop:
+    global _loop, _loopThread
+
+    # Start the shared event loop on its own thread on first use, or again if its thread has died
+    with _loopLock:
+        if _loop is None or _loopThread is None or not _loopThread.is_alive():
+            _loop = asyncio.new_event_loop()
+            _loopThread = threading.Thread(target=_loop.run_forever, name='FootyEventLoop', daemon=True)
+            _loopThread.start()
+
+    return _loop
+
+def RunSync(coroutine: Awaitable[T]) -> T:
+    # Run a coroutine on the shared event loop and wait for its result, so any number of threads share one loop
+    loop = GetEventLoop()
+
+    # Waiting from the loop's own thread would never finish, coroutines on the loop should await instead
+    if threading.current_thread() is _loopThread:
+        raise RuntimeError('RunSync called from the shared event loop, await the coroutine instead')
+
+    future = asyncio.run_coroutine_threadsafe(coroutine, loop)
+    loopThread = _loopThread
+
+    # Wait for the result, giving up if the loop's thread dies as the coroutine would then never finish
+    while not concurrent.futures.wait([future], LOOP_CHECK_INTERVAL).done:
+        if loopThread is None or not loopThread.is_alive():
+            future.cancel()
+            raise RuntimeError('The shared event loop stopped before the coroutine finished')
+
+    return future.result()
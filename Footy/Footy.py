@@ -1,26 +1,43 @@
+import asyncio
 from datetime import date
-from typing import Optional
+from typing import Any, Optional
 
 import requests
-from requests import Response
 
-from Footy import HEADERS
+import Footy.Competitions as Competitions
+import Footy.Log as Log
 from Footy.Match import Match
+import Footy.Metrics as Metrics
+from Footy.RateLimiter import Priority
+from Footy.EventLoop import RunSync
+from Footy.Session import BASE_URL, MAX_BODY_LENGTH, AsyncSession, GetSession
 import Footy.MatchStatus as MatchStatus
 
+# Log through the footy subsystem's logger
+log = Log.GetLogger('footy')
+
 class Footy:
     # Set the list of teams we're interested in
-    def __init__(self, teams: Optional[list[str]] = None) -> None:
+    def __init__(self, teams: Optional[list[str]] = None, session: Optional[AsyncSession] = None, competitions: Optional[list[int]] = None) -> None:
+        # Use the shared pooled session unless one is given
+        self.session = session if session is not None else GetSession()
+
+        # Set the competitions to get matches from
+        self.competitions = competitions if competitions is not None else Competitions.defaultCompetitions
+
+        # Competitions where every match is wanted, not only those of the teams
+        self.wholeCompetitions: set[int] = set()
+
         # If a team list is given, use that
         if teams is not None:
             self.teams = teams
         else:
             # If no team list is given, download the full list of Proemier League teams
             try:
-                response = requests.get(f'https://api.football-data.org/v2/competitions/2021/teams', headers=HEADERS)
+                response = RunSync(self.session.Get(f'{BASE_URL}/competitions/{Competitions.premierLeague}/teams'))
             except:
                 # In case of download failure return None to allow a retry
-                print('Could not download data')
+                log.warning('Could not download the Premier League teams', exc_info=True)
                 return
 
             # Check the download status is good
@@ -30,10 +47,29 @@ class Footy:
                 self.teams = [team['name'] for team in data['teams']]
             else:
                 # If the download failed, return None to allow a retry
-                print(response.content)
+                log.warning('Teams request failed with status %d: %.*s', response.status_code, MAX_BODY_LENGTH, response.text)
                 return
 
+    # The blocking API, each call waits for the coroutine to run on the shared event loop
     def GetMatches(self, dateFrom: Optional[date] = None, dateTo: Optional[date] = None) -> Optional[list[Match]]:
+        return RunSync(self.GetMatchesAsync(dateFrom, dateTo))
+
+    def GetCompetitionsData(self, competitionIds: list[int], dateFrom: date, dateTo: date, priority: Priority = Priority.NORMAL) -> dict[int, Optional[dict[str, Any]]]:
+        return RunSync(self.GetCompetitionsDataAsync(competitionIds, dateFrom, dateTo, priority))
+
+    def GetCompetitionData(self, competitionId: int, dateFrom: date, dateTo: date, priority: Priority = Priority.NORMAL) -> Optional[dict[str, Any]]:
+        return RunSync(self.GetCompetitionDataAsync(competitionId, dateFrom, dateTo, priority))
+
+    def GetLiveMatchesData(self, competitionIds: list[int], dateFrom: date, dateTo: date) -> Optional[dict[str, Any]]:
+        return RunSync(self.GetLiveMatchesDataAsync(competitionIds, dateFrom, dateTo))
+
+    def GetMatchData(self, matchId: int) -> Optional[dict[str, Any]]:
+        return RunSync(self.GetMatchDataAsync(matchId))
+
+    def GetMatch(self, oldMatch: Match) -> Optional[Match]:
+        return RunSync(self.GetMatchAsync(oldMatch))
+
+    async def GetMatchesAsync(self, dateFrom: Optional[date] = None, dateTo: Optional[date] = None) -> Optional[list[Match]]:
         # Initialise an empty list of matches
         matchList: list[Match] = []
 
@@ -43,83 +79,124 @@ class Footy:
         if dateTo is None or dateTo < dateFrom:
             dateTo = dateFrom
 
-        # Try to download today's matches
-        try:
-            # Get the Premier League games
-            pLresponse = requests.get(f'https://api.football-data.org//v2/competitions/2021/matches/?dateFrom={dateFrom}&dateTo={dateTo}', headers=HEADERS)
+        # Download all the competitions at the same time
+        competitionData = await self.GetCompetitionsDataAsync(self.competitions, dateFrom, dateTo)
 
-            # Get the Champions League games
-            cLResponse = requests.get(f'https://api.football-data.org//v2/competitions/2001/matches/?dateFrom={dateFrom}&dateTo={dateTo}', headers=HEADERS)
+        # If every download failed, return None to allow a retry
+        if all(data is None for data in competitionData.values()):
+            return None
+
+        # Get the list of matches for each competition which downloaded, skipping any that failed
+        for competitionId, data in competitionData.items():
+            if (competitionMatchList := self.GetCompetitionMatchData(data)) is not None:
+                matchList.extend(competitionMatchList)
+            else:
+                log.warning('Could not get matches for competition %d', competitionId)
+
+        return matchList
+
+    async def GetCompetitionsDataAsync(self, competitionIds: list[int], dateFrom: date, dateTo: date, priority: Priority = Priority.NORMAL) -> dict[int, Optional[dict[str, Any]]]:
+        # Download all the competitions at the same time so the total time is about one round trip
+        results = await asyncio.gather(*(self.GetCompetitionDataAsync(competitionId, dateFrom, dateTo, priority) for competitionId in competitionIds))
+
+        # Return the data indexed by competition ID, None where the download failed
+        return dict(zip(competitionIds, results))
+
+    async def GetCompetitionDataAsync(self, competitionId: int, dateFrom: date, dateTo: date, priority: Priority = Priority.NORMAL) -> Optional[dict[str, Any]]:
+        # Try to download the competition's matches between the two dates
+        try:
+            # Live data must always come from the API rather than the response cache
+            maxAge = 0 if priority == Priority.LIVE else None
+            response = await self.session.Get(f'{BASE_URL}/competitions/{competitionId}/matches/?dateFrom={dateFrom}&dateTo={dateTo}', priority=priority, maxAge=maxAge)
         except:
             # In case of download failure return None to allow a retry
-            print('Could not download data')
+            log.warning('Could not download matches for competition %d', competitionId, exc_info=True, extra=Log.Every(60))
             return None
 
-        # Get the list of Premier League matches and extend the list if not None
-        if (plMatchList := self.GetCompetitionMatchData(pLresponse)) != None:
-            matchList.extend(plMatchList)
+        # Check the download status is good
+        if response.status_code == requests.codes.ok:
+            # Decode and return the JSON response
+            return response.json()
         else:
+            # If the download failed, return None to allow a retry
+            log.warning('Competition %d request failed with status %d: %.*s', competitionId, response.status_code, MAX_BODY_LENGTH, response.text, extra=Log.Every(60))
+            return None
+
+    async def GetLiveMatchesDataAsync(self, competitionIds: list[int], dateFrom: date, dateTo: date) -> Optional[dict[str, Any]]:
+        # Try to download the matches in all of the competitions between the two dates in a single request
+        try:
+            competitions = ','.join(str(competitionId) for competitionId in competitionIds)
+            with Metrics.pollRoundTrip.Time(request='live'):
+                response = await self.session.Get(f'{BASE_URL}/matches?competitions={competitions}&dateFrom={dateFrom}&dateTo={dateTo}', priority=Priority.LIVE, maxAge=0)
+        except:
+            # In case of download failure return None to allow a retry, this is retried every poll so only logged now and then
+            log.warning('Could not download live matches', exc_info=True, extra=Log.Every(60))
             return None
 
-        # Get the list of Champions League matches and extend the list if not None
-        if (clMatchList := self.GetCompetitionMatchData(cLResponse)) != None:
-            matchList.extend(clMatchList)
+        # Check the download status is good
+        if response.status_code == requests.codes.ok:
+            # Decode and return the JSON response
+            return response.json()
         else:
+            # If the download failed, return None to allow a retry
+            log.warning('Live matches request failed with status %d: %.*s', response.status_code, MAX_BODY_LENGTH, response.text, extra=Log.Every(60))
             return None
 
-        return matchList
+    def GetCompetitionMatchData(self, data: Optional[dict[str, Any]]) -> Optional[list[Match]]:
+        # If the download failed, return None to allow a retry
+        if data is None:
+            return None
 
-    def GetCompetitionMatchData(self, response: Response) -> Optional[list[Match]]:
         # Initialise an empty list of matches
         matchList: list[Match] = []
 
-        # Check the download status is good
-        if response.status_code == requests.codes.ok:
-            # Decode the JSON response
-            data = response.json()
-
-            # Set the competition name
-            competiton = data['competition']['name']
-
-            # Iterate over the matches
-            for matchData in data['matches']:
-                # Turn the response into a match type
-                match = Match(matchData, competiton)
+        # Set the competition name and ID
+        competiton = data['competition']['name']
+        competitionId = data['competition']['id']
 
-                # If the match involves one of the teams we're interested in append it to the match list
-                if match.homeTeam in self.teams or match.awayTeam in self.teams:
-                    # Check that the match may be on today
-                    if match.status in MatchStatus.matchToBePlayedList:
-                        matchList.append(match)
+        # Every match is wanted if the whole competition is followed
+        wholeCompetition = competitionId in self.wholeCompetitions
+        teams = set(self.teams)
 
-            # Return the match list
-            return matchList
+        # Iterate over the matches
+        for matchData in data['matches']:
+            # If the match involves one of the teams we're interested in append it to the match list
+            if wholeCompetition or matchData['homeTeam']['name'] in teams or matchData['awayTeam']['name'] in teams:
+                # Check that the match may be on today
+                if matchData['status'] in MatchStatus.matchToBePlayedList:
+                    # Turn the response into a match type
+                    matchList.append(Match(matchData, competiton, competitionId=competitionId))
 
-        else:
-            # If the download failed, return None to allow a retry
-            print(response.content)
-            return None
+        # Return the match list
+        return matchList
 
-    def GetMatch(self, oldMatch: Match) -> Optional[Match]:
-        # Try to download today's matches
+    async def GetMatchDataAsync(self, matchId: int) -> Optional[dict[str, Any]]:
+        # Try to download the match
         try:
-            response = requests.get(f'https://api.football-data.org//v2/matches/{oldMatch.id}', headers=HEADERS)
+            with Metrics.pollRoundTrip.Time(request='match'):
+                response = await self.session.Get(f'{BASE_URL}/matches/{matchId}', priority=Priority.LIVE, maxAge=0)
         except:
             # In case of download failure return None to allow a retry
-            print('Could not download data')
+            log.warning('Could not download match %d', matchId, exc_info=True, extra=Log.Every(60))
             return None
 
         # Check the download status is good
         if response.status_code == requests.codes.ok:
-            # Decode the JSON response
-            data = response.json()
+            # Decode the JSON response and return the match
+            return response.json()['match']
+        else:
+            # If the download failed, return None to allow a retry
+            log.warning('Match %d request failed with status %d: %.*s', matchId, response.status_code, MAX_BODY_LENGTH, response.text, extra=Log.Every(60))
+            return None
 
-            # Get the competition
-            competition = data['match']['competition']['name']
+    async def GetMatchAsync(self, oldMatch: Match) -> Optional[Match]:
+        # Download the latest data for the match
+        matchData = await self.GetMatchDataAsync(oldMatch.id)
 
-            # Create and return a match from the data
-            return Match(data['match'], competition, oldMatch)
+        if matchData is not None:
+            # Update the match in place, rather than creating a new one, and return it
+            oldMatch.Update(matchData)
+            return oldMatch
         else:
             # If the download failed, return None to allow a retry
-            print(response.content)
             return None
@@ -0,0 +1,116 @@
+from datetime import datetime, timezone
+import threading
+from typing import Any, Callable, Optional
+
+from Footy.Checkpoint import MatchCheckpoint
+from Footy.Footy import Footy
+import Footy.Log as Log
+from Footy.Match import Match, ParseUtcDate
+import Footy.Metrics as Metrics
+import Footy.MatchStatus as MatchStatus
+
+# Log through the poller subsystem's logger
+log = Log.GetLogger('poller')
+
+# Handler called with the updated match whenever its status or score changes
+MatchHandler = Callable[[Match], None]
+
+class LivePoller:
+    def __init__(self, footy: Footy, checkpoint: Optional[MatchCheckpoint] = None) -> None:
+        # The Footy object used to download the match data
+        self.footy = footy
+
+        # Where the live matches are saved after each poll so they can be restored after a restart
+        self.checkpoint = checkpoint
+
+        # The live matches being polled and the handler for each, indexed by match ID
+        self.matches: dict[int, Match] = {}
+        self.handlers: dict[int, MatchHandler] = {}
+
+        # Lock to allow matches to be added from other threads while polling
+        self._lock = threading.Lock()
+
+    def AddMatch(self, match: Match, handler: MatchHandler) -> None:
+        with self._lock:
+            # Only add the match if it isn't already being polled, otherwise the newer data would be lost
+            if match.id not in self.matches:
+                self.matches[match.id] = match
+                self.handlers[match.id] = handler
+
+    def RemoveMatch(self, matchId: int) -> None:
+        with self._lock:
+            self.matches.pop(matchId, None)
+            self.handlers.pop(matchId, None)
+
+    def GetMatch(self, matchId: int) -> Optional[Match]:
+        with self._lock:
+            return self.matches.get(matchId)
+
+    def Poll(self) -> None:
+        # Take a copy of the matches so the lock isn't held during the downloads
+        with self._lock:
+            matches = dict(self.matches)
+
+        # Polls happen every 20 seconds, so only log one now and then
+        if matches:
+            log.info('Polling %d live matches', len(matches), extra=Log.Every(300))
+
+        # Without a competition a match can only be polled on its own
+        competitionMatches = [match for match in matches.values() if match.competitionId is not None]
+        for match in matches.values():
+            if match.competitionId is None and (matchData := self.footy.GetMatchData(match.id)) is not None:
+                self._UpdateMatch(match, matchData)
+
+        if competitionMatches:
+            # Cover every day the live matches were scheduled on, in case a match runs past midnight
+            dateFrom = min(match.matchDate.date() for match in competitionMatches)
+            dateTo = max(match.matchDate.date() for match in competitionMatches)
+
+            # Download the matches in all of the competitions in a single request, if it fails they are tried again next poll
+            competitionIds = sorted({match.competitionId for match in competitionMatches})
+            if (data := self.footy.GetLiveMatchesData(competitionIds, dateFrom, dateTo)) is not None:
+                self._UpdateMatches(data, competitionMatches)
+
+        # Save the live matches so they can be restored after a restart
+        if self.checkpoint is not None:
+            with self._lock:
+                matches = list(self.matches.values())
+            self.checkpoint.Save(matches)
+
+    def _UpdateMatches(self, data: dict[str, Any], matchList: list[Match]) -> None:
+        # Index the live matches by ID
+        liveMatches = {match.id: match for match in matchList}
+
+        # Update each of the live matches in the response
+        for matchData in data['matches']:
+            if (match := liveMatches.get(matchData['id'])) is not None:
+                self._UpdateMatch(match, matchData)
+
+    def _UpdateMatch(self, match: Match, matchData: dict[str, Any]) -> None:
+        with self._lock:
+            # Check the match hasn't been removed while polling
+            if match.id not in self.matches:
+                return
+
+            # Keep the old status and score to check whether anything has changed
+            oldStatus = match.status
+            oldHomeScore = match.homeScore
+            oldAwayScore = match.awayScore
+
+            # Update the cached match in place with the new data
+            match.Update(matchData)
+            handler = self.handlers[match.id]
+
+            # Stop polling the match once it can no longer change
+            if match.status not in MatchStatus.matchToBePlayedList:
+                del self.matches[match.id]
+                del self.handlers[match.id]
+
+        # Only call the handler if the status or score has changed
+        if match.status != oldStatus or match.homeScore != oldHomeScore or match.awayScore != oldAwayScore:
+            # Record how old the change was by the time it was spotted
+            if match.lastUpdated is not None and (lastUpdated := ParseUtcDate(match.lastUpdated)) is not None:
+                Metrics.dataAge.Observe((datetime.now(timezone.utc) - lastUpdated).total_seconds())
+
+            log.info('Match %d is now %s %s-%s', match.id, match.status, match.homeScore, match.awayScore)
+            handler(match)
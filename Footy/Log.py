@@ -0,0 +1,173 @@
+from __future__ import annotations
+import atexit
+from datetime import datetime, timezone
+import json
+import logging
+from logging.handlers import QueueHandler, QueueListener
+import os
+import queue
+import sys
+import threading
+import time
+from typing import Any, Optional, TextIO, Union
+
+import Footy.Metrics as Metrics
+
+# Name of the logger each subsystem's logger sits under
+ROOT_LOGGER = 'banterbot'
+
+# Level of each logger unless it's changed, the job queue's scheduler logs every poll at INFO
+DEFAULT_LEVELS: dict[str, Union[str, int]] = {
+    '': 'INFO',
+    ROOT_LOGGER: 'INFO',
+    'apscheduler': 'WARNING',
+}
+
+# Environment variables to change the levels, e.g. banterbot.footy=DEBUG,telegram=WARNING, and the output format, json or text
+LEVELS_VARIABLE = 'BANTERBOT_LOG_LEVELS'
+FORMAT_VARIABLE = 'BANTERBOT_LOG_FORMAT'
+
+# Format used for text output
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Number of records which can wait to be written before new ones are dropped
+QUEUE_SIZE = 10000
+
+# Attributes every log record has, anything else was passed in extra and is added to the JSON output
+_standardAttributes = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'rateLimit'}
+
+def GetLogger(subsystem: str) -> logging.Logger:
+    # Get the logger for a subsystem, its level can be set on its own
+    return logging.getLogger(f'{ROOT_LOGGER}.{subsystem}')
+
+def Every(seconds: float) -> dict[str, Any]:
+    # Extra fields to log a repetitive message at most once in the given time, e.g. log.info('Polling', extra=Every(60))
+    return {'rateLimit': seconds}
+
+class RateLimitFilter(logging.Filter):
+    def __init__(self) -> None:
+        super().__init__()
+
+        # When each rate limited message was last let through and the number dropped since, by logger and message
+        self._windows: dict[tuple[str, str], tuple[float, int]] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        # Let through anything which isn't rate limited
+        interval: Optional[float] = getattr(record, 'rateLimit', None)
+        if interval is None:
+            return True
+
+        # Messages are grouped by their format string so differing arguments still count as a repeat
+        key = (record.name, str(record.msg))
+        now = time.monotonic()
+
+        with self._lock:
+            lastLogged, suppressed = self._windows.get(key, (-interval, 0))
+
+            if now - lastLogged < interval:
+                self._windows[key] = (lastLogged, suppressed + 1)
+                return False
+
+            self._windows[key] = (now, 0)
+
+        # Record how many were dropped since the last one
+        if suppressed:
+            record.suppressed = suppressed
+
+        return True
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        # One JSON object per line with the standard fields first
+        entry: dict[str, Any] = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'thread': record.threadName,
+            'message': record.getMessage(),
+        }
+
+        # Add any fields passed in extra
+        for key, value in vars(record).items():
+            if key not in _standardAttributes:
+                entry[key] = value
+
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+
+        return json.dumps(entry, default=str)
+
+class _NonBlockingQueueHandler(QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The record never leaves this process, so the message is formatted by the listener's thread rather than the caller's
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        # Never wait for the listener, if it has fallen behind the record is dropped
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            Metrics.logRecordsDropped.Inc()
+
+class _Listener(QueueListener):
+    def enqueue_sentinel(self) -> None:
+        # Wait for space for the stop marker, the queue may be full when stopping
+        self.queue.put(self._sentinel)
+
+# The running listener and the handler feeding it
+_listener: Optional[_Listener] = None
+_queueHandler: Optional[_NonBlockingQueueHandler] = None
+
+def _LevelsFromEnvironment() -> dict[str, str]:
+    # Parse name=LEVEL pairs separated by commas, root sets the root logger
+    levels: dict[str, str] = {}
+
+    for setting in os.environ.get(LEVELS_VARIABLE, '').split(','):
+        name, separator, level = setting.partition('=')
+        if separator and level.strip():
+            levels['' if name.strip() == 'root' else name.strip()] = level.strip().upper()
+
+    return levels
+
+def ConfigureLogging(levels: Optional[dict[str, Union[str, int]]] = None, jsonOutput: Optional[bool] = None, stream: Optional[TextIO] = None) -> None:
+    global _listener, _queueHandler
+
+    # Replace any earlier configuration
+    StopLogging()
+
+    # Set the levels, the defaults are overridden by the environment and then by the arguments
+    for name, level in {**DEFAULT_LEVELS, **_LevelsFromEnvironment(), **(levels if levels is not None else {})}.items():
+        logging.getLogger(name or None).setLevel(level)
+
+    # Write JSON unless text is asked for
+    if jsonOutput is None:
+        jsonOutput = os.environ.get(FORMAT_VARIABLE, 'json').lower() != 'text'
+
+    streamHandler = logging.StreamHandler(stream if stream is not None else sys.stderr)
+    streamHandler.setFormatter(JsonFormatter() if jsonOutput else logging.Formatter(TEXT_FORMAT))
+
+    # Every record goes through a queue to a listener thread which does the formatting and writing,
+    # repeats are dropped before they're queued
+    logQueue: queue.Queue[logging.LogRecord] = queue.Queue(QUEUE_SIZE)
+    _queueHandler = _NonBlockingQueueHandler(logQueue)
+    _queueHandler.addFilter(RateLimitFilter())
+    logging.getLogger().addHandler(_queueHandler)
+
+    _listener = _Listener(logQueue, streamHandler)
+    _listener.start()
+
+def StopLogging() -> None:
+    global _listener, _queueHandler
+
+    # Stop queueing records and write out any still waiting
+    if _queueHandler is not None:
+        logging.getLogger().removeHandler(_queueHandler)
+        _queueHandler = None
+
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+# Write out anything still queued when the program exits
+atexit.register(StopLogging)
@@ -1,19 +1,33 @@
 from __future__ import annotations
 from dataclasses import dataclass
-from datetime import datetime
+from datetime import datetime, timezone
+from time import perf_counter
 from typing import Any, Optional
-from zoneinfo import ZoneInfo
-
-from pytz import timezone
-from dateparser import parse
 
+import Footy.Metrics as Metrics
 import Footy.MatchStatus as MatchStatus
-from Footy.MatchStates import MatchState
-from Footy.TeamData import myTeamMapping, teamsToWatch, allTeams
-from Footy import SupportedBantzStrings
-from Footy import UnsupportedBantzStrings
+from Footy.MatchStates import FindState, MatchState, statesByName
+from Footy.TeamData import teamsToWatch, allTeams
+
+def ParseUtcDate(dateString: str) -> Optional[datetime]:
+    # The API gives dates in the fixed format 2022-05-01T14:00:00Z, which fromisoformat can parse directly
+    try:
+        matchDate = datetime.fromisoformat(f'{dateString[:-1]}+00:00' if dateString.endswith('Z') else dateString)
+    except ValueError:
+        # Fall back to dateparser for anything else, importing it only if needed as it's slow to load
+        from dateparser import parse
+        matchDate = parse(dateString)
+
+        if matchDate is None:
+            return None
 
-@dataclass
+    # Times are all UTC, so make sure the datetime is aware
+    if matchDate.tzinfo is None:
+        return matchDate.replace(tzinfo=timezone.utc)
+    else:
+        return matchDate.astimezone(timezone.utc)
+
+@dataclass(slots=True)
 class MatchChanges:
     firstHalfStarted: bool = False
     halfTime: bool = False
@@ -27,7 +41,34 @@ class MatchChanges:
     teamDrew: bool = False
 
 class Match:
-    def __init__(self, matchData: dict[str, Any], competition: str, oldMatch: Optional[Match] = None) -> None:
+    # Use slots to keep each match small, there are lots of these created for each competition download
+    __slots__ = (
+        'id',
+        'homeTeam',
+        'awayTeam',
+        'homeTeamShort',
+        'awayTeamShort',
+        'homeScore',
+        'awayScore',
+        'matchDate',
+        'lastUpdated',
+        '_competition',
+        'competitionId',
+        '_stage',
+        '_group',
+        'status',
+        '_teamHome',
+        '_teamAway',
+        'teamName',
+        'supportedTeamPlayingSupportedTeam',
+        'teamScore',
+        'oppositionScore',
+        'matchState',
+        'oppositionState',
+        'matchChanges',
+    )
+
+    def __init__(self, matchData: dict[str, Any], competition: str, oldMatch: Optional[Match] = None, competitionId: Optional[int] = None) -> None:
         # Get the match ID
         self.id = matchData['id']
 
@@ -37,20 +78,24 @@ class Match:
         self.homeTeamShort = allTeams[self.homeTeam]['team'] if self.homeTeam in allTeams else self.homeTeam
         self.awayTeamShort = allTeams[self.awayTeam]['team'] if self.awayTeam in allTeams else self.awayTeam
 
-        # Get the full time score, replacing None with TBD
-        self.homeScore = int(matchData['score']['fullTime']['homeTeam']) if matchData['score']['fullTime']['homeTeam'] is not None else 'TBD'
-        self.awayScore = int(matchData['score']['fullTime']['awayTeam']) if matchData['score']['fullTime']['awayTeam'] is not None else 'TBD'
-
-        # Get and parse the match date and time, times are all UTC, so make sure the datetime is aware
-        matchDate = parse(matchData['utcDate'])
+        # Get and parse the match date and time
+        matchDate = ParseUtcDate(matchData['utcDate'])
         if matchDate is None:
-            self.matchDate = datetime(1900, 1, 1).replace(tzinfo=timezone('UTC'))
+            self.matchDate = datetime(1900, 1, 1, tzinfo=timezone.utc)
         else:
-            self.matchDate = matchDate.replace(tzinfo=timezone('UTC'))
+            self.matchDate = matchDate
 
         # Set the competition name
         self._competition = competition
 
+        # When the API last updated the match, parsed only when needed
+        self.lastUpdated: Optional[str] = matchData.get('lastUpdated')
+
+        # Set the competition ID, carrying it over from the old match if not given
+        if competitionId is None and oldMatch is not None:
+            competitionId = oldMatch.competitionId
+        self.competitionId = competitionId
+
         # Set the stage and group
         self._stage = matchData['stage']
         self._group = matchData['group']
@@ -78,52 +123,85 @@ class Match:
         else:
             self.supportedTeamPlayingSupportedTeam = False
 
-        # Set the team and opposition scores
-        if self.homeScore != 'TBD' and self.awayScore != 'TBD':
-            self.teamScore = self.homeScore if self._teamHome else self.awayScore
-            self.oppositionScore = self.awayScore if self._teamHome else self.homeScore
-        else:
-            self.teamScore = 0
-            self.oppositionScore = 0
+        # Set the scores
+        self._SetScore(matchData['score']['fullTime'])
 
         # Get the match changes if the old data is available
         if oldMatch is not None:
-            # Set the match state to the old match state
+            # Set the match states to the old match states
             self.matchState = oldMatch.matchState
+            self.oppositionState = oldMatch.oppositionState
 
             # Get the match changes
-            self.matchChanges = self._CheckStatus(oldMatch)
+            self.matchChanges = self._CheckStatus(oldMatch.status, oldMatch.homeScore, oldMatch.awayScore, oldMatch.teamScore - oldMatch.oppositionScore)
 
         else:
             # initialise the match changes
             self.matchChanges = MatchChanges()
 
-            # initialise the match state
-            self.matchState = MatchState(0, 0).FindState()
+            # initialise the match state for each side
+            self.matchState = FindState()
+            self.oppositionState = FindState()
+
+    def _SetScore(self, fullTime: dict[str, Optional[int]]) -> None:
+        # Get the full time score, replacing None with TBD
+        self.homeScore = int(fullTime['homeTeam']) if fullTime['homeTeam'] is not None else 'TBD'
+        self.awayScore = int(fullTime['awayTeam']) if fullTime['awayTeam'] is not None else 'TBD'
 
-        if self.teamName in myTeamMapping:
-            self.bantzStrings = SupportedBantzStrings
+        # Set the team and opposition scores
+        if self.homeScore != 'TBD' and self.awayScore != 'TBD':
+            self.teamScore = self.homeScore if self._teamHome else self.awayScore
+            self.oppositionScore = self.awayScore if self._teamHome else self.homeScore
         else:
-            self.bantzStrings = UnsupportedBantzStrings
+            self.teamScore = 0
+            self.oppositionScore = 0
+
+    def Update(self, matchData: dict[str, Any]) -> MatchChanges:
+        # Get the new status and score
+        status = matchData['status']
+        fullTime = matchData['score']['fullTime']
+
+        # Keep the old status and score to compare against
+        oldStatus = self.status
+        oldHomeScore = self.homeScore
+        oldAwayScore = self.awayScore
+        oldScoreDifference = self.teamScore - self.oppositionScore
 
-    def _CheckStatus(self, oldMatch: Match) -> MatchChanges:
+        # If nothing has changed there's nothing to update
+        if status == oldStatus and fullTime['homeTeam'] == (oldHomeScore if oldHomeScore != 'TBD' else None) and fullTime['awayTeam'] == (oldAwayScore if oldAwayScore != 'TBD' else None):
+            self.matchChanges = MatchChanges()
+            return self.matchChanges
+
+        # Apply the new status, score and update time
+        self.status = status
+        self._SetScore(fullTime)
+        self.lastUpdated = matchData.get('lastUpdated', self.lastUpdated)
+
+        # Work out the match changes from the old status and score, timing how long it takes
+        startTime = perf_counter()
+        self.matchChanges = self._CheckStatus(oldStatus, oldHomeScore, oldAwayScore, oldScoreDifference)
+        Metrics.checkStatusTime.Observe(perf_counter() - startTime)
+
+        return self.matchChanges
+
+    def _CheckStatus(self, oldStatus: str, oldHomeScore: int | str, oldAwayScore: int | str, oldScoreDifference: int) -> MatchChanges:
         # Check for various state changes in the match
         matchChanges = MatchChanges()
 
         # Check whether the match has started
-        if oldMatch.status == MatchStatus.scheduled and self.status == MatchStatus.inPlay:
+        if oldStatus == MatchStatus.scheduled and self.status == MatchStatus.inPlay:
             matchChanges.firstHalfStarted = True
 
         # Check for half time
-        elif oldMatch.status == MatchStatus.inPlay and self.status == MatchStatus.paused:
+        elif oldStatus == MatchStatus.inPlay and self.status == MatchStatus.paused:
             matchChanges.halfTime = True
 
         # Check for the start of the second half
-        elif oldMatch.status == MatchStatus.paused and self.status == MatchStatus.inPlay:
+        elif oldStatus == MatchStatus.paused and self.status == MatchStatus.inPlay:
             matchChanges.secondHalfStarted = True
 
         # Check for full time
-        elif oldMatch.status == MatchStatus.inPlay and self.status == MatchStatus.finished:
+        elif oldStatus == MatchStatus.inPlay and self.status == MatchStatus.finished:
             matchChanges.fullTime = True
 
             # Check for the home team winning
@@ -136,26 +214,77 @@ class Match:
                 matchChanges.teamWon = False
                 matchChanges.teamLost = True
             else:
-                # Game was drawn
-                if self._teamHome or self._teamAway:
-                    matchChanges.teamDrew = True
+                # Game was drawn, chats only get messages about the matches they follow so this is for either side
+                matchChanges.teamDrew = True
 
         # Check for a goal
-        if self.homeScore != oldMatch.homeScore or self.awayScore != oldMatch.awayScore:
+        if self.homeScore != oldHomeScore or self.awayScore != oldAwayScore:
             matchChanges.goalScored = True
 
-            # Get the new match state
-            self.matchState = self.matchState.GoalScored(self.teamScore, self.oppositionScore)
+            # Get the new match state, and the state from the opposition's side for the chats following them
+            self.matchState = self.matchState.GoalScored(oldScoreDifference, self.teamScore - self.oppositionScore)
+            self.oppositionState = self.oppositionState.GoalScored(-oldScoreDifference, self.oppositionScore - self.teamScore)
 
         # Return the changes
         return matchChanges
 
+    def IsTeamSide(self, teamName: str) -> bool:
+        # Whether the team is the side the team score and match state are for, otherwise it's the opposition
+        return teamName == self.teamName
+
+    def StateFor(self, teamName: str) -> MatchState:
+        # The match state from the side of either team
+        return self.matchState if self.IsTeamSide(teamName) else self.oppositionState
+
+    def ScoresFor(self, teamName: str) -> tuple[int, int]:
+        # The team and opposition scores from the side of either team
+        return (self.teamScore, self.oppositionScore) if self.IsTeamSide(teamName) else (self.oppositionScore, self.teamScore)
+
+    def ToCheckpoint(self) -> dict[str, Any]:
+        # Save the match in the same shape as the API data, along with the competition and match state
+        return {
+            'match': {
+                'id': self.id,
+                'homeTeam': {'name': self.homeTeam},
+                'awayTeam': {'name': self.awayTeam},
+                'utcDate': self.matchDate.isoformat(),
+                'stage': self._stage,
+                'group': self._group,
+                'status': self.status,
+                'lastUpdated': self.lastUpdated,
+                'score': {'fullTime': {
+                    'homeTeam': self.homeScore if self.homeScore != 'TBD' else None,
+                    'awayTeam': self.awayScore if self.awayScore != 'TBD' else None,
+                }},
+            },
+            'competition': self._competition,
+            'competitionId': self.competitionId,
+            'matchState': self.matchState.__class__.__name__,
+            'oppositionState': self.oppositionState.__class__.__name__,
+        }
+
+    @classmethod
+    def FromCheckpoint(cls, checkpoint: dict[str, Any]) -> Match:
+        # Recreate the match from the saved data, then put back the state it had reached
+        match = cls(checkpoint['match'], checkpoint['competition'], competitionId=checkpoint['competitionId'])
+        match.matchState = statesByName[checkpoint['matchState']]
+
+        # Checkpoints from before the opposition's state was kept start it from the current score
+        if (oppositionState := checkpoint.get('oppositionState')) is not None:
+            match.oppositionState = statesByName[oppositionState]
+        else:
+            match.oppositionState = FindState(match.oppositionScore - match.teamScore)
+        return match
+
     def GetScoreline(self) -> str:
         # Create a string for the scoreline
         return f'{self.homeTeamShort} {self.homeScore} - {self.awayScore} {self.awayTeamShort}'
 
     # Convert this match into a string for printing
     def __str__(self) -> str:
+        # Import the time zone data only when a match is printed
+        from zoneinfo import ZoneInfo
+
         # Create a string for the match details
         matchDetails = f'{self.matchDate.astimezone(tz=ZoneInfo("Europe/London")).strftime("%c %Z")} - {self._competition} - Stage: {self._stage} - Group: {self._group} - {self.status}'
 
@@ -1,144 +1,170 @@
 from __future__ import annotations
-from typing import Optional
+from typing import Iterable, Optional
+
+# Score differences beyond this are treated the same as this, the states only care about leads of one or more than one
+MAX_SCORE_DIFFERENCE = 2
 
 class MatchState:
-    def __init__(self, teamScore: int = 0, oppositionScore: int = 0) -> None:
-        self.teamScore = teamScore
-        self.oppositionScore = oppositionScore
-        self.oldScoreDifference = self.teamScore - self.oppositionScore
-
-    def FindState(self) -> MatchState:
-        scoreDifference = self.teamScore - self.oppositionScore
-
-        match scoreDifference:
-            case 1:
-                returnVal = TeamLeadByOne(self.teamScore, self.oppositionScore)
-            case -1:
-                returnVal = TeamDeficitOfOne(self.teamScore, self.oppositionScore)
-            case x if x > 1:
-                returnVal = TeamExtendingLead(self.teamScore, self.oppositionScore)
-            case x if x < -1:
-                returnVal = TeamExtendingDeficit(self.teamScore, self.oppositionScore)
-            case _:
-                returnVal = Drawing(self.teamScore, self.oppositionScore)
-
-        return returnVal
-
-    def GoalScored(self, teamScore: int, oppositionScore: int) -> MatchState:
-        raise NotImplementedError('GoalScored() called on base class')
+    # The states are shared singletons, so they hold no per-match data
+    __slots__ = ()
 
-    def __str__(self) -> str:
-        return f'State: {self.__class__.__name__:20} Team Score {self.teamScore} - {self.oppositionScore} Opposition Score'
+    # Row of this state in the transition table
+    index = -1
 
-class Drawing(MatchState):
-    def GoalScored(self, teamScore: int, oppositionScore: int) -> MatchState:
-        scoreDifference = teamScore - oppositionScore
+    # This state's rows of the transition table, filled in once the table has been built
+    transitions: tuple[tuple[MatchState, MatchState, MatchState], ...] = ()
 
-        match scoreDifference:
-            case 1:
-                returnVal = TeamLeadByOne(teamScore, oppositionScore)
-            case -1:
-                returnVal = TeamDeficitOfOne(teamScore, oppositionScore)
-            case _:
-                print(f'Attempted to move from {__class__.__name__} to invalid state {teamScore} - {oppositionScore}')
-                returnVal = MatchState(teamScore, oppositionScore).FindState()
+    def GoalScored(self, oldScoreDifference: int, scoreDifference: int) -> MatchState:
+        # Get the column for the direction the score difference moved in, down, the same or up
+        direction = (scoreDifference > oldScoreDifference) - (scoreDifference < oldScoreDifference) + 1
 
-        return returnVal
+        # Clamp the score difference to the rows of the table
+        if scoreDifference > MAX_SCORE_DIFFERENCE:
+            scoreDifference = MAX_SCORE_DIFFERENCE
+        elif scoreDifference < -MAX_SCORE_DIFFERENCE:
+            scoreDifference = -MAX_SCORE_DIFFERENCE
 
-class TeamLeadByOne(MatchState):
-    def GoalScored(self, teamScore: int, oppositionScore: int) -> MatchState:
-        scoreDifference = teamScore - oppositionScore
+        # Look up the next state
+        return self.transitions[scoreDifference + MAX_SCORE_DIFFERENCE][direction]
 
-        match scoreDifference:
-            case 0:
-                returnVal = Drawing(teamScore, oppositionScore)
-            case scoreDifference if scoreDifference > 1:
-                returnVal = TeamExtendingLead(teamScore, oppositionScore)
-            case _:
-                print(f'Attempted to move from {__class__.__name__} to invalid state {teamScore} - {oppositionScore}')
-                returnVal = MatchState(teamScore, oppositionScore).FindState()
-
-        return returnVal
+    def __str__(self) -> str:
+        return f'State: {self.__class__.__name__}'
 
-class TeamExtendingLead(MatchState):
-    def GoalScored(self, teamScore: int, oppositionScore: int) -> MatchState:
-        scoreDifference = teamScore - oppositionScore
-        scoreDirection = scoreDifference - self.oldScoreDifference
+class Drawing(MatchState):
+    __slots__ = ()
+    index = 0
 
-        match scoreDirection:
-            case scoreDirection if scoreDirection < 0:
-                returnVal = TeamLosingLead(teamScore, oppositionScore)
-            case scoreDirection if scoreDirection > 0:
-                returnVal = TeamExtendingLead(teamScore, oppositionScore)
-            case _:
-                print(f'Attempted to move from {__class__.__name__} to invalid state {teamScore} - {oppositionScore}')
-                returnVal = MatchState(teamScore, oppositionScore).FindState()
+class TeamLeadByOne(MatchState):
+    __slots__ = ()
+    index = 1
 
-        return returnVal
+class TeamExtendingLead(MatchState):
+    __slots__ = ()
+    index = 2
 
 class TeamLosingLead(MatchState):
-    def GoalScored(self, teamScore: int, oppositionScore: int) -> MatchState:
-        scoreDifference = teamScore - oppositionScore
-        scoreDirection = scoreDifference - self.oldScoreDifference
-
-        match scoreDifference, scoreDirection:
-            case 0, _:
-                returnVal = Drawing(teamScore, oppositionScore)
-            case _, scoreDirection if scoreDirection < 0:
-                returnVal = TeamLosingLead(teamScore, oppositionScore)
-            case _, scoreDirection if scoreDirection > 0:
-                returnVal = TeamExtendingLead(teamScore, oppositionScore)
-            case _:
-                print(f'Attempted to move from {__class__.__name__} to invalid state {teamScore} - {oppositionScore}')
-                returnVal = MatchState(teamScore, oppositionScore).FindState()
-
-        return returnVal
+    __slots__ = ()
+    index = 3
 
 class TeamDeficitOfOne(MatchState):
-    def GoalScored(self, teamScore: int, oppositionScore: int) -> MatchState:
-        scoreDifference = teamScore - oppositionScore
-
-        match scoreDifference:
-            case 0:
-                returnVal = Drawing(teamScore, oppositionScore)
-            case scoreDifference if scoreDifference < -1:
-                returnVal = TeamExtendingDeficit(teamScore, oppositionScore)
-            case _:
-                print(f'Attempted to move from {__class__.__name__} to invalid state {teamScore} - {oppositionScore}')
-                returnVal = MatchState(teamScore, oppositionScore).FindState()
-
-        return returnVal
+    __slots__ = ()
+    index = 4
 
 class TeamExtendingDeficit(MatchState):
-    def GoalScored(self, teamScore: int, oppositionScore: int) -> MatchState:
-        scoreDifference = teamScore - oppositionScore
-        scoreDirection = scoreDifference - self.oldScoreDifference
-
-        match scoreDirection:
-            case scoreDirection if scoreDirection < 0:
-                returnVal = TeamExtendingDeficit(teamScore, oppositionScore)
-            case scoreDirection if scoreDirection > 0:
-                returnVal = TeamLosingDeficit(teamScore, oppositionScore)
-            case _:
-                print(f'Attempted to move from {__class__.__name__} to invalid state {teamScore} - {oppositionScore}')
-                returnVal = MatchState(teamScore, oppositionScore).FindState()
-
-        return returnVal
+    __slots__ = ()
+    index = 5
 
 class TeamLosingDeficit(MatchState):
-    def GoalScored(self, teamScore: int, oppositionScore: int) -> MatchState:
-        scoreDifference = teamScore - oppositionScore
-        scoreDirection = scoreDifference - self.oldScoreDifference
-
-        match scoreDifference, scoreDirection:
-            case 0, _:
-                returnVal = Drawing(teamScore, oppositionScore)
-            case _, scoreDirection if scoreDirection < 0:
-                returnVal = TeamExtendingDeficit(teamScore, oppositionScore)
-            case _, scoreDirection if scoreDirection > 0:
-                returnVal = TeamLosingDeficit(teamScore, oppositionScore)
-            case _:
-                print(f'Attempted to move from {__class__.__name__} to invalid state {teamScore} - {oppositionScore}')
-                returnVal = MatchState(teamScore, oppositionScore).FindState()
-
-        return returnVal
+    __slots__ = ()
+    index = 6
+
+# The single instance of each state
+drawing = Drawing()
+teamLeadByOne = TeamLeadByOne()
+teamExtendingLead = TeamExtendingLead()
+teamLosingLead = TeamLosingLead()
+teamDeficitOfOne = TeamDeficitOfOne()
+teamExtendingDeficit = TeamExtendingDeficit()
+teamLosingDeficit = TeamLosingDeficit()
+
+# All of the states in table order
+allStates: tuple[MatchState, ...] = (
+    drawing,
+    teamLeadByOne,
+    teamExtendingLead,
+    teamLosingLead,
+    teamDeficitOfOne,
+    teamExtendingDeficit,
+    teamLosingDeficit,
+)
+
+# States indexed by class name, used to restore a saved state
+statesByName = {state.__class__.__name__: state for state in allStates}
+
+# The state for each score difference from -2 to 2 when there is no previous state to move from
+_initialStates = (teamExtendingDeficit, teamDeficitOfOne, drawing, teamLeadByOne, teamExtendingLead)
+
+# Transition table, for each state a row for each new score difference from -2 to 2,
+# giving the next state when the difference has gone down, stayed the same or gone up
+_transitionTable: tuple[tuple[tuple[MatchState, MatchState, MatchState], ...], ...] = (
+    # Drawing
+    (
+        (teamExtendingDeficit, teamExtendingDeficit, teamExtendingDeficit),
+        (teamDeficitOfOne, teamDeficitOfOne, teamDeficitOfOne),
+        (drawing, drawing, drawing),
+        (teamLeadByOne, teamLeadByOne, teamLeadByOne),
+        (teamExtendingLead, teamExtendingLead, teamExtendingLead),
+    ),
+    # TeamLeadByOne
+    (
+        (teamExtendingDeficit, teamExtendingDeficit, teamExtendingDeficit),
+        (teamDeficitOfOne, teamDeficitOfOne, teamDeficitOfOne),
+        (drawing, drawing, drawing),
+        (teamLeadByOne, teamLeadByOne, teamLeadByOne),
+        (teamExtendingLead, teamExtendingLead, teamExtendingLead),
+    ),
+    # TeamExtendingLead
+    (
+        (teamLosingLead, teamExtendingDeficit, teamExtendingLead),
+        (teamLosingLead, teamDeficitOfOne, teamExtendingLead),
+        (teamLosingLead, drawing, teamExtendingLead),
+        (teamLosingLead, teamLeadByOne, teamExtendingLead),
+        (teamLosingLead, teamExtendingLead, teamExtendingLead),
+    ),
+    # TeamLosingLead
+    (
+        (teamLosingLead, teamExtendingDeficit, teamExtendingLead),
+        (teamLosingLead, teamDeficitOfOne, teamExtendingLead),
+        (drawing, drawing, drawing),
+        (teamLosingLead, teamLeadByOne, teamExtendingLead),
+        (teamLosingLead, teamExtendingLead, teamExtendingLead),
+    ),
+    # TeamDeficitOfOne
+    (
+        (teamExtendingDeficit, teamExtendingDeficit, teamExtendingDeficit),
+        (teamDeficitOfOne, teamDeficitOfOne, teamDeficitOfOne),
+        (drawing, drawing, drawing),
+        (teamLeadByOne, teamLeadByOne, teamLeadByOne),
+        (teamExtendingLead, teamExtendingLead, teamExtendingLead),
+    ),
+    # TeamExtendingDeficit
+    (
+        (teamExtendingDeficit, teamExtendingDeficit, teamLosingDeficit),
+        (teamExtendingDeficit, teamDeficitOfOne, teamLosingDeficit),
+        (teamExtendingDeficit, drawing, teamLosingDeficit),
+        (teamExtendingDeficit, teamLeadByOne, teamLosingDeficit),
+        (teamExtendingDeficit, teamExtendingLead, teamLosingDeficit),
+    ),
+    # TeamLosingDeficit
+    (
+        (teamExtendingDeficit, teamExtendingDeficit, teamLosingDeficit),
+        (teamExtendingDeficit, teamDeficitOfOne, teamLosingDeficit),
+        (drawing, drawing, drawing),
+        (teamExtendingDeficit, teamLeadByOne, teamLosingDeficit),
+        (teamExtendingDeficit, teamExtendingLead, teamLosingDeficit),
+    ),
+)
+
+# Give each state class its rows of the table
+for state in allStates:
+    state.__class__.transitions = _transitionTable[state.index]
+
+def FindState(scoreDifference: int = 0) -> MatchState:
+    # Get the state for a score difference without a previous state, e.g. at the start of a match
+    return _initialStates[min(max(scoreDifference, -MAX_SCORE_DIFFERENCE), MAX_SCORE_DIFFERENCE) + MAX_SCORE_DIFFERENCE]
+
+def Replay(scorelines: Iterable[tuple[int, int]], matchState: Optional[MatchState] = None, scoreDifference: int = 0) -> list[MatchState]:
+    # Start from the given state, or the state for the starting score difference
+    if matchState is None:
+        matchState = FindState(scoreDifference)
+
+    states: list[MatchState] = []
+
+    # Run each scoreline through the state machine, recording the state after each
+    for teamScore, oppositionScore in scorelines:
+        newScoreDifference = teamScore - oppositionScore
+        matchState = matchState.GoalScored(scoreDifference, newScoreDifference)
+        scoreDifference = newScoreDifference
+        states.append(matchState)
+
+    return states
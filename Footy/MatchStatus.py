@@ -7,4 +7,7 @@ canceled = 'CANCELED'
 paused = 'PAUSED'
 finished = 'FINISHED'
 
-matchToBePlayedList = [scheduled, suspended, paused, inPlay]
\ No newline at end of file
+matchToBePlayedList = [scheduled, suspended, paused, inPlay]
+
+# Statuses of league matches which still count as left to play
+matchRemainingList = [scheduled, postponed, suspended, paused, inPlay]
@@ -0,0 +1,244 @@
+from __future__ import annotations
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import math
+import threading
+import time
+from typing import Callable, Iterator, Optional
+
+# Port the metrics are served on, only on the local machine
+METRICS_PORT = 9105
+
+# Default histogram buckets in seconds, from a millisecond to a few minutes
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0, 300.0)
+
+# Content type of the Prometheus text format
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+LabelValues = tuple[str, ...]
+
+def _EscapeLabel(value: str) -> str:
+    # Escape backslashes, quotes and new lines in a label value
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _FormatLabels(labelNames: tuple[str, ...], labelValues: LabelValues, extra: str = '') -> str:
+    # Format the labels as {name="value",...}, escaping the values
+    labels = [f'{name}="{_EscapeLabel(value)}"' for name, value in zip(labelNames, labelValues)]
+    if extra:
+        labels.append(extra)
+    return f'{{{",".join(labels)}}}' if labels else ''
+
+def _FormatValue(value: float) -> str:
+    # Format a value, with the special values spelt the way the format expects
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+class Metric:
+    # The metric type as given in the TYPE line
+    metricType = 'untyped'
+
+    def __init__(self, name: str, help: str, labelNames: tuple[str, ...] = (), registry: Optional[MetricsRegistry] = None) -> None:
+        self.name = name
+        self.help = help
+        self.labelNames = labelNames
+        self._lock = threading.Lock()
+
+        # Add the metric to the registry so it's exported
+        (registry if registry is not None else metricsRegistry).Register(self)
+
+    def _LabelValues(self, labels: dict[str, str]) -> LabelValues:
+        return tuple(str(labels[name]) for name in self.labelNames)
+
+    def Samples(self) -> Iterator[str]:
+        raise NotImplementedError
+
+    def Render(self) -> str:
+        return '\n'.join([f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.metricType}', *self.Samples()])
+
+class Counter(Metric):
+    metricType = 'counter'
+
+    def __init__(self, name: str, help: str, labelNames: tuple[str, ...] = (), registry: Optional[MetricsRegistry] = None) -> None:
+        super().__init__(name, help, labelNames, registry)
+
+        # The count for each set of labels, a metric without labels starts at zero
+        self._values: dict[LabelValues, float] = {} if labelNames else {(): 0.0}
+
+    def Inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._LabelValues(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def Samples(self) -> Iterator[str]:
+        with self._lock:
+            values = dict(self._values)
+
+        for labelValues, value in values.items():
+            yield f'{self.name}{_FormatLabels(self.labelNames, labelValues)} {_FormatValue(value)}'
+
+class Gauge(Metric):
+    metricType = 'gauge'
+
+    def __init__(self, name: str, help: str, function: Optional[Callable[[], Optional[float]]] = None, registry: Optional[MetricsRegistry] = None) -> None:
+        super().__init__(name, help, (), registry)
+
+        # The current value, None until it's known, or a function to read it when the metrics are collected
+        self._value: Optional[float] = None
+        self._function = function
+
+    def Set(self, value: float) -> None:
+        self._value = value
+
+    def SetFunction(self, function: Callable[[], Optional[float]]) -> None:
+        self._function = function
+
+    def Samples(self) -> Iterator[str]:
+        value = self._function() if self._function is not None else self._value
+
+        # A function can return None if there's no value yet, in which case nothing is exported
+        if value is not None:
+            yield f'{self.name} {_FormatValue(value)}'
+
+class Histogram(Metric):
+    metricType = 'histogram'
+
+    def __init__(self, name: str, help: str, labelNames: tuple[str, ...] = (), buckets: tuple[float, ...] = DEFAULT_BUCKETS, registry: Optional[MetricsRegistry] = None) -> None:
+        super().__init__(name, help, labelNames, registry)
+
+        # The upper bound of each bucket, the last bucket catches everything else
+        self.buckets = tuple(sorted(buckets))
+
+        # The count in each bucket, the sum and the count for each set of labels
+        self._counts: dict[LabelValues, list[int]] = {}
+        self._sums: dict[LabelValues, float] = {}
+
+    def Observe(self, value: float, **labels: str) -> None:
+        key = self._LabelValues(labels)
+
+        # Find the first bucket the value fits in, counts are made cumulative when exported
+        index = bisect_left(self.buckets, value)
+
+        with self._lock:
+            if (counts := self._counts.get(key)) is None:
+                counts = self._counts[key] = [0] * (len(self.buckets) + 1)
+                self._sums[key] = 0.0
+            counts[index] += 1
+            self._sums[key] += value
+
+    def Time(self, **labels: str) -> _Timer:
+        # Time a block of code with a with statement
+        return _Timer(self, labels)
+
+    def Samples(self) -> Iterator[str]:
+        with self._lock:
+            counts = {key: list(value) for key, value in self._counts.items()}
+            sums = dict(self._sums)
+
+        for labelValues, bucketCounts in counts.items():
+            cumulative = 0
+            for bound, count in zip((*self.buckets, math.inf), bucketCounts):
+                cumulative += count
+                upperBound = f'le="{_FormatValue(bound)}"'
+                yield f'{self.name}_bucket{_FormatLabels(self.labelNames, labelValues, upperBound)} {cumulative}'
+            yield f'{self.name}_sum{_FormatLabels(self.labelNames, labelValues)} {_FormatValue(sums[labelValues])}'
+            yield f'{self.name}_count{_FormatLabels(self.labelNames, labelValues)} {cumulative}'
+
+class _Timer:
+    __slots__ = ('histogram', 'labels', 'startTime')
+
+    def __init__(self, histogram: Histogram, labels: dict[str, str]) -> None:
+        self.histogram = histogram
+        self.labels = labels
+        self.startTime = 0.0
+
+    def __enter__(self) -> _Timer:
+        self.startTime = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.histogram.Observe(time.perf_counter() - self.startTime, **self.labels)
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        # The metrics in the order they were registered, indexed by name
+        self._metrics: dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def Register(self, metric: Metric) -> None:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f'Metric {metric.name} is already registered')
+            self._metrics[metric.name] = metric
+
+    def Get(self, name: str) -> Optional[Metric]:
+        return self._metrics.get(name)
+
+    def Render(self) -> str:
+        # Render every metric in the Prometheus text format
+        with self._lock:
+            metrics = list(self._metrics.values())
+
+        return '\n'.join(metric.Render() for metric in metrics) + '\n'
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry: MetricsRegistry
+
+    def do_GET(self) -> None:
+        # Only the metrics path is served
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+
+        body = self.registry.Render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: object) -> None:
+        # Don't log every scrape
+        pass
+
+def StartMetricsServer(port: int = METRICS_PORT, host: str = '127.0.0.1', registry: Optional[MetricsRegistry] = None) -> ThreadingHTTPServer:
+    # Serve the metrics from a background thread
+    handler = type('MetricsHandler', (_MetricsHandler,), {'registry': registry if registry is not None else metricsRegistry})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='MetricsServer', daemon=True).start()
+    return server
+
+# The registry all of the bot's metrics are added to
+metricsRegistry = MetricsRegistry()
+
+# Latency of each stage from a goal being scored to its message reaching a chat
+pollRoundTrip = Histogram('footy_poll_round_trip_seconds', 'Time taken to download live match data from the API', ('request',))
+dataAge = Histogram('footy_data_age_seconds', 'Time from the API last updating a match to the change being detected')
+checkStatusTime = Histogram('footy_check_status_seconds', 'Time spent working out what has changed in a match', buckets=(1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 1e-3))
+sendTime = Histogram('telegram_send_seconds', 'Time taken to send a message to one chat')
+queueDelay = Histogram('telegram_queue_delay_seconds', 'Time a message waited in the outgoing queue before being sent')
+goalToMessage = Histogram('banterbot_goal_to_message_seconds', 'Time from the API last updating a match to its message being sent to a chat')
+
+# API quota
+quotaRemaining = Gauge('footy_api_quota_remaining', 'Requests left this minute as reported by the API')
+requestsDelayed = Counter('footy_api_requests_delayed_total', 'Requests delayed by the rate limiter')
+requestsShed = Counter('footy_api_requests_shed_total', 'Requests dropped by the rate limiter')
+
+# Outgoing messages
+messagesSent = Counter('telegram_messages_sent_total', 'Messages sent to chats')
+messagesRetried = Counter('telegram_messages_retried_total', 'Message sends retried after flood control or network errors')
+messagesDropped = Counter('telegram_messages_dropped_total', 'Messages dropped after an error')
+sendErrors = Counter('telegram_send_errors_total', 'Messages dropped after an unexpected error, not one from Telegram')
+outgoingQueueDepth = Gauge('telegram_outgoing_queue_depth', 'Messages waiting to be sent')
+
+# Incoming updates when running with a webhook
+webhookUpdates = Counter('telegram_webhook_updates_total', 'Requests to the webhook by how they were answered', ('result',))
+updateHandleTime = Histogram('telegram_update_handle_seconds', 'Time from an update reaching the webhook to its handlers finishing')
+webhookQueueDepth = Gauge('telegram_webhook_queue_depth', 'Updates waiting for a webhook worker')
+
+# Logging
+logRecordsDropped = Counter('banterbot_log_records_dropped_total', 'Log records dropped because the log writer had fallen behind')
+
+# Scheduled jobs
+jobQueueDepth = Gauge('banterbot_job_queue_depth', 'Jobs waiting in the job queue')
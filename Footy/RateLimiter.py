@@ -0,0 +1,212 @@
+import asyncio
+from enum import IntEnum
+import threading
+import time
+from typing import Mapping, Optional
+
+from requests import RequestException
+
+import Footy.Log as Log
+import Footy.Metrics as Metrics
+
+# Log through the ratelimit subsystem's logger
+log = Log.GetLogger('ratelimit')
+
+# Headers football-data.org returns with the number of requests left this minute and the seconds until the counter resets
+AVAILABLE_HEADER = 'X-Requests-Available-Minute'
+RESET_HEADER = 'X-RequestCounter-Reset'
+
+# The free tier allows 10 requests per minute
+REQUESTS_PER_MINUTE = 10
+
+# Number of requests held back from normal calls so live polling can always get through
+LIVE_RESERVE = 2
+
+class Priority(IntEnum):
+    LIVE = 0
+    NORMAL = 1
+
+# Maximum time in seconds each priority will wait for a request before being shed
+MAX_WAIT = {
+    Priority.LIVE: 30.0,
+    Priority.NORMAL: 5.0,
+}
+
+# Longest time in seconds a waiting coroutine sleeps before checking the bucket again, as it can't be woken by a quota update
+ASYNC_RECHECK_INTERVAL = 0.5
+
+class RateLimitExceeded(RequestException):
+    pass
+
+class RateLimiter:
+    def __init__(self, requestsPerMinute: int = REQUESTS_PER_MINUTE, liveReserve: int = LIVE_RESERVE) -> None:
+        # The size of the bucket and the rate it refills at
+        self.capacity = float(requestsPerMinute)
+        self.refillRate = requestsPerMinute / 60
+        self.liveReserve = liveReserve
+
+        # Start with a full bucket
+        self.tokens = self.capacity
+        self._lastRefill = time.monotonic()
+
+        # Time the API has told us the quota resets, no requests can be made before this once the quota is used up
+        self._resetAt = 0.0
+
+        # The quota remaining as last reported by the API
+        self.quotaRemaining: Optional[int] = None
+
+        # Number of live requests waiting, normal requests give way to these
+        self._liveWaiting = 0
+
+        # Counts of requests delayed and shed
+        self.delayedCount = 0
+        self.shedCount = 0
+
+        self._condition = threading.Condition()
+
+    def _Refill(self, now: float) -> None:
+        # Once the reset time has passed the full quota is available again
+        if self._resetAt and now >= self._resetAt:
+            self._resetAt = 0.0
+            self.tokens = self.capacity
+        elif not self._resetAt:
+            # Otherwise top the bucket up at the steady rate
+            self.tokens = min(self.capacity, self.tokens + (now - self._lastRefill) * self.refillRate)
+
+        self._lastRefill = now
+
+    def _WaitTime(self, needed: float, now: float) -> float:
+        # If the quota is exhausted nothing is available until the reset
+        if self._resetAt:
+            return max(self._resetAt - now, 0.01)
+
+        # Otherwise wait for the bucket to refill far enough
+        return max((needed - self.tokens) / self.refillRate, 0.01)
+
+    def _TryTake(self, priority: Priority, deadline: float) -> Optional[float]:
+        # Take a token, returning None if one was taken or the time to wait for one, the lock must be held
+        now = time.monotonic()
+        self._Refill(now)
+
+        # Normal requests have to leave the live reserve in the bucket
+        needed = 1.0 if priority == Priority.LIVE else 1.0 + self.liveReserve
+
+        # Take a token if there is one available and no live requests are queued ahead of a normal one
+        if self.tokens >= needed and (priority == Priority.LIVE or self._liveWaiting == 0):
+            self.tokens -= 1
+            return None
+
+        # Work out how long to wait, shedding the request if this would take too long
+        waitTime = self._WaitTime(needed, now)
+        if now + waitTime > deadline:
+            self.shedCount += 1
+            Metrics.requestsShed.Inc()
+            log.warning('Rate limit reached, shedding %s request', priority.name, extra=Log.Every(60))
+            raise RateLimitExceeded(f'Rate limit reached, {waitTime:.1f}s until a request is available')
+
+        return waitTime
+
+    def _Delayed(self, priority: Priority, waitTime: float) -> None:
+        # Report the first time a request is throttled
+        self.delayedCount += 1
+        Metrics.requestsDelayed.Inc()
+        log.info('Rate limit reached, delaying %s request by up to %.1fs', priority.name, waitTime, extra=Log.Every(60))
+
+    def Acquire(self, priority: Priority = Priority.NORMAL, maxWait: Optional[float] = None) -> None:
+        # Get the maximum time this request will wait
+        if maxWait is None:
+            maxWait = MAX_WAIT[priority]
+
+        with self._condition:
+            deadline = time.monotonic() + maxWait
+            delayed = False
+
+            if priority == Priority.LIVE:
+                self._liveWaiting += 1
+
+            try:
+                while (waitTime := self._TryTake(priority, deadline)) is not None:
+                    if not delayed:
+                        delayed = True
+                        self._Delayed(priority, waitTime)
+
+                    self._condition.wait(waitTime)
+            finally:
+                if priority == Priority.LIVE:
+                    self._liveWaiting -= 1
+                    self._condition.notify_all()
+
+    async def AcquireAsync(self, priority: Priority = Priority.NORMAL, maxWait: Optional[float] = None) -> None:
+        # The same as Acquire, but sleeping without holding up the event loop while waiting
+        if maxWait is None:
+            maxWait = MAX_WAIT[priority]
+
+        with self._condition:
+            deadline = time.monotonic() + maxWait
+            delayed = False
+
+            if priority == Priority.LIVE:
+                self._liveWaiting += 1
+
+        try:
+            while True:
+                with self._condition:
+                    if (waitTime := self._TryTake(priority, deadline)) is None:
+                        return
+
+                    if not delayed:
+                        delayed = True
+                        self._Delayed(priority, waitTime)
+
+                # Check again now and then in case the API has given back some quota
+                await asyncio.sleep(min(waitTime, ASYNC_RECHECK_INTERVAL))
+        finally:
+            if priority == Priority.LIVE:
+                with self._condition:
+                    self._liveWaiting -= 1
+                    self._condition.notify_all()
+
+    def Update(self, headers: Mapping[str, str], statusCode: int) -> None:
+        with self._condition:
+            now = time.monotonic()
+
+            # Read the quota headers if the API returned them
+            try:
+                available = int(headers[AVAILABLE_HEADER]) if AVAILABLE_HEADER in headers else None
+                reset = float(headers[RESET_HEADER]) if RESET_HEADER in headers else None
+            except ValueError:
+                return
+
+            # A 429 means the quota has gone, whatever we thought was left
+            if statusCode == 429:
+                available = 0
+
+            if available is not None:
+                # The API's count is authoritative, and a higher count than expected means a bigger quota
+                self.quotaRemaining = available
+                Metrics.quotaRemaining.Set(available)
+                self.capacity = max(self.capacity, float(available))
+                self.refillRate = self.capacity / 60
+                self.tokens = float(available)
+
+                # If the quota has gone, nothing more can be sent until the counter resets
+                if available <= 0:
+                    self._resetAt = now + (reset if reset is not None else 60.0)
+                    log.warning('API quota used up, requests paused for %.0fs', self._resetAt - now)
+
+            self._lastRefill = now
+            self._condition.notify_all()
+
+# The shared rate limiter and a lock to make sure only one is ever created
+_rateLimiter: Optional[RateLimiter] = None
+_rateLimiterLock = threading.Lock()
+
+def GetRateLimiter() -> RateLimiter:
+    global _rateLimiter
+
+    # Create the shared rate limiter on first use
+    with _rateLimiterLock:
+        if _rateLimiter is None:
+            _rateLimiter = RateLimiter()
+
+    return _rateLimiter
@@ -0,0 +1,274 @@
+from __future__ import annotations
+import copy
+from datetime import datetime, timedelta, timezone
+import heapq
+import itertools
+import json
+from pathlib import Path
+import random
+import re
+import time
+from types import SimpleNamespace
+from typing import Any, Callable, Optional, TextIO, Union
+from urllib.parse import parse_qs, urlsplit
+
+from requests import Response
+from requests.structures import CaseInsensitiveDict
+
+from Footy.Match import ParseUtcDate
+from Footy.RateLimiter import Priority
+from Footy.Session import AsyncSession
+import Footy.MatchStatus as MatchStatus
+
+# Patterns for the API requests the replay can answer
+_competitionMatchesPattern = re.compile(r'/competitions/(\d+)/matches')
+_singleMatchPattern = re.compile(r'/matches/(\d+)')
+_matchesPattern = re.compile(r'/matches/?$')
+
+def _MakeResponse(url: str, data: Optional[dict[str, Any]], statusCode: int = 200) -> Response:
+    # Build a response as if it had just been downloaded
+    response = Response()
+    response.status_code = statusCode
+    response.url = url
+    response.encoding = 'utf-8'
+    response._content = json.dumps(data if data is not None else {'message': 'Not found'}).encode('utf-8')
+    response.headers = CaseInsensitiveDict({'Content-Type': 'application/json'})
+    return response
+
+class VirtualClock:
+    def __init__(self, epoch: Optional[datetime] = None) -> None:
+        # The real time the virtual clock starts at and the virtual seconds since then
+        self.epoch = epoch if epoch is not None else datetime.now(timezone.utc)
+        self.now = 0.0
+
+    def ToSeconds(self, when: Union[float, timedelta, datetime]) -> float:
+        # Convert a job queue time, seconds from now, a delay or a date and time, to virtual seconds
+        if isinstance(when, datetime):
+            return (when - self.epoch).total_seconds()
+        elif isinstance(when, timedelta):
+            return self.now + when.total_seconds()
+        else:
+            return self.now + when
+
+class VirtualJobQueue:
+    def __init__(self, clock: VirtualClock) -> None:
+        # Jobs waiting to run, ordered by virtual time and then by the order they were added
+        self.clock = clock
+        self._jobs: list[tuple[float, int, Callable[[Any], None], Any, Optional[float]]] = []
+        self._counter = itertools.count()
+
+    def run_once(self, callback: Callable[[Any], None], when: Union[float, timedelta, datetime], context: Any = None) -> None:
+        heapq.heappush(self._jobs, (self.clock.ToSeconds(when), next(self._counter), callback, context, None))
+
+    def run_repeating(self, callback: Callable[[Any], None], interval: float, first: Union[float, timedelta, datetime] = 0, context: Any = None) -> None:
+        heapq.heappush(self._jobs, (self.clock.ToSeconds(first), next(self._counter), callback, context, interval))
+
+    def RunUntil(self, endTime: float) -> int:
+        # Run the jobs in order, moving the clock forward to each one, and return the number run
+        jobCount = 0
+
+        while self._jobs and self._jobs[0][0] <= endTime:
+            runAt, _, callback, context, interval = heapq.heappop(self._jobs)
+            self.clock.now = max(self.clock.now, runAt)
+
+            # Repeating jobs are put back before running, as the job queue does
+            if interval is not None:
+                heapq.heappush(self._jobs, (runAt + interval, next(self._counter), callback, context, interval))
+
+            callback(SimpleNamespace(job=SimpleNamespace(context=context), bot=None))
+            jobCount += 1
+
+        self.clock.now = max(self.clock.now, endTime)
+        return jobCount
+
+class Recording:
+    def __init__(self, recordedAt: datetime, records: Optional[list[dict[str, Any]]] = None) -> None:
+        # When the recording started and each change to a match, with the seconds since the start it was seen at
+        self.recordedAt = recordedAt
+        self.records: list[dict[str, Any]] = records if records is not None else []
+
+    @property
+    def duration(self) -> float:
+        return self.records[-1]['at'] if self.records else 0.0
+
+    def Save(self, path: Path) -> None:
+        # One JSON line for the header and one for each record
+        with open(path, 'w', encoding='utf-8') as recordingFile:
+            recordingFile.write(f'{json.dumps({"recordedAt": self.recordedAt.isoformat()})}\n')
+            recordingFile.writelines(f'{json.dumps(record)}\n' for record in self.records)
+
+    @classmethod
+    def Load(cls, path: Path) -> Recording:
+        with open(path, 'r', encoding='utf-8') as recordingFile:
+            header = json.loads(recordingFile.readline())
+            return cls(datetime.fromisoformat(header['recordedAt']), [json.loads(line) for line in recordingFile if line.strip()])
+
+class RecordingSession:
+    def __init__(self, session: AsyncSession, path: Path) -> None:
+        # The session making the real requests and the file the changes are written to as they're seen
+        self.session = session
+        self.startTime = time.monotonic()
+        self._recordFile: TextIO = open(path, 'w', encoding='utf-8')
+        self._recordFile.write(f'{json.dumps({"recordedAt": datetime.now(timezone.utc).isoformat()})}\n')
+
+        # The last version of each match seen, so only changes are recorded
+        self._lastSeen: dict[int, dict[str, Any]] = {}
+
+    async def Get(self, url: str, priority: Priority = Priority.NORMAL, maxAge: Optional[float] = None) -> Response:
+        # Make the real request and record any matches in it which have changed
+        response = await self.session.Get(url, priority, maxAge)
+
+        if response.status_code == 200:
+            data = response.json()
+            matches = data.get('matches', [data['match']] if 'match' in data else [])
+
+            for matchData in matches:
+                # Keep the competition with each match, the competition endpoints only give it once for the response
+                matchData.setdefault('competition', data.get('competition'))
+
+                if self._lastSeen.get(matchData['id']) != matchData:
+                    self._lastSeen[matchData['id']] = matchData
+                    self._recordFile.write(f'{json.dumps({"at": time.monotonic() - self.startTime, "match": matchData})}\n')
+
+            self._recordFile.flush()
+
+        return response
+
+    def Close(self) -> None:
+        self._recordFile.close()
+
+class ReplaySession:
+    def __init__(self, recording: Recording, clock: VirtualClock) -> None:
+        # The recording being replayed and the clock deciding how far through it we are
+        self.recording = recording
+        self.clock = clock
+
+        # Match dates are moved so the recording starts at the clock's epoch
+        self._shift = clock.epoch - recording.recordedAt
+
+        # The records not yet reached, and the latest version of each match with the virtual time it appeared
+        self._pending = sorted(recording.records, key=lambda record: record['at'])
+        self._nextRecord = 0
+        self.matches: dict[int, dict[str, Any]] = {}
+        self.changedAt: dict[int, float] = {}
+
+        # Number of requests answered and the wall clock time of the last one
+        self.requestCount = 0
+        self.lastServedAt = 0.0
+
+    def _Advance(self) -> None:
+        # Apply every record up to the current virtual time
+        while self._nextRecord < len(self._pending) and self._pending[self._nextRecord]['at'] <= self.clock.now:
+            record = self._pending[self._nextRecord]
+            matchData = copy.deepcopy(record['match'])
+
+            # Move the match date to the replay's time
+            matchDate = ParseUtcDate(matchData['utcDate'])
+            if matchDate is not None:
+                matchData['utcDate'] = (matchDate + self._shift).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+            self.matches[matchData['id']] = matchData
+            self.changedAt[matchData['id']] = record['at']
+            self._nextRecord += 1
+
+    def _MatchesBetween(self, competitionIds: Optional[set[int]], dateFrom: Optional[str], dateTo: Optional[str]) -> list[dict[str, Any]]:
+        # Get the matches in the competitions between the dates
+        matches = []
+        for matchData in self.matches.values():
+            matchDate = matchData['utcDate'][:10]
+            if competitionIds is not None and matchData['competition']['id'] not in competitionIds:
+                continue
+            if (dateFrom is not None and matchDate < dateFrom) or (dateTo is not None and matchDate > dateTo):
+                continue
+            matches.append(matchData)
+
+        return matches
+
+    async def Get(self, url: str, priority: Priority = Priority.NORMAL, maxAge: Optional[float] = None) -> Response:
+        self._Advance()
+        self.requestCount += 1
+        self.lastServedAt = time.perf_counter()
+
+        splitUrl = urlsplit(url)
+        query = {key: values[0] for key, values in parse_qs(splitUrl.query).items()}
+
+        if (found := _competitionMatchesPattern.search(splitUrl.path)) is not None:
+            # A single competition's matches, the competition is given once for the response
+            competitionId = int(found.group(1))
+            matches = self._MatchesBetween({competitionId}, query.get('dateFrom'), query.get('dateTo'))
+            competition = next((matchData['competition'] for matchData in self.matches.values() if matchData['competition']['id'] == competitionId), {'id': competitionId, 'name': str(competitionId)})
+            return _MakeResponse(url, {'competition': competition, 'matches': matches})
+
+        if (found := _singleMatchPattern.search(splitUrl.path)) is not None:
+            # A single match
+            matchData = self.matches.get(int(found.group(1)))
+            return _MakeResponse(url, {'match': matchData} if matchData is not None else None, 200 if matchData is not None else 404)
+
+        if _matchesPattern.search(splitUrl.path) is not None:
+            # Matches across competitions, each match includes its competition
+            competitionIds = {int(competitionId) for competitionId in query['competitions'].split(',')} if 'competitions' in query else None
+            return _MakeResponse(url, {'matches': self._MatchesBetween(competitionIds, query.get('dateFrom'), query.get('dateTo'))})
+
+        # Anything else wasn't recorded
+        return _MakeResponse(url, None, 404)
+
+def SynthesiseMatchday(fixtures: list[tuple[str, str, int, str]], startAt: Optional[datetime] = None, firstKickOff: float = 30 * 60, kickOffGap: float = 0, seed: int = 0, goalsPerMatch: float = 2.8) -> Recording:
+    # Make a recording of a matchday from fixtures of (home team, away team, competition ID, competition name)
+    # with random goals, for use when there's no real recording to hand
+    generator = random.Random(seed)
+    startAt = startAt if startAt is not None else datetime(2022, 5, 1, 11, 0, tzinfo=timezone.utc)
+    records: list[dict[str, Any]] = []
+
+    for matchId, (homeTeam, awayTeam, competitionId, competitionName) in enumerate(fixtures, start=1):
+        kickOff = firstKickOff + (matchId - 1) * kickOffGap
+        matchData: dict[str, Any] = {
+            'id': matchId,
+            'homeTeam': {'name': homeTeam},
+            'awayTeam': {'name': awayTeam},
+            'utcDate': (startAt + timedelta(seconds=kickOff)).strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'stage': 'REGULAR_SEASON',
+            'group': None,
+            'status': MatchStatus.scheduled,
+            'score': {'fullTime': {'homeTeam': None, 'awayTeam': None}},
+            'competition': {'id': competitionId, 'name': competitionName},
+        }
+
+        def Record(at: float, **changes: Any) -> None:
+            # Record a copy of the match with the changes applied
+            matchData.update(changes)
+            records.append({'at': at, 'match': copy.deepcopy(matchData)})
+
+        Record(0.0)
+
+        # The match kicks off, has a fifteen minute break at half time and finishes after 105 minutes, with a little stoppage time
+        halfTime = kickOff + 47 * 60
+        secondHalf = halfTime + 15 * 60
+        fullTime = secondHalf + 48 * 60
+        Record(kickOff, status=MatchStatus.inPlay, score={'fullTime': {'homeTeam': 0, 'awayTeam': 0}})
+
+        # Spread the goals over the playing time
+        goalCount = sum(generator.random() < goalsPerMatch / 20 for _ in range(20))
+        playingTimes = sorted(generator.uniform(0, 95 * 60) for _ in range(goalCount))
+        homeScore = awayScore = 0
+        halfTimeRecorded = False
+
+        for playingTime in playingTimes:
+            if playingTime >= 47 * 60 and not halfTimeRecorded:
+                Record(halfTime, status=MatchStatus.paused)
+                Record(secondHalf, status=MatchStatus.inPlay)
+                halfTimeRecorded = True
+
+            goalAt = kickOff + playingTime if playingTime < 47 * 60 else secondHalf + playingTime - 47 * 60
+            if generator.random() < 0.55:
+                homeScore += 1
+            else:
+                awayScore += 1
+            Record(goalAt, score={'fullTime': {'homeTeam': homeScore, 'awayTeam': awayScore}})
+
+        if not halfTimeRecorded:
+            Record(halfTime, status=MatchStatus.paused)
+            Record(secondHalf, status=MatchStatus.inPlay)
+
+        Record(fullTime, status=MatchStatus.finished)
+
+    return Recording(startAt, sorted(records, key=lambda record: record['at']))
@@ -0,0 +1,160 @@
+from dataclasses import asdict, dataclass
+import hashlib
+import json
+import os
+from pathlib import Path
+import re
+import threading
+import time
+from typing import Optional
+
+from requests import Response
+from requests.structures import CaseInsensitiveDict
+
+import Footy.Log as Log
+
+# Log through the cache subsystem's logger
+log = Log.GetLogger('cache')
+
+# Directory the responses are cached in
+CACHE_DIRECTORY = Path('cache')
+
+# Maximum total size of the cached responses in bytes
+MAX_CACHE_SIZE = 20 * 1024 * 1024
+
+# Freshness rules for each endpoint, the first pattern to match the URL gives the number of
+# seconds a response can be served from disk without checking with the API, live match polls
+# always need the latest data so they're never cached, writing them to disk would save nothing
+FRESHNESS_RULES: list[tuple[re.Pattern[str], float]] = [
+    (re.compile(r'/competitions/\d+/teams'), 24 * 60 * 60),
+    (re.compile(r'/competitions/\d+/standings'), 5 * 60),
+    (re.compile(r'/competitions/\d+/matches'), 10 * 60),
+]
+
+@dataclass
+class CacheEntry:
+    url: str
+    body: str
+    contentType: Optional[str]
+    etag: Optional[str]
+    lastModified: Optional[str]
+    storedAt: float
+
+    def IsFresh(self, maxAge: float) -> bool:
+        return time.time() - self.storedAt < maxAge
+
+    @property
+    def validatorHeaders(self) -> dict[str, str]:
+        # Get the headers needed to make a conditional request for this entry
+        headers: dict[str, str] = {}
+        if self.etag is not None:
+            headers['If-None-Match'] = self.etag
+        if self.lastModified is not None:
+            headers['If-Modified-Since'] = self.lastModified
+        return headers
+
+    def ToResponse(self) -> Response:
+        # Build a response from the cached data, as if it had just been downloaded
+        response = Response()
+        response.status_code = 200
+        response.url = self.url
+        response.encoding = 'utf-8'
+        response._content = self.body.encode('utf-8')
+        response.headers = CaseInsensitiveDict()
+        if self.contentType is not None:
+            response.headers['Content-Type'] = self.contentType
+        return response
+
+class ResponseCache:
+    def __init__(self, directory: Path = CACHE_DIRECTORY, maxSize: int = MAX_CACHE_SIZE, rules: list[tuple[re.Pattern[str], float]] = FRESHNESS_RULES) -> None:
+        self.directory = directory
+        self.maxSize = maxSize
+        self.rules = rules
+
+        self._lock = threading.Lock()
+
+        # Make sure the cache directory exists and work out how big the cache is
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._size = sum(path.stat().st_size for path in self.directory.glob('*.json'))
+
+    def Freshness(self, url: str) -> Optional[float]:
+        # Get the freshness for the URL, None means the URL is not cached
+        for pattern, freshness in self.rules:
+            if pattern.search(url):
+                return freshness
+        return None
+
+    def _PathForUrl(self, url: str) -> Path:
+        return self.directory / f'{hashlib.sha1(url.encode("utf-8")).hexdigest()}.json'
+
+    def Get(self, url: str) -> Optional[CacheEntry]:
+        path = self._PathForUrl(url)
+
+        with self._lock:
+            try:
+                with open(path, 'r', encoding='utf-8') as cacheFile:
+                    entry = CacheEntry(**json.load(cacheFile))
+
+                # Mark the file as recently used so it's evicted last
+                os.utime(path)
+            except (OSError, ValueError, TypeError):
+                return None
+
+        # Guard against a hash collision
+        return entry if entry.url == url else None
+
+    def Put(self, url: str, response: Response) -> None:
+        # Create the entry, keeping the validators for conditional requests
+        entry = CacheEntry(
+            url,
+            response.content.decode('utf-8'),
+            response.headers.get('Content-Type'),
+            response.headers.get('ETag'),
+            response.headers.get('Last-Modified'),
+            time.time(),
+        )
+
+        self._Write(entry)
+
+    def Revalidated(self, entry: CacheEntry) -> None:
+        # The API says the entry is unchanged, so it is fresh again from now
+        entry.storedAt = time.time()
+        self._Write(entry)
+
+    def _Write(self, entry: CacheEntry) -> None:
+        path = self._PathForUrl(entry.url)
+        data = json.dumps(asdict(entry)).encode('utf-8')
+
+        with self._lock:
+            try:
+                oldSize = path.stat().st_size if path.exists() else 0
+
+                # Write to a temporary file and rename it so a crash can't leave a partial entry
+                tempPath = path.with_suffix('.tmp')
+                with open(tempPath, 'wb') as cacheFile:
+                    cacheFile.write(data)
+                os.replace(tempPath, path)
+            except OSError as exception:
+                log.warning('Could not write to the response cache: %s', exception, extra=Log.Every(60))
+                return
+
+            self._size += len(data) - oldSize
+
+            # Evict entries if the cache has grown too big
+            if self._size > self.maxSize:
+                self._Evict()
+
+    def _Evict(self) -> None:
+        # Delete the least recently used entries until the cache is back under 90% of its maximum size
+        paths = sorted(self.directory.glob('*.json'), key=lambda path: path.stat().st_mtime)
+
+        for path in paths:
+            if self._size <= 0.9 * self.maxSize:
+                break
+
+            try:
+                size = path.stat().st_size
+                path.unlink()
+                self._size -= size
+            except OSError:
+                continue
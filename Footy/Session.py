@@ -0,0 +1,140 @@
+from __future__ import annotations
+import asyncio
+import threading
+from typing import Optional, Protocol, TYPE_CHECKING
+import weakref
+
+import requests
+from requests import Response
+from requests.structures import CaseInsensitiveDict
+
+from Footy import GetHeaders
+from Footy.EventLoop import RunSync
+from Footy.RateLimiter import GetRateLimiter, Priority
+from Footy.ResponseCache import CacheEntry, ResponseCache
+
+# aiohttp is only needed for type checking here, it's imported when the first request is made as it's slow to load
+if TYPE_CHECKING:
+    import aiohttp
+
+# Base URL for all football-data.org requests
+BASE_URL = 'https://api.football-data.org/v2'
+
+# Most of a failed response's body to log
+MAX_BODY_LENGTH = 200
+
+# Maximum number of connections in total and to each host, everything goes to football-data.org
+# so a handful of kept alive connections is plenty, with enough for all the followed competitions
+# to be downloaded at the same time, any more requests wait for a connection without needing a thread
+POOL_CONNECTIONS = 20
+POOL_MAXSIZE = 10
+
+# Default (connect, read) timeouts in seconds
+DEFAULT_TIMEOUT = (3.05, 10)
+
+class AsyncSession(Protocol):
+    # Anything which can download from the API without blocking, the shared session or a replay of a recording
+    async def Get(self, url: str, priority: Priority = Priority.NORMAL, maxAge: Optional[float] = None) -> Response: ...
+
+def _MakeResponse(url: str, statusCode: int, headers: CaseInsensitiveDict, body: bytes) -> Response:
+    # Put a downloaded response in a requests response, so it can be used the same way as a cached one
+    response = Response()
+    response.status_code = statusCode
+    response.url = url
+    response.headers = headers
+    response._content = body
+    return response
+
+class FootySession:
+    def __init__(self, responseCache: Optional[ResponseCache] = None, baseUrl: str = BASE_URL, headers: Optional[dict[str, str]] = None) -> None:
+        # Requests to the API are sent to the base URL, which can be pointed at a local server for testing
+        self.baseUrl = baseUrl
+
+        # Send the auth headers with every request
+        self.headers = headers if headers is not None else GetHeaders()
+
+        # An aiohttp session only works on the event loop it was created on, so each loop gets its own on first use
+        self._clientSessions: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, aiohttp.ClientSession] = weakref.WeakKeyDictionary()
+
+        # Share the process wide rate limiter
+        self.rateLimiter = GetRateLimiter()
+
+        # Cache responses on disk so they survive restarts
+        self.responseCache = responseCache if responseCache is not None else ResponseCache()
+
+    def _ClientSession(self) -> aiohttp.ClientSession:
+        # Get the running loop's session, with a pool of connections which are kept alive between requests
+        import aiohttp
+        loop = asyncio.get_running_loop()
+        clientSession = self._clientSessions.get(loop)
+
+        if clientSession is None or clientSession.closed:
+            connector = aiohttp.TCPConnector(limit=POOL_CONNECTIONS, limit_per_host=POOL_MAXSIZE)
+            timeout = aiohttp.ClientTimeout(sock_connect=DEFAULT_TIMEOUT[0], sock_read=DEFAULT_TIMEOUT[1])
+            clientSession = aiohttp.ClientSession(headers=self.headers, connector=connector, timeout=timeout)
+            self._clientSessions[loop] = clientSession
+
+        return clientSession
+
+    async def Get(self, url: str, priority: Priority = Priority.NORMAL, maxAge: Optional[float] = None) -> Response:
+        # Point the request at the chosen server
+        if self.baseUrl != BASE_URL and url.startswith(BASE_URL):
+            url = f'{self.baseUrl}{url[len(BASE_URL):]}'
+
+        # Only endpoints with a freshness rule are cached
+        freshness = self.responseCache.Freshness(url)
+        headers: dict[str, str] = {}
+
+        # Check for a cached copy of the response, reading the disk on a worker thread to keep the event loop free
+        cachedEntry: Optional[CacheEntry] = None
+        if freshness is not None and (cachedEntry := await asyncio.to_thread(self.responseCache.Get, url)) is not None:
+            # If it's fresh enough serve it straight from disk, the caller can ask for fresher data with maxAge
+            if cachedEntry.IsFresh(freshness if maxAge is None else min(freshness, maxAge)):
+                return cachedEntry.ToResponse()
+
+            # Otherwise ask the API to only send the data if it has changed
+            headers = cachedEntry.validatorHeaders
+
+        # Wait for the rate limiter, this raises RateLimitExceeded if the request is shed
+        await self.rateLimiter.AcquireAsync(priority)
+
+        async with self._ClientSession().get(url, headers=headers) as clientResponse:
+            response = _MakeResponse(url, clientResponse.status, CaseInsensitiveDict(clientResponse.headers), await clientResponse.read())
+
+        # Update the rate limiter with the quota the API says is left
+        self.rateLimiter.Update(response.headers, response.status_code)
+
+        # If the data hasn't changed, serve the cached copy and mark it fresh
+        if cachedEntry is not None and response.status_code == requests.codes.not_modified:
+            await asyncio.to_thread(self.responseCache.Revalidated, cachedEntry)
+            return cachedEntry.ToResponse()
+
+        # Cache a good response, again writing on a worker thread
+        if freshness is not None and response.status_code == requests.codes.ok:
+            await asyncio.to_thread(self.responseCache.Put, url, response)
+
+        return response
+
+    async def Close(self) -> None:
+        # Close the running loop's connections
+        if (clientSession := self._clientSessions.pop(asyncio.get_running_loop(), None)) is not None:
+            await clientSession.close()
+
+# The shared session and a lock to make sure only one is ever created
+_session: Optional[FootySession] = None
+_sessionLock = threading.Lock()
+
+def GetSession() -> FootySession:
+    global _session
+
+    # Create the shared session on first use
+    with _sessionLock:
+        if _session is None:
+            _session = FootySession()
+
+    return _session
+
+def CloseSession() -> None:
+    # Close the shared session's connections, which are on the shared event loop, if it was ever created
+    if _session is not None:
+        RunSync(_session.Close())
@@ -0,0 +1,175 @@
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
+from Footy.Elimination import Fixture
+from Footy.Table import Table, TableEntry
+from Footy.TeamData import allTeams
+
+# Number of seasons to simulate
+SIMULATION_RUNS = 100000
+
+# Number of seasons simulated at once, keeps the arrays to a few tens of megabytes
+CHUNK_SIZE = 20000
+
+# Chance of a draw, and how much more likely the home team is to win than an equal away team
+DRAW_PROBABILITY = 0.26
+HOME_ADVANTAGE = 1.3
+
+# Number of places at the top and bottom of the table which count as the top four and relegation
+TOP_PLACES = 4
+RELEGATION_PLACES = 3
+
+@dataclass
+class SimulationResult:
+    # Version of the standings the simulation was run from
+    version: int
+
+    # Number of seasons simulated
+    runs: int
+
+    # Team names in the order of the rows of the probabilities
+    teams: list[str]
+
+    # Probability of each team finishing in each position, one row per team and one column per position
+    positionProbabilities: np.ndarray
+
+    def _Probability(self, team: str, positions: slice) -> float:
+        # Sum the probabilities for the team across the positions, zero for an unknown team
+        if team not in self.teams:
+            return 0.0
+
+        return float(self.positionProbabilities[self.teams.index(team), positions].sum())
+
+    def Title(self, team: str) -> float:
+        return self._Probability(team, slice(0, 1))
+
+    def TopFour(self, team: str) -> float:
+        return self._Probability(team, slice(0, TOP_PLACES))
+
+    def Relegation(self, team: str) -> float:
+        return self._Probability(team, slice(len(self.teams) - RELEGATION_PLACES, len(self.teams)))
+
+    @property
+    def condensedChances(self) -> str:
+        # Percentage chance of each team winning the league, finishing in the top four or being relegated
+        chancesHeader = f'{"Team":11}{"Win":>5}{"Top4":>5}{"Rel":>5}\n'
+        chancesEntries = '\n'.join(
+            f'{allTeams[team]["team"] if team in allTeams else team[:10]:11}{self.Title(team):5.0%}{self.TopFour(team):5.0%}{self.Relegation(team):5.0%}'
+            for team in self.teams
+        )
+        return f'*Chances from {self.runs} simulated seasons*\n```\n{chancesHeader}\n{chancesEntries}\n```'
+
+def _ResultProbabilities(entries: list[TableEntry], teamIndex: dict[str, int], fixtures: list[Fixture]) -> tuple[np.ndarray, np.ndarray]:
+    # Rate each team by its points per game so far, with a floor so that no team can't win
+    pointsPerGame = np.array([entry.Points / entry.Played if entry.Played else 1.0 for entry in entries]) + 0.5
+
+    # Strength of the home and away team in each fixture
+    homeStrength = pointsPerGame[[teamIndex[homeTeam] for homeTeam, _ in fixtures]] * HOME_ADVANTAGE
+    awayStrength = pointsPerGame[[teamIndex[awayTeam] for _, awayTeam in fixtures]]
+
+    # Share the games which aren't draws between the teams in proportion to their strength
+    homeWin = (1 - DRAW_PROBABILITY) * homeStrength / (homeStrength + awayStrength)
+
+    # Return the thresholds for a random number in [0, 1) to be a home win or a draw
+    return homeWin, homeWin + DRAW_PROBABILITY
+
+def _SimulateChunk(basePoints: np.ndarray, tieBreak: np.ndarray, homeIncidence: np.ndarray, awayIncidence: np.ndarray, homeWin: np.ndarray, homeOrDraw: np.ndarray, runs: int, pointsForWin: int, pointsForDraw: int, seed: np.random.SeedSequence) -> np.ndarray:
+    # Count how often each team finishes in each position over the given number of seasons
+    generator = np.random.default_rng(seed)
+    teamCount = len(basePoints)
+    positionCounts = np.zeros((teamCount, teamCount), dtype=np.int64)
+
+    # Points for the home and away team for each result, a home win, a draw or an away win
+    homeResultPoints = np.array([pointsForWin, pointsForDraw, 0], dtype=np.float32)
+    awayResultPoints = np.array([0, pointsForDraw, pointsForWin], dtype=np.float32)
+
+    for start in range(0, runs, CHUNK_SIZE):
+        chunkRuns = min(CHUNK_SIZE, runs - start)
+
+        # Draw a result for every fixture in every season at once
+        draws = generator.random((chunkRuns, len(homeWin)), dtype=np.float32)
+        results = (draws >= homeWin).astype(np.int8) + (draws >= homeOrDraw)
+        homePoints = homeResultPoints[results]
+        awayPoints = awayResultPoints[results]
+
+        # Add up the points for each team, the incidence matrices map each fixture to its home and away team
+        points = basePoints + homePoints @ homeIncidence + awayPoints @ awayIncidence
+
+        # Sort each season on points, then goal difference, then at random
+        sortKey = points * 1e4 + tieBreak + generator.random((chunkRuns, teamCount))
+        order = np.argsort(-sortKey, axis=1)
+
+        # Count the team in each position
+        for position in range(teamCount):
+            positionCounts[:, position] += np.bincount(order[:, position], minlength=teamCount)
+
+    return positionCounts
+
+def Simulate(table: Table, fixtures: list[Fixture], runs: int = SIMULATION_RUNS, processes: int = 1, seed: Optional[int] = None) -> SimulationResult:
+    # Get the teams in table order
+    entries = sorted(table.Entries.values(), key=lambda entry: entry.Position)
+    teams = [entry.TeamName for entry in entries]
+    teamIndex = {team: index for index, team in enumerate(teams)}
+
+    # Only simulate fixtures between teams in the table
+    fixtures = [fixture for fixture in fixtures if fixture[0] in teamIndex and fixture[1] in teamIndex]
+
+    # Current points, and goal difference scaled so it only separates teams level on points
+    basePoints = np.array([entry.Points for entry in entries], dtype=np.float32)
+    tieBreak = np.array([entry.GoalDifference * 10.0 for entry in entries])
+
+    # Matrices mapping each fixture to its home and away team
+    homeIncidence = np.zeros((len(fixtures), len(teams)), dtype=np.float32)
+    awayIncidence = np.zeros((len(fixtures), len(teams)), dtype=np.float32)
+    for index, (homeTeam, awayTeam) in enumerate(fixtures):
+        homeIncidence[index, teamIndex[homeTeam]] = 1
+        awayIncidence[index, teamIndex[awayTeam]] = 1
+
+    # Get the chances of each result in each fixture
+    homeWin, homeOrDraw = _ResultProbabilities(entries, teamIndex, fixtures)
+    homeWin = homeWin.astype(np.float32)
+    homeOrDraw = homeOrDraw.astype(np.float32)
+
+    # Give each process its own random stream and share of the runs
+    seeds = np.random.SeedSequence(seed).spawn(processes)
+    shares = [runs // processes + (1 if index < runs % processes else 0) for index in range(processes)]
+    arguments = [(basePoints, tieBreak, homeIncidence, awayIncidence, homeWin, homeOrDraw, share, table.PointsForWin, table.PointsForDraw, processSeed) for share, processSeed in zip(shares, seeds)]
+
+    if processes > 1:
+        # Run the shares in parallel and add up the counts
+        with ProcessPoolExecutor(processes) as executor:
+            positionCounts = sum(executor.map(_SimulateChunk, *zip(*arguments)))
+    else:
+        positionCounts = _SimulateChunk(*arguments[0])
+
+    return SimulationResult(table.Version, runs, teams, positionCounts / runs)
+
+class Simulator:
+    def __init__(self, runs: int = SIMULATION_RUNS, processes: int = 1) -> None:
+        # Number of seasons to simulate and the number of processes to use
+        self.runs = runs
+        self.processes = processes
+
+        # The last result, reused while the standings version is unchanged
+        self._result: Optional[SimulationResult] = None
+
+        self._lock = threading.Lock()
+
+    def GetResult(self, table: Table) -> Optional[SimulationResult]:
+        # The fixtures are needed to simulate the rest of the season
+        if table.RemainingFixtures is None or not table.Entries:
+            return None
+
+        with self._lock:
+            # Reuse the last result if it was run from the same standings, version 0 is a table that isn't from the cache
+            if self._result is not None and table.Version != 0 and self._result.version == table.Version:
+                return self._result
+
+            # Run the simulation and keep the result for this version of the standings
+            self._result = Simulate(table, table.RemainingFixtures, self.runs, self.processes)
+
+            return self._result
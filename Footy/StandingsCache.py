@@ -0,0 +1,85 @@
+import threading
+import time
+from typing import Optional
+
+from Footy.Session import AsyncSession
+from Footy.Table import Table
+
+# Time in seconds before the standings are refreshed in the background
+STANDINGS_TTL = 15 * 60
+
+class StandingsCache:
+    def __init__(self, ttl: float = STANDINGS_TTL, session: Optional[AsyncSession] = None) -> None:
+        # Time after which the snapshot is refreshed and the session to download it with
+        self.ttl = ttl
+        self.session = session
+
+        # Version of the current snapshot, incremented each time new standings are downloaded
+        self.version = 0
+
+        # The current snapshot and when it was downloaded
+        self._table: Optional[Table] = None
+        self._fetchedAt = 0.0
+
+        # Whether a background refresh is already running, and the age asked for by an invalidate while it was,
+        # as the running refresh may already have got the data from before the change
+        self._refreshing = False
+        self._pendingMaxAge: Optional[float] = None
+
+        self._lock = threading.Lock()
+
+    def GetTable(self) -> Table:
+        with self._lock:
+            table = self._table
+
+            # If the snapshot is out of date refresh it in the background, it can still be served in the meantime
+            if table is not None and time.monotonic() - self._fetchedAt > self.ttl:
+                self._StartRefresh()
+
+        # If there is no snapshot yet there's nothing to serve, so download one now
+        if table is None:
+            table = self.Refresh()
+
+        return table
+
+    def Invalidate(self) -> None:
+        # Mark the snapshot as out of date and refresh it straight away, bypassing the response cache
+        with self._lock:
+            self._fetchedAt = 0.0
+            self._StartRefresh(0)
+
+    def Refresh(self, maxAge: Optional[float] = None) -> Table:
+        # Download the latest standings
+        table = Table(self.session, maxAge)
+
+        with self._lock:
+            # Only replace the snapshot if the download worked
+            if table.Entries:
+                self.version += 1
+                table.Version = self.version
+                self._table = table
+                self._fetchedAt = time.monotonic()
+
+            # Return the latest snapshot, or the failed table if there has never been one
+            return self._table if self._table is not None else table
+
+    def _StartRefresh(self, maxAge: Optional[float] = None) -> None:
+        # Only run one refresh at a time, the lock must be held when this is called
+        if not self._refreshing:
+            self._refreshing = True
+            threading.Thread(target=self._BackgroundRefresh, args=(maxAge,), daemon=True).start()
+        elif maxAge is not None:
+            # Fresher data has been asked for, so refresh again with the smallest age asked for once this one finishes
+            self._pendingMaxAge = maxAge if self._pendingMaxAge is None else min(self._pendingMaxAge, maxAge)
+
+    def _BackgroundRefresh(self, maxAge: Optional[float]) -> None:
+        try:
+            self.Refresh(maxAge)
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+                # Run any refresh asked for while this one was running
+                if self._pendingMaxAge is not None:
+                    pendingMaxAge, self._pendingMaxAge = self._pendingMaxAge, None
+                    self._StartRefresh(pendingMaxAge)
@@ -1,10 +1,22 @@
+from __future__ import annotations
+from array import array
+import asyncio
 from dataclasses import dataclass
 from typing import Any, Optional
 import requests
+from requests import Response
 
-from Footy import HEADERS
+import Footy.Competitions as Competitions
+from Footy.Elimination import CanTeamsWinTheLeague, Fixture
+from Footy.EventLoop import RunSync
+import Footy.Log as Log
+import Footy.MatchStatus as MatchStatus
+from Footy.Session import BASE_URL, MAX_BODY_LENGTH, AsyncSession, GetSession
 from Footy.TeamData import allTeams
 
+# Log through the table subsystem's logger
+log = Log.GetLogger('table')
+
 # Class containing a single entry in the table
 @dataclass
 class TableEntry:
@@ -29,7 +41,7 @@ class TableEntry:
 
 # Class for the full table
 class Table:
-    def __init__(self) -> None:
+    def __init__(self, session: Optional[AsyncSession] = None, maxAge: Optional[float] = None, download: bool = True) -> None:
         # Initialise member variables to safe defaults
         self.Competition: str = 'Error, no competition set'
         self.Entries: dict[str, TableEntry] = {}
@@ -37,23 +49,92 @@ class Table:
         self.PointsForWin = 3
         self.PointsForDraw = 1
 
+        # Version of the standings snapshot, set by the standings cache
+        self.Version = 0
+
+        # The league fixtures still to be played, None if they couldn't be downloaded
+        self.RemainingFixtures: Optional[list[Fixture]] = None
+
+        # Whether each team can still win the league, worked out from the remaining fixtures
+        self._canWinLeague: Optional[dict[str, bool]] = None
+
+        # Index of each team in the answer arrays, in table order
+        self.TeamIndex: dict[str, int] = {}
+
+        # Flattened N x N matrix, entry [a * N + b] is 1 if team a can still finish above team b
+        self._canFinishAbove = bytearray()
+
+        # Per team flags for whether the team can still win the league and whether it has won it
+        self._canWin = bytearray()
+        self._hasWon = bytearray()
+
+        # The team which has won the league, if any
+        self.Winner: Optional[str] = None
+
+        if download:
+            # Download the table, waiting for it on the shared event loop, the shared session is got here
+            # so any problem creating it is raised on this thread rather than the loop's
+            RunSync(self._DownloadAsync(session if session is not None else GetSession(), maxAge))
+
+    @classmethod
+    async def GetTableAsync(cls, session: Optional[AsyncSession] = None, maxAge: Optional[float] = None) -> Table:
+        # Download the table without holding up the event loop
+        table = cls(download=False)
+        await table._DownloadAsync(session if session is not None else GetSession(), maxAge)
+        return table
+
+    async def _DownloadAsync(self, session: AsyncSession, maxAge: Optional[float]) -> None:
         # Get the table data
         try:
-            response = requests.get('http://api.football-data.org/v2/competitions/2021/standings', headers=HEADERS)
+            response = await session.Get(f'{BASE_URL}/competitions/{Competitions.premierLeague}/standings', maxAge=maxAge)
         except:
             # Return in the event of a failure
-            print('Could not download table data')
+            log.warning('Could not download table data', exc_info=True)
             return
 
-        if response.status_code == requests.codes.ok:
-            # If the response is OK (200), parse the table data into entries
-            data = response.json()
-            self._ParseTable(data)
-        else:
+        if response.status_code != requests.codes.ok:
             # Return in the event of a failure
-            print(response.content)
+            log.warning('Table request failed with status %d: %.*s', response.status_code, MAX_BODY_LENGTH, response.text)
             return
 
+        # Get the remaining fixtures, then work out the answers to the table queries once for this snapshot,
+        # on a worker thread as it's too much work to do on the event loop the live matches are polled on
+        fixturesResponse = await self._DownloadFixturesAsync(session, maxAge)
+        await asyncio.to_thread(self._Build, response, fixturesResponse)
+
+    async def _DownloadFixturesAsync(self, session: AsyncSession, maxAge: Optional[float]) -> Optional[Response]:
+        # Get the season's fixtures
+        try:
+            response = await session.Get(f'{BASE_URL}/competitions/{Competitions.premierLeague}/matches', maxAge=maxAge)
+        except:
+            # Without the fixtures the simpler checks are used
+            log.warning('Could not download fixture data', exc_info=True)
+            return None
+
+        if response.status_code != requests.codes.ok:
+            # Without the fixtures the simpler checks are used
+            log.warning('Fixtures request failed with status %d: %.*s', response.status_code, MAX_BODY_LENGTH, response.text)
+            return None
+
+        return response
+
+    def _Build(self, standingsResponse: Response, fixturesResponse: Optional[Response]) -> None:
+        # Parse the table data into entries
+        self._ParseTable(standingsResponse.json())
+
+        if fixturesResponse is not None:
+            # Get the remaining fixtures and work out which teams can still win the league
+            try:
+                self._ParseFixtures(fixturesResponse.json())
+            except (KeyError, TypeError, ValueError):
+                # Without the fixtures the simpler checks are used
+                log.warning('Could not parse fixture data', exc_info=True)
+                self.RemainingFixtures = None
+                self._canWinLeague = None
+
+        # Work out the answers to the table queries
+        self._BuildAnswers()
+
     def _ParseTable(self, data: dict[str, Any]):
         # Get the competition name
         self.Competition = data['competition']['name']
@@ -91,59 +172,84 @@ class Table:
         # Work out how many games in a season for a team now we have the number of teams in the league
         self.MaxGames = 2 * (len(self.Entries) - 1)
 
-    def CanTeamABeatTeamB(self, teamA: str, teamB: str) -> bool:
-        # Check both teams are in the table
-        if teamA in self.Entries and teamB in self.Entries:
-            # If so get their respective entries
-            teamAEntry = self.Entries[teamA]
-            teamBEntry = self.Entries[teamB]
-
-            # Check for the end of the season
-            if teamAEntry.Played == self.MaxGames and teamBEntry.Played == self.MaxGames:
-                # If the season has ended for these two clubs then the position is fixed
-                return teamAEntry.Position < teamBEntry.Position
-
-            # Work out how many points team A can get if they win all remaining games
-            teamAMaxPoints = teamAEntry.Points + (self.PointsForWin * (self.MaxGames - teamAEntry.Played))
-
-            # If this is greater than or equal to the current number of points team B has, then team A can still beat team B
-            return teamAMaxPoints >= teamBEntry.Points
+    def _ParseFixtures(self, data: dict[str, Any]) -> None:
+        # Get the fixtures still to be played between teams in the table
+        self.RemainingFixtures = [
+            (match['homeTeam']['name'], match['awayTeam']['name'])
+            for match in data['matches']
+            if match['status'] in MatchStatus.matchRemainingList and match['homeTeam']['name'] in self.Entries and match['awayTeam']['name'] in self.Entries
+        ]
+
+        if self.RemainingFixtures:
+            # Work out whether each team can still win the league, once for this snapshot of the table
+            points = {teamName: entry.Points for teamName, entry in self.Entries.items()}
+            self._canWinLeague = CanTeamsWinTheLeague(points, self.RemainingFixtures, self.PointsForWin, self.PointsForDraw)
         else:
-            return False
+            # If there are no games left the positions are final
+            self._canWinLeague = {teamName: entry.Position == 1 for teamName, entry in self.Entries.items()}
 
-    def _GetOtherTeamList(self, team: str) -> dict[str, TableEntry]:
-        # Get a copy of the entries
-        otherTeamList = dict(self.Entries)
+    def _BuildAnswers(self) -> None:
+        # Put the teams in table order and get their points and games played as compact arrays
+        teams = list(self.Entries)
+        teamCount = len(teams)
+        self.TeamIndex = {team: index for index, team in enumerate(teams)}
+        position = array('i', (entry.Position for entry in self.Entries.values()))
+        points = array('i', (entry.Points for entry in self.Entries.values()))
+        played = array('i', (entry.Played for entry in self.Entries.values()))
 
-        # Remove the current team from the copy of the entries
-        otherTeamList.pop(team)
+        # The most points each team can get if they win all their remaining games
+        maxPoints = array('i', (points[index] + self.PointsForWin * (self.MaxGames - played[index]) for index in range(teamCount)))
 
-        # Return the list of teams minus the current team
-        return otherTeamList
+        # Work out whether each team can still finish above each other team
+        self._canFinishAbove = bytearray(teamCount * teamCount)
+        for teamA in range(teamCount):
+            row = teamA * teamCount
+            for teamB in range(teamCount):
+                if played[teamA] == self.MaxGames and played[teamB] == self.MaxGames:
+                    # If the season has ended for these two clubs then the position is fixed
+                    self._canFinishAbove[row + teamB] = position[teamA] < position[teamB]
+                else:
+                    # If team A's maximum is at least team B's current points, then team A can still beat team B
+                    self._canFinishAbove[row + teamB] = maxPoints[teamA] >= points[teamB]
 
-    def CanTeamWinTheLeague(self, team: str) -> bool:
-        # Get a list of the other teams
-        otherTeamList = self._GetOtherTeamList(team)
+        # Work out whether each team can still win the league and whether it has already won it
+        if self._canWinLeague is not None:
+            # Use the answer worked out from the remaining fixtures, a team has won if no other team can still win
+            self._canWin = bytearray(self._canWinLeague.get(team, False) for team in teams)
+            winnerCount = sum(self._canWin)
+            self._hasWon = bytearray(self._canWin[index] and winnerCount == 1 for index in range(teamCount))
+        else:
+            # Otherwise a team can win if it can beat all other teams, and has won if no other team can beat it
+            self._canWin = bytearray(
+                all(self._canFinishAbove[team * teamCount + otherTeam] for otherTeam in range(teamCount) if otherTeam != team)
+                for team in range(teamCount)
+            )
+            self._hasWon = bytearray(
+                not any(self._canFinishAbove[otherTeam * teamCount + team] for otherTeam in range(teamCount) if otherTeam != team)
+                for team in range(teamCount)
+            )
 
-        # If team can still beat all other teams then it can win the league
-        return all(self.CanTeamABeatTeamB(team, otherTeam) for otherTeam in otherTeamList)
+        # Get the first team which has won the league
+        self.Winner = next((team for team, index in self.TeamIndex.items() if self._hasWon[index]), None)
 
-    def HasTeamWonTheLeague(self, team: str) -> bool:
-        # Get a list of the other teams
-        otherTeamList = self._GetOtherTeamList(team)
+    def CanTeamABeatTeamB(self, teamA: str, teamB: str) -> bool:
+        # Look up the answer if both teams are in the table
+        if teamA in self.TeamIndex and teamB in self.TeamIndex:
+            return bool(self._canFinishAbove[self.TeamIndex[teamA] * len(self.TeamIndex) + self.TeamIndex[teamB]])
+        else:
+            return False
+
+    def CanTeamWinTheLeague(self, team: str) -> bool:
+        # Look up the answer, a team not in the table can't win it
+        return team in self.TeamIndex and bool(self._canWin[self.TeamIndex[team]])
 
-        # If no other team can beat the current one then they have won the leage
-        return not any(self.CanTeamABeatTeamB(otherTeam, team) for otherTeam in otherTeamList)
+    def HasTeamWonTheLeague(self, team: str) -> bool:
+        # Look up the answer, a team not in the table can't have won it
+        return team in self.TeamIndex and bool(self._hasWon[self.TeamIndex[team]])
 
     def HasAnyTeamWonTheLeague(self) -> Optional[str]:
-        # Loop through all the teams
-        for team in self.Entries:
-            # If a team has won the league return that team name
-            if self.HasTeamWonTheLeague(team):
-                return team
-
-        # Return None if no team has won the league
-        return None
+        # Return the team which has won the league, or None if no team has won it yet
+        return self.Winner
 
     @property
     def condensedTable(self) -> str:
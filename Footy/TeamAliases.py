@@ -0,0 +1,166 @@
+from dataclasses import dataclass
+import re
+from typing import Any, Optional
+
+from Footy.TeamData import allTeams
+
+# Tokens shorter than this are only matched exactly, short words are too easily mistaken for each other
+FUZZY_MIN_LENGTH = 5
+
+# Characters which are dropped when normalising text, anything else which isn't a letter or digit separates words
+_dropPattern = re.compile(r"[.'’]")
+_separatorPattern = re.compile(r'[^a-z0-9]+')
+
+def Normalise(text: str) -> list[str]:
+    # Lower case the text, spell out ampersands, drop apostrophes and full stops and split into words
+    text = _dropPattern.sub('', text.lower().replace('&', ' and '))
+    return [token for token in _separatorPattern.split(text) if token]
+
+def _Deletions(token: str) -> set[str]:
+    # The token and every string made by deleting one character from it
+    return {token} | {token[:index] + token[index + 1:] for index in range(len(token))}
+
+def _WithinOneEdit(tokenA: str, tokenB: str) -> bool:
+    # Check the tokens differ by at most one insertion, deletion, substitution or swap of adjacent characters
+    if tokenA == tokenB:
+        return True
+
+    if abs(len(tokenA) - len(tokenB)) > 1:
+        return False
+
+    # Skip the common prefix
+    index = 0
+    while index < min(len(tokenA), len(tokenB)) and tokenA[index] == tokenB[index]:
+        index += 1
+
+    # What's left after the first difference must match once one edit is made
+    return (
+        tokenA[index + 1:] == tokenB[index + 1:]
+        or tokenA[index + 1:] == tokenB[index:]
+        or tokenA[index:] == tokenB[index + 1:]
+        or (tokenA[index:index + 2] == tokenB[index:index + 2][::-1] and tokenA[index + 2:] == tokenB[index + 2:])
+    )
+
+@dataclass
+class TeamMention:
+    # The full team name and the words of the message it was found in, end is one past the last word
+    team: str
+    start: int
+    end: int
+
+class _TrieNode:
+    __slots__ = ('children', 'team', 'fuzzyIndex')
+
+    def __init__(self) -> None:
+        # The next word of each alias passing through this node, and the team whose alias ends here
+        self.children: dict[str, _TrieNode] = {}
+        self.team: Optional[str] = None
+
+        # The words of the children with one character deleted, used to find words with a typo
+        self.fuzzyIndex: dict[str, list[str]] = {}
+
+    def Child(self, token: str) -> Optional['_TrieNode']:
+        # Try an exact match first
+        if (child := self.children.get(token)) is not None:
+            return child
+
+        if len(token) < FUZZY_MIN_LENGTH:
+            return None
+
+        # Otherwise find the words a single edit away, only accepting the match if there's exactly one
+        candidates = {word for deletion in _Deletions(token) for word in self.fuzzyIndex.get(deletion, ()) if _WithinOneEdit(token, word)}
+        if len(candidates) == 1:
+            return self.children[candidates.pop()]
+
+        return None
+
+class TeamAliasIndex:
+    def __init__(self, teams: dict[str, dict[str, Any]] = allTeams) -> None:
+        # Get every alias for each team, with the team it refers to
+        aliasTeams: dict[tuple[str, ...], set[str]] = {}
+        for teamName, teamData in teams.items():
+            for alias in self._Aliases(teamName, teamData):
+                aliasTeams.setdefault(tuple(Normalise(alias)), set()).add(teamName)
+
+        # Build a trie of the aliases word by word, leaving out any alias shared by more than one team
+        self._root = _TrieNode()
+        for words, aliasTeamNames in aliasTeams.items():
+            if len(aliasTeamNames) != 1 or not words:
+                continue
+
+            node = self._root
+            for word in words:
+                node = node.children.setdefault(word, _TrieNode())
+            node.team = next(iter(aliasTeamNames))
+
+        # Index the words at each node for matching typos
+        nodes = [self._root]
+        while nodes:
+            node = nodes.pop()
+            for word, child in node.children.items():
+                if len(word) >= FUZZY_MIN_LENGTH:
+                    for deletion in _Deletions(word):
+                        node.fuzzyIndex.setdefault(deletion, []).append(word)
+                nodes.append(child)
+
+    @staticmethod
+    def _Aliases(teamName: str, teamData: dict[str, Any]) -> list[str]:
+        # The full name, the full name without FC or AFC, the short name, the short name as one word and any other aliases
+        shortName = teamData['team']
+        return [
+            teamName,
+            re.sub(r'^AFC |\s*A?FC$', '', teamName),
+            shortName,
+            shortName.replace(' ', ''),
+            *teamData.get('aliases', []),
+        ]
+
+    def FindTeams(self, tokens: list[str]) -> list[TeamMention]:
+        # Find the team mentions in one pass over the words, taking the longest alias at each point
+        mentions: list[TeamMention] = []
+        start = 0
+
+        while start < len(tokens):
+            # Walk the trie from this word, remembering the last point an alias ended
+            node = self._root
+            match: Optional[TeamMention] = None
+            for index in range(start, len(tokens)):
+                if (node := node.Child(tokens[index])) is None:
+                    break
+                if node.team is not None:
+                    match = TeamMention(node.team, start, index + 1)
+
+            # Skip over the alias if one was found, otherwise move on a word
+            if match is not None:
+                mentions.append(match)
+                start = match.end
+            else:
+                start += 1
+
+        return mentions
+
+    def Resolve(self, text: str) -> Optional[str]:
+        # Get the team if the text is exactly one team name
+        tokens = Normalise(text)
+        mentions = self.FindTeams(tokens)
+        if len(mentions) == 1 and mentions[0].start == 0 and mentions[0].end == len(tokens):
+            return mentions[0].team
+
+        return None
+
+    def Parse(self, text: str) -> list[str | TeamMention]:
+        # Split the text into words with each team mention replaced by a TeamMention, ready to be matched against
+        tokens = Normalise(text)
+        parsed: list[str | TeamMention] = []
+        position = 0
+
+        for mention in self.FindTeams(tokens):
+            parsed.extend(tokens[position:mention.start])
+            parsed.append(mention)
+            position = mention.end
+
+        parsed.extend(tokens[position:])
+        return parsed
+
+# The index for all of the teams, compiled once when first imported
+teamAliasIndex = TeamAliasIndex()
@@ -1,9 +1,10 @@
-# Map team names and stadiums
+# Map team names and stadiums, along with the other names the teams are known by
 myTeamMapping = {
     'Manchester City FC': {
         'team': 'Man City',
         'ground': 'the City of Manchester Stadium',
         'name': 'Mani',
+        'aliases': ['man city', 'city', 'manchester city', 'mcfc', 'citeh'],
     },
 }
 
@@ -12,16 +13,19 @@ supportedTeamMapping = {
         'team': 'Tottenham',
         'ground': "Tottenham Hotspur Sainsbury's NFL Superstore",
         'name': 'Thommo',
+        'aliases': ['spurs', 'tottenham hotspur', 'thfc'],
     },
     'Chelsea FC': {
         'team': 'Chelsea',
         'ground': 'Stamford Bridge',
         'name': 'Tim',
+        'aliases': ['cfc', 'chelsea fc'],
     },
     'Liverpool FC': {
         'team': 'Liverpool',
         'ground': 'Anfield',
         'name': 'Stevie',
+        'aliases': ['lfc', 'the reds', 'reds'],
     },
 }
 
@@ -30,96 +34,115 @@ unsupportedTeamMapping = {
         'team': 'Brighton',
         'ground': 'the Amex',
         'name': 'Dean',
+        'aliases': ['brighton and hove albion', 'seagulls', 'bhafc'],
     },
     'Arsenal FC': {
         'team': 'Arsenal',
         'ground': 'the Emirates',
         'name': '',
+        'aliases': ['gunners', 'gooners', 'the arsenal'],
     },
     'Aston Villa FC': {
         'team': 'Villa',
         'ground': 'Villa Park',
         'name': '',
+        'aliases': ['aston villa', 'avfc'],
     },
     'Everton FC': {
         'team': 'Everton',
         'ground': 'Goodison',
         'name': '',
+        'aliases': ['toffees', 'efc'],
     },
     'Manchester United FC': {
         'team': 'Man United',
         'ground': 'Old  Trafford',
         'name': '',
+        'aliases': ['man utd', 'man u', 'manchester united', 'united', 'utd', 'mufc'],
     },
     'Newcastle United FC': {
         'team': 'Newcastle',
         'ground': "St James's Park",
         'name': '',
+        'aliases': ['newcastle united', 'toon', 'magpies', 'nufc'],
     },
     'Norwich City FC': {
         'team': 'Norwich',
         'ground': 'Carrow Road',
         'name': '',
+        'aliases': ['norwich city', 'canaries', 'ncfc'],
     },
     'Wolverhampton Wanderers FC': {
         'team': 'Wolves',
         'ground': 'Molineux',
         'name': '',
+        'aliases': ['wolverhampton', 'wolverhampton wanderers'],
     },
     'Burnley FC': {
         'team': 'Burnley',
         'ground': 'Turf Moor',
         'name': '',
+        'aliases': ['clarets'],
     },
     'Leicester City FC': {
         'team': 'Leicester',
         'ground': 'the King Power Stadium',
         'name': '',
+        'aliases': ['leicester city', 'foxes', 'lcfc'],
     },
     'Southampton FC': {
         'team': 'Southampton',
         'ground': "St Mary's",
         'name': '',
+        'aliases': ['saints', 'soton'],
     },
     'Leeds United FC': {
         'team': 'Leeds',
         'ground': 'Elland Road',
         'name': '',
+        'aliases': ['leeds united', 'leeds utd', 'lufc'],
     },
     'Watford FC': {
         'team': 'Watford',
         'ground': 'Vicarage Road',
         'name': '',
+        'aliases': ['hornets'],
     },
     'Crystal Palace FC': {
         'team': 'Palace',
         'ground': 'Selhurst Park',
         'name': '',
+        'aliases': ['crystal palace', 'eagles', 'cpfc'],
     },
     'Brentford FC': {
         'team': 'Brentford',
         'ground': 'the Brentford Community Stadium',
         'name': '',
+        'aliases': ['bees'],
     },
     'West Ham United FC': {
         'team': 'West Ham',
         'ground': 'the London Stadium',
         'name': '',
+        'aliases': ['west ham united', 'hammers', 'irons', 'whufc'],
     },
     'Fulham FC': {
         'team': 'Fulham',
         'ground': 'Craven Cottage',
         'name': '',
+        'aliases': ['cottagers'],
     },
     'AFC Bournemouth': {
         'team': 'Bournemouth',
         'ground': 'Vitality Stadium',
         'name': '',
+        'aliases': ['afc bournemouth', 'cherries'],
     },
     'Nottingham Forest FC': {
         'team': 'Forest',
         'ground': 'the Nottingham Forest Football Club',
         'name': '',
+        'aliases': ['nottingham forest', 'nottm forest', 'nffc'],
     },
 }
 
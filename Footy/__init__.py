@@ -1,14 +1,36 @@
-import sys
 from pathlib import Path
+from typing import Any, Optional
 
-# Try to read the api key from the secret file
-try:
-    with open(Path('football_api_token.txt'), 'r', encoding='utf-8') as secretFile:
-        api_key = secretFile.read()
-except:
-    # If this fails there's nothing we can do, so exit
-    print('No football_api_token.txt file found')
-    sys.exit()
-
-# Set the headers to include the api key
-HEADERS = { 'X-Auth-Token': api_key }
+class MissingTokenError(Exception):
+    # Raised when the football-data token file can't be read, there's no way to use the API without it
+    pass
+
+# The headers including the api key, these are read from the secret file the first time they are needed
+_headers: Optional[dict[str, str]] = None
+
+def GetHeaders() -> dict[str, str]:
+    global _headers
+
+    if _headers is None:
+        # Try to read the api key from the secret file
+        try:
+            with open(Path('football_api_token.txt'), 'r', encoding='utf-8') as secretFile:
+                api_key = secretFile.read()
+        except OSError as error:
+            # If this fails there's nothing we can do, so let the caller decide whether to stop,
+            # this may be on the shared event loop's thread where exiting would leave everything waiting on it
+            from Footy.Log import GetLogger
+            GetLogger('footy').critical('No football_api_token.txt file found')
+            raise MissingTokenError('No football_api_token.txt file found') from error
+
+        # Set the headers to include the api key
+        _headers = { 'X-Auth-Token': api_key }
+
+    return _headers
+
+def __getattr__(name: str) -> Any:
+    # Keep HEADERS available as a module attribute without reading the token at import
+    if name == 'HEADERS':
+        return GetHeaders()
+
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
@@ -0,0 +1,269 @@
+from __future__ import annotations
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+import heapq
+import queue
+import threading
+import time
+from typing import Iterable, Optional, TYPE_CHECKING
+
+import Footy.Log as Log
+import Footy.Metrics as Metrics
+
+# The telegram types are only needed for type checking, the errors are imported when the workers start
+if TYPE_CHECKING:
+    from telegram import Bot
+
+# Log through the broadcaster subsystem's logger
+log = Log.GetLogger('broadcaster')
+
+# Telegram allows about 30 messages a second across all chats
+GLOBAL_MESSAGES_PER_SECOND = 30
+
+# Minimum seconds between messages to the same chat, groups are limited to 20 messages a minute
+PRIVATE_CHAT_INTERVAL = 1.0
+GROUP_CHAT_INTERVAL = 3.0
+
+# Number of worker threads, each chat is always sent from the same worker so its messages stay in order
+WORKER_COUNT = 4
+
+# Number of times a message is retried after a flood control or network error before it's dropped
+MAX_RETRIES = 5
+
+# Seconds to wait before retrying after a network error, doubled for each retry
+NETWORK_RETRY_DELAY = 1.0
+
+@dataclass
+class OutgoingMessage:
+    chatId: int
+    text: str
+    retries: int = 0
+    queuedAt: float = field(default_factory=time.monotonic)
+
+    # When the event the message is about happened, used to measure the whole delay to the chat
+    eventTime: Optional[datetime] = None
+
+class _TokenBucket:
+    def __init__(self, rate: float) -> None:
+        # The bucket holds a second's worth of messages and refills at the given rate
+        self.capacity = rate
+        self.rate = rate
+        self.tokens = rate
+        self._lastRefill = time.monotonic()
+
+        # Time before which nothing can be sent, set when Telegram asks us to back off
+        self.pausedUntil = 0.0
+
+        self._lock = threading.Lock()
+
+    def Take(self) -> float:
+        # Take a token if one is available and return 0, otherwise return the time to wait for one
+        with self._lock:
+            now = time.monotonic()
+
+            if now < self.pausedUntil:
+                return self.pausedUntil - now
+
+            self.tokens = min(self.capacity, self.tokens + (now - self._lastRefill) * self.rate)
+            self._lastRefill = now
+
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+
+            return (1 - self.tokens) / self.rate
+
+    def Pause(self, seconds: float) -> None:
+        # Stop all sending for the given time
+        with self._lock:
+            self.pausedUntil = max(self.pausedUntil, time.monotonic() + seconds)
+
+class _Worker(threading.Thread):
+    def __init__(self, broadcaster: Broadcaster, index: int) -> None:
+        super().__init__(name=f'Broadcaster-{index}', daemon=True)
+        self.broadcaster = broadcaster
+
+        # Messages handed to this worker, None tells it to stop
+        self.inbox: queue.SimpleQueue[Optional[OutgoingMessage]] = queue.SimpleQueue()
+
+        # Messages waiting for each chat, and a heap of when each waiting chat can next be sent to
+        self._pending: dict[int, deque[OutgoingMessage]] = {}
+        self._readyHeap: list[tuple[float, int]] = []
+
+        # Time each chat can next be sent to
+        self._nextSend: dict[int, float] = {}
+
+    def _Queue(self, message: OutgoingMessage) -> None:
+        # Add the message to its chat's queue, scheduling the chat if it wasn't already waiting
+        if message.chatId not in self._pending:
+            self._pending[message.chatId] = deque()
+            heapq.heappush(self._readyHeap, (self._nextSend.get(message.chatId, 0.0), message.chatId))
+
+        self._pending[message.chatId].append(message)
+
+    def run(self) -> None:
+        # Import the telegram errors now the worker is running
+        from telegram.error import NetworkError, RetryAfter, TelegramError
+
+        stopping = False
+
+        while not stopping or self._pending:
+            # Wait for new messages until the next chat is ready to send to
+            timeout = max(self._readyHeap[0][0] - time.monotonic(), 0.0) if self._readyHeap else None
+
+            try:
+                message = self.inbox.get(timeout=timeout) if not stopping else self.inbox.get_nowait()
+            except queue.Empty:
+                message = None
+            else:
+                if message is None:
+                    stopping = True
+
+            # Take everything that has arrived
+            while message is not None:
+                self._Queue(message)
+                try:
+                    message = self.inbox.get_nowait()
+                except queue.Empty:
+                    message = None
+                else:
+                    if message is None:
+                        stopping = True
+
+            # Get the next chat if it's ready
+            if not self._readyHeap or self._readyHeap[0][0] > time.monotonic():
+                if stopping and self._readyHeap:
+                    time.sleep(max(self._readyHeap[0][0] - time.monotonic(), 0.0))
+                continue
+
+            readyAt, chatId = heapq.heappop(self._readyHeap)
+
+            # Wait for the global limit
+            while (wait := self.broadcaster.globalLimit.Take()) > 0:
+                time.sleep(wait)
+
+            pending = self._pending[chatId]
+            outgoing = pending[0]
+            interval = GROUP_CHAT_INTERVAL if chatId < 0 else PRIVATE_CHAT_INTERVAL
+
+            try:
+                with Metrics.sendTime.Time():
+                    self.broadcaster.bot.send_message(chat_id=chatId, text=outgoing.text)
+            except RetryAfter as error:
+                # Flood control, wait for as long as Telegram asks before sending anything else
+                log.warning('Flood control sending to %d, retrying in %ss', chatId, error.retry_after, extra=Log.Every(10))
+                self.broadcaster.globalLimit.Pause(error.retry_after)
+                interval = max(interval, error.retry_after)
+                self._Retry(outgoing, pending)
+            except NetworkError as error:
+                # Network problems are retried with a growing delay, the message stays at the front of the queue
+                log.warning('Network error sending to %d: %s', chatId, error, extra=Log.Every(10))
+                interval = max(interval, NETWORK_RETRY_DELAY * 2 ** outgoing.retries)
+                self._Retry(outgoing, pending)
+            except TelegramError as error:
+                # Anything else, e.g. the bot being removed from the chat, won't succeed if retried
+                log.warning('Could not send to %d: %s', chatId, error)
+                pending.popleft()
+                self.broadcaster._Dropped()
+            except Exception:
+                # Any other error is a bug rather than a problem with Telegram, drop the message so the worker carries on
+                # sending to the rest of its chats
+                log.exception('Unexpected error sending to %d', chatId)
+                Metrics.sendErrors.Inc()
+                pending.popleft()
+                self.broadcaster._Dropped()
+            else:
+                pending.popleft()
+                self.broadcaster._Sent(outgoing)
+
+            # Reschedule the chat if it has more to send
+            self._nextSend[chatId] = time.monotonic() + interval
+            if pending:
+                heapq.heappush(self._readyHeap, (self._nextSend[chatId], chatId))
+            else:
+                del self._pending[chatId]
+
+    def _Retry(self, outgoing: OutgoingMessage, pending: deque[OutgoingMessage]) -> None:
+        # Retry the message unless it has run out of retries
+        outgoing.retries += 1
+        self.broadcaster._Retried()
+
+        if outgoing.retries > MAX_RETRIES:
+            log.error('Giving up sending to %d after %d retries', outgoing.chatId, MAX_RETRIES)
+            pending.popleft()
+            self.broadcaster._Dropped()
+
+class Broadcaster:
+    def __init__(self, bot: Bot, workerCount: int = WORKER_COUNT, messagesPerSecond: float = GLOBAL_MESSAGES_PER_SECOND) -> None:
+        # The bot to send with and the limit shared by all the workers
+        self.bot = bot
+        self.globalLimit = _TokenBucket(messagesPerSecond)
+
+        # Counts of messages sent, retried and dropped, and the total time sent messages spent queued
+        self.sentCount = 0
+        self.retryCount = 0
+        self.droppedCount = 0
+        self.totalDelay = 0.0
+        self._queuedCount = 0
+
+        self._lock = threading.Lock()
+
+        # Start the workers
+        self._workers = [_Worker(self, index) for index in range(workerCount)]
+        for worker in self._workers:
+            worker.start()
+
+    @property
+    def queueDepth(self) -> int:
+        # Number of messages waiting to be sent
+        with self._lock:
+            return self._queuedCount
+
+    def Send(self, chatId: int, text: str, eventTime: Optional[datetime] = None) -> None:
+        # Hand the message to the chat's worker, this never blocks
+        with self._lock:
+            self._queuedCount += 1
+
+        self._workers[hash(chatId) % len(self._workers)].inbox.put(OutgoingMessage(chatId, text, eventTime=eventTime))
+
+    def Broadcast(self, chatIds: Iterable[int], text: str, eventTime: Optional[datetime] = None) -> None:
+        # Queue the message for each chat
+        for chatId in chatIds:
+            self.Send(chatId, text, eventTime)
+
+    def Stop(self, timeout: Optional[float] = None) -> None:
+        # Tell the workers to stop once their queues are empty and wait for them
+        for worker in self._workers:
+            worker.inbox.put(None)
+
+        for worker in self._workers:
+            worker.join(timeout)
+
+    def _Sent(self, outgoing: OutgoingMessage) -> None:
+        delay = time.monotonic() - outgoing.queuedAt
+
+        with self._lock:
+            self.sentCount += 1
+            self._queuedCount -= 1
+            self.totalDelay += delay
+
+        Metrics.messagesSent.Inc()
+        Metrics.queueDelay.Observe(delay)
+
+        # Measure the whole delay from the event to the message reaching the chat
+        if outgoing.eventTime is not None:
+            Metrics.goalToMessage.Observe((datetime.now(timezone.utc) - outgoing.eventTime).total_seconds())
+
+    def _Retried(self) -> None:
+        with self._lock:
+            self.retryCount += 1
+
+        Metrics.messagesRetried.Inc()
+
+    def _Dropped(self) -> None:
+        with self._lock:
+            self.droppedCount += 1
+            self._queuedCount -= 1
+
+        Metrics.messagesDropped.Inc()
@@ -0,0 +1,47 @@
+from __future__ import annotations
+from datetime import datetime
+from typing import Iterable, Optional
+
+from Messaging.PubSub import Event, PubSubServer
+
+# The ways the bot can be run, all in one process, or as a leader polling the API for worker processes sending the messages
+SINGLE = 'single'
+LEADER = 'leader'
+WORKER = 'worker'
+
+def WorkerFor(chatId: int, workerCount: int) -> int:
+    # Each chat is always sent to by the same worker so its messages stay in order
+    return chatId % workerCount
+
+def MessageEvent(text: str, chatIds: list[int], eventTime: Optional[datetime] = None) -> Event:
+    return {'type': 'message', 'text': text, 'chatIds': chatIds, 'eventTime': eventTime.isoformat() if eventTime is not None else None}
+
+def SubscriptionEvent(record: dict) -> Event:
+    return {'type': 'subscription', 'record': record}
+
+def StandingsChangedEvent() -> Event:
+    return {'type': 'standings'}
+
+class ClusterBroadcaster:
+    def __init__(self, server: PubSubServer, workerCount: int) -> None:
+        # Stands in for the Broadcaster in the leader, passing each message to the workers owning the chats
+        self.server = server
+        self.workerCount = workerCount
+
+    @property
+    def queueDepth(self) -> int:
+        # Number of events waiting for workers to connect
+        return self.server.bufferedCount
+
+    def Broadcast(self, chatIds: Iterable[int], text: str, eventTime: Optional[datetime] = None) -> None:
+        # Split the chats between the workers, so each worker only gets its own chats
+        shards: dict[int, list[int]] = {}
+        for chatId in chatIds:
+            shards.setdefault(WorkerFor(chatId, self.workerCount), []).append(chatId)
+
+        for index, shardChatIds in shards.items():
+            self.server.SendTo(index, MessageEvent(text, shardChatIds, eventTime))
+
+    def Stop(self, timeout: Optional[float] = None) -> None:
+        # Send anything still queued to the workers
+        self.server.Close(timeout)
@@ -0,0 +1,309 @@
+from __future__ import annotations
+from collections import deque
+import json
+import os
+from pathlib import Path
+import queue
+import socket
+import threading
+from typing import Any, Callable, Optional
+
+import Footy.Log as Log
+
+# Log through the pubsub subsystem's logger
+log = Log.GetLogger('pubsub')
+
+# Unix socket the leader listens on, this is excluded from git
+SOCKET_FILE = Path('banterbot.sock')
+
+# Seconds between attempts to connect to the leader
+RECONNECT_DELAY = 1.0
+
+# Events kept for a worker which isn't connected, the oldest are dropped after this
+MAX_BUFFERED_EVENTS = 1000
+
+# Events are JSON objects with a type field, sent one per line
+Event = dict[str, Any]
+
+def _Encode(event: Event) -> bytes:
+    return f'{json.dumps(event, separators=(",", ":"))}\n'.encode('utf-8')
+
+class _Connection:
+    def __init__(self, connectionSocket: socket.socket, onEvent: Callable[[_Connection, Event], None], onClose: Callable[[_Connection], None]) -> None:
+        self.socket = connectionSocket
+        self._onEvent = onEvent
+        self._onClose = onClose
+
+        # The worker at the other end, set once it has said hello
+        self.index: Optional[int] = None
+
+        # Encoded events waiting to be sent, None tells the sender to stop
+        self._outbox: queue.SimpleQueue[Optional[bytes]] = queue.SimpleQueue()
+
+        self._closed = threading.Event()
+        self._lock = threading.Lock()
+
+        # Send and receive on threads of their own so a slow peer never holds up the caller
+        threading.Thread(target=self._SendLoop, name='PubSubSender', daemon=True).start()
+        threading.Thread(target=self._ReadLoop, name='PubSubReader', daemon=True).start()
+
+    @property
+    def closed(self) -> bool:
+        return self._closed.is_set()
+
+    def Send(self, event: Event) -> None:
+        self.SendEncoded(_Encode(event))
+
+    def SendEncoded(self, data: bytes) -> None:
+        if not self.closed:
+            self._outbox.put(data)
+
+    def WaitUntilClosed(self, timeout: Optional[float] = None) -> bool:
+        return self._closed.wait(timeout)
+
+    def _SendLoop(self) -> None:
+        while (data := self._outbox.get()) is not None:
+            # Send everything waiting in one go
+            batch = [data]
+            while True:
+                try:
+                    if (data := self._outbox.get_nowait()) is None:
+                        break
+                    batch.append(data)
+                except queue.Empty:
+                    break
+
+            try:
+                self.socket.sendall(b''.join(batch))
+            except OSError as error:
+                log.warning('Could not send events: %s', error)
+                break
+
+            # A None taken with the batch means stop
+            if data is None:
+                break
+
+        self.Close()
+
+    def _ReadLoop(self) -> None:
+        try:
+            with self.socket.makefile('rb') as reader:
+                for line in reader:
+                    try:
+                        event = json.loads(line)
+                    except ValueError:
+                        log.warning('Skipping corrupt event: %r', line[:200])
+                        continue
+                    self._onEvent(self, event)
+        except OSError:
+            # The socket was closed
+            pass
+
+        self.Close()
+
+    def Close(self) -> None:
+        # Close once, from whichever thread notices first
+        with self._lock:
+            if self.closed:
+                return
+            self._closed.set()
+
+        self._outbox.put(None)
+        try:
+            self.socket.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.socket.close()
+        self._onClose(self)
+
+    def Flush(self, timeout: Optional[float] = None) -> None:
+        # Stop once everything queued has been sent
+        self._outbox.put(None)
+        self.WaitUntilClosed(timeout)
+
+class PubSubServer:
+    def __init__(
+        self,
+        path: Path = SOCKET_FILE,
+        onEvent: Optional[Callable[[int, Event], None]] = None,
+        onWorkerConnected: Optional[Callable[[int], None]] = None,
+        onWorkerDisconnected: Optional[Callable[[int], None]] = None,
+    ) -> None:
+        # Callbacks for events from workers and for workers coming and going
+        self.path = path
+        self._onEvent = onEvent
+        self._onWorkerConnected = onWorkerConnected
+        self._onWorkerDisconnected = onWorkerDisconnected
+
+        # The connection to each worker, and events waiting for workers which aren't connected
+        self._workers: dict[int, _Connection] = {}
+        self._buffers: dict[int, deque[bytes]] = {}
+        self._lock = threading.Lock()
+
+        # Remove the socket left by a previous run, then listen for workers
+        self.path.unlink(missing_ok=True)
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._socket.bind(os.fspath(self.path))
+        self._socket.listen()
+
+        threading.Thread(target=self._AcceptLoop, name='PubSubAccept', daemon=True).start()
+
+    @property
+    def connectedWorkers(self) -> frozenset[int]:
+        with self._lock:
+            return frozenset(self._workers)
+
+    @property
+    def bufferedCount(self) -> int:
+        # Number of events waiting for workers to connect
+        with self._lock:
+            return sum(len(buffer) for buffer in self._buffers.values())
+
+    def _AcceptLoop(self) -> None:
+        while True:
+            try:
+                connectionSocket, _ = self._socket.accept()
+            except OSError:
+                # The server has been closed
+                return
+
+            _Connection(connectionSocket, self._Received, self._Closed)
+
+    def _Received(self, connection: _Connection, event: Event) -> None:
+        if event.get('type') == 'hello':
+            # A worker has connected, replacing any earlier connection it had
+            index = int(event['worker'])
+            with self._lock:
+                oldConnection = self._workers.get(index)
+                connection.index = index
+                self._workers[index] = connection
+
+                # Send anything kept while it was away
+                for data in self._buffers.pop(index, ()):
+                    connection.SendEncoded(data)
+
+            if oldConnection is not None:
+                oldConnection.Close()
+
+            log.info('Worker %d connected', index)
+            if self._onWorkerConnected is not None:
+                self._onWorkerConnected(index)
+        elif connection.index is not None and self._onEvent is not None:
+            self._onEvent(connection.index, event)
+
+    def _Closed(self, connection: _Connection) -> None:
+        # Forget the worker unless it has already reconnected
+        with self._lock:
+            if connection.index is None or self._workers.get(connection.index) is not connection:
+                return
+            del self._workers[connection.index]
+
+        log.warning('Worker %d disconnected', connection.index)
+        if self._onWorkerDisconnected is not None:
+            self._onWorkerDisconnected(connection.index)
+
+    def Publish(self, event: Event) -> None:
+        # Send the event to every connected worker, encoding it once
+        data = _Encode(event)
+        with self._lock:
+            connections = list(self._workers.values())
+
+        for connection in connections:
+            connection.SendEncoded(data)
+
+    def SendTo(self, index: int, event: Event) -> None:
+        # Send the event to one worker, keeping it until the worker connects if it isn't connected
+        data = _Encode(event)
+        with self._lock:
+            if (connection := self._workers.get(index)) is not None and not connection.closed:
+                connection.SendEncoded(data)
+            else:
+                self._buffers.setdefault(index, deque(maxlen=MAX_BUFFERED_EVENTS)).append(data)
+
+    def Close(self, timeout: Optional[float] = None) -> None:
+        # Stop accepting workers, send what's queued for the connected ones and remove the socket
+        self._socket.close()
+
+        with self._lock:
+            connections = list(self._workers.values())
+
+        for connection in connections:
+            connection.Flush(timeout)
+
+        self.path.unlink(missing_ok=True)
+
+class PubSubClient:
+    def __init__(self, index: int, onEvent: Callable[[Event], None], path: Path = SOCKET_FILE, onConnected: Optional[Callable[[], None]] = None) -> None:
+        # The worker this client is for, and the callbacks for events and for each time it connects
+        self.index = index
+        self.path = path
+        self._onEvent = onEvent
+        self._onConnected = onConnected
+
+        # The current connection, and events waiting to go to the leader while not connected
+        self._connection: Optional[_Connection] = None
+        self._pending: deque[Event] = deque(maxlen=MAX_BUFFERED_EVENTS)
+        self._lock = threading.Lock()
+
+        self._stopping = threading.Event()
+        self._connected = threading.Event()
+
+        # Connect from a background thread, reconnecting whenever the leader goes away
+        self._thread = threading.Thread(target=self._ConnectLoop, name='PubSubClient', daemon=True)
+        self._thread.start()
+
+    def WaitUntilConnected(self, timeout: Optional[float] = None) -> bool:
+        return self._connected.wait(timeout)
+
+    def _ConnectLoop(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                connectionSocket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                connectionSocket.connect(os.fspath(self.path))
+            except OSError:
+                # The leader isn't running yet
+                connectionSocket.close()
+                self._stopping.wait(RECONNECT_DELAY)
+                continue
+
+            connection = _Connection(connectionSocket, lambda _, event: self._onEvent(event), lambda _: self._connected.clear())
+
+            # Say hello first, then send anything kept while disconnected
+            with self._lock:
+                connection.Send({'type': 'hello', 'worker': self.index})
+                while self._pending:
+                    connection.Send(self._pending.popleft())
+                self._connection = connection
+
+            log.info('Worker %d connected to the leader', self.index)
+            self._connected.set()
+            if self._onConnected is not None:
+                self._onConnected()
+
+            # Wait for the connection to drop, then try again
+            connection.WaitUntilClosed()
+            with self._lock:
+                self._connection = None
+
+            if not self._stopping.is_set():
+                log.warning('Worker %d lost the leader, reconnecting', self.index)
+                self._stopping.wait(RECONNECT_DELAY)
+
+    def Send(self, event: Event) -> None:
+        # Send the event to the leader, keeping it until connected if need be
+        with self._lock:
+            if self._connection is not None and not self._connection.closed:
+                self._connection.Send(event)
+            else:
+                self._pending.append(event)
+
+    def Close(self, timeout: Optional[float] = None) -> None:
+        # Stop reconnecting and send anything queued
+        self._stopping.set()
+        with self._lock:
+            connection = self._connection
+
+        if connection is not None:
+            connection.Flush(timeout)
+
+        self._thread.join(timeout)
@@ -0,0 +1,382 @@
+import json
+import os
+from pathlib import Path
+import queue
+import threading
+from typing import Any, Callable, Iterable, Iterator, Optional, Union
+
+import Footy.Log as Log
+from Footy.TeamData import teamsToWatch
+
+# Log through the subscriptions subsystem's logger
+log = Log.GetLogger('subscriptions')
+
+# File the subscriptions are logged to, this is excluded from git
+SUBSCRIPTIONS_FILE = Path('subscriptions.jsonl')
+
+# The log is compacted once it holds this many more records than there are subscriptions
+COMPACT_THRESHOLD = 1000
+
+# A team or competition a chat follows, ('team', full team name) or ('competition', competition ID)
+Follow = tuple[str, Union[str, int]]
+
+# Called with each change as it's made
+RecordCallback = Callable[[dict[str, Any]], None]
+
+def _FollowRecord(operation: str, chatId: int, follow: Follow) -> dict[str, Any]:
+    # The log record for following or unfollowing a team or competition
+    return {'op': operation, 'chatId': chatId, follow[0]: follow[1]}
+
+def FollowFromRecord(record: dict[str, Any]) -> Follow:
+    # The team or competition in a follow or unfollow record
+    return ('team', record['team']) if 'team' in record else ('competition', record['competition'])
+
+class SubscriptionStore:
+    def __init__(self, path: Optional[Path] = SUBSCRIPTIONS_FILE, compactThreshold: int = COMPACT_THRESHOLD, defaultTeams: Iterable[str] = teamsToWatch) -> None:
+        # Where the log is kept and how far it can grow before being compacted, with no path nothing
+        # is kept on disk, as for a copy of the subscriptions kept up to date by another process
+        self.path = path
+        self.compactThreshold = compactThreshold
+
+        # The teams sent to chats which haven't chosen any teams or competitions
+        self.defaultTeams = frozenset(defaultTeams)
+
+        # The subscribed chats, and those of them following nothing so they get the default teams
+        self._chatIds: set[int] = set()
+        self._defaultChats: set[int] = set()
+
+        # The teams and competitions each chat follows, and the chats following each team and competition
+        self._follows: dict[int, set[Follow]] = {}
+        self._followers: dict[Follow, set[int]] = {}
+        self._followCount = 0
+
+        # Number of records in the log file
+        self._logRecords = 0
+
+        # Callbacks told about every change
+        self._watchers: list[RecordCallback] = []
+
+        self._lock = threading.Lock()
+
+        # Records waiting to be written, None tells the writer to stop
+        self._records: queue.SimpleQueue[Optional[dict[str, Any]]] = queue.SimpleQueue()
+        self._writer: Optional[threading.Thread] = None
+
+        if self.path is not None:
+            # Rebuild the subscriptions from the log
+            self._Load()
+
+            # Write the log from a background thread so the command handlers never wait on the disk
+            self._writer = threading.Thread(target=self._WriteRecords, name='SubscriptionWriter', daemon=True)
+            self._writer.start()
+
+    def _Load(self) -> None:
+        assert self.path is not None
+
+        try:
+            with open(self.path, 'r', encoding='utf-8') as logFile:
+                lines = logFile.readlines()
+        except FileNotFoundError:
+            # No log yet, so no subscriptions
+            return
+
+        # Decode the whole log in one go, which is much quicker than decoding it line by line
+        corrupt = False
+        try:
+            records = json.loads(f'[{",".join(lines)}]')
+        except json.JSONDecodeError:
+            # Something is corrupt, so decode each line on its own and skip the bad ones
+            records = []
+            for line in lines:
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # A partly written last line from a crash, the change it held was never confirmed so skip it
+                    log.warning('Skipping corrupt subscription record: %s', line.strip())
+                    corrupt = True
+
+        # Replay the records in order
+        for record in records:
+            self._Apply(record)
+
+        self._logRecords = len(records)
+
+        # Compact the log now if it has grown too large, or to clear out a corrupt record before appending to it
+        if corrupt or self._logRecords > self._LiveRecordCount() + self.compactThreshold:
+            self._Compact()
+
+    def _Apply(self, record: dict[str, Any]) -> None:
+        # Apply a single record to the in memory indexes
+        operation = record.get('op')
+        if operation == 'add':
+            self._AddChat(record['chatId'])
+        elif operation == 'remove':
+            self._RemoveChat(record['chatId'])
+        elif operation in ('follow', 'unfollow'):
+            follow = FollowFromRecord(record)
+            if operation == 'follow':
+                self._AddChat(record['chatId'])
+                self._AddFollow(record['chatId'], follow)
+            else:
+                self._RemoveFollow(record['chatId'], follow)
+        else:
+            log.warning('Unknown subscription record: %s', record)
+
+    def _LiveRecordCount(self) -> int:
+        # Number of records the log would hold once compacted
+        return len(self._chatIds) + self._followCount
+
+    def _AddChat(self, chatId: int) -> None:
+        # A new chat follows nothing, so gets the default teams
+        if chatId not in self._chatIds:
+            self._chatIds.add(chatId)
+            if chatId not in self._follows:
+                self._defaultChats.add(chatId)
+
+    def _RemoveChat(self, chatId: int) -> None:
+        # Unsubscribing a chat drops everything it follows
+        for follow in self._follows.get(chatId, set()).copy():
+            self._RemoveFollow(chatId, follow)
+
+        self._chatIds.discard(chatId)
+        self._defaultChats.discard(chatId)
+
+    def _AddFollow(self, chatId: int, follow: Follow) -> None:
+        follows = self._follows.setdefault(chatId, set())
+        if follow not in follows:
+            follows.add(follow)
+            self._followers.setdefault(follow, set()).add(chatId)
+            self._followCount += 1
+            self._defaultChats.discard(chatId)
+
+    def _RemoveFollow(self, chatId: int, follow: Follow) -> None:
+        follows = self._follows.get(chatId)
+        if follows is None or follow not in follows:
+            return
+
+        follows.discard(follow)
+        self._followCount -= 1
+
+        # Drop the index entries once they're empty so the followed teams are only those with a chat
+        followers = self._followers[follow]
+        followers.discard(chatId)
+        if not followers:
+            del self._followers[follow]
+
+        # A chat left following nothing goes back to the default teams
+        if not follows:
+            del self._follows[chatId]
+            if chatId in self._chatIds:
+                self._defaultChats.add(chatId)
+
+    def _Record(self, record: dict[str, Any]) -> None:
+        # Queue a change to be logged and tell the watchers, called with the lock held so the order matches the changes
+        if self._writer is not None:
+            self._records.put(record)
+
+        for watcher in self._watchers:
+            watcher(record)
+
+    def _Records(self) -> list[dict[str, Any]]:
+        # The fewest records which rebuild the subscriptions, one add for each chat and one follow for each follow
+        records = [{'op': 'add', 'chatId': chatId} for chatId in sorted(self._chatIds)]
+        for chatId in sorted(self._follows):
+            records.extend(_FollowRecord('follow', chatId, follow) for follow in sorted(self._follows[chatId], key=str))
+        return records
+
+    def Watch(self, watcher: RecordCallback) -> None:
+        # Call the watcher with records rebuilding the current subscriptions, then with every change after them
+        with self._lock:
+            for record in self._Records():
+                watcher(record)
+            self._watchers.append(watcher)
+
+    def Unwatch(self, watcher: RecordCallback) -> None:
+        with self._lock:
+            if watcher in self._watchers:
+                self._watchers.remove(watcher)
+
+    def Apply(self, record: dict[str, Any]) -> None:
+        # Apply a change already made and logged elsewhere, as for a copy kept up to date by another process
+        with self._lock:
+            self._Apply(record)
+
+    def Change(self, record: dict[str, Any]) -> bool:
+        # Make a change passed on from elsewhere as if it had been made here, returning whether anything changed
+        operation = record.get('op')
+        if operation == 'add':
+            return self.Add(record['chatId'])
+        elif operation == 'remove':
+            return self.Remove(record['chatId'])
+        elif operation == 'follow':
+            return self.Follow(record['chatId'], FollowFromRecord(record))
+        elif operation == 'unfollow':
+            return self.Unfollow(record['chatId'], FollowFromRecord(record))
+
+        log.warning('Unknown subscription change: %s', record)
+        return False
+
+    def Clear(self) -> None:
+        # Forget every subscription without logging it, before a copy is rebuilt
+        with self._lock:
+            self._chatIds.clear()
+            self._defaultChats.clear()
+            self._follows.clear()
+            self._followers.clear()
+            self._followCount = 0
+
+    def Add(self, chatId: int) -> bool:
+        # Add the chat, returning False if it was already subscribed
+        with self._lock:
+            if chatId in self._chatIds:
+                return False
+
+            self._AddChat(chatId)
+
+            # Queue the record while holding the lock so the log is in the same order as the changes
+            self._Record({'op': 'add', 'chatId': chatId})
+
+        return True
+
+    def Remove(self, chatId: int) -> bool:
+        # Remove the chat and everything it follows, returning False if it wasn't subscribed
+        with self._lock:
+            if chatId not in self._chatIds:
+                return False
+
+            self._RemoveChat(chatId)
+
+            # Queue the record while holding the lock so the log is in the same order as the changes
+            self._Record({'op': 'remove', 'chatId': chatId})
+
+        return True
+
+    def Follow(self, chatId: int, follow: Follow) -> bool:
+        # Follow a team or competition, subscribing the chat if needed, returning False if it was already followed
+        with self._lock:
+            if follow in self._follows.get(chatId, ()):
+                return False
+
+            self._AddChat(chatId)
+            self._AddFollow(chatId, follow)
+
+            # Queue the record while holding the lock so the log is in the same order as the changes
+            self._Record(_FollowRecord('follow', chatId, follow))
+
+        return True
+
+    def Unfollow(self, chatId: int, follow: Follow) -> bool:
+        # Stop following a team or competition, returning False if it wasn't followed
+        with self._lock:
+            if follow not in self._follows.get(chatId, ()):
+                return False
+
+            self._RemoveFollow(chatId, follow)
+
+            # Queue the record while holding the lock so the log is in the same order as the changes
+            self._Record(_FollowRecord('unfollow', chatId, follow))
+
+        return True
+
+    def Following(self, chatId: int) -> frozenset[Follow]:
+        # Get the teams and competitions the chat follows, empty if it gets the default teams
+        with self._lock:
+            return frozenset(self._follows.get(chatId, ()))
+
+    def ChatsFor(self, teams: Iterable[str], competitionId: Optional[int] = None) -> frozenset[int]:
+        # Get the chats following any of the teams or the competition, with the chats
+        # on the default teams if one of those is playing, looking up only the followers
+        with self._lock:
+            chatIds: set[int] = set()
+            for team in teams:
+                chatIds.update(self._followers.get(('team', team), ()))
+                if team in self.defaultTeams:
+                    chatIds.update(self._defaultChats)
+
+            if competitionId is not None:
+                chatIds.update(self._followers.get(('competition', competitionId), ()))
+
+            return frozenset(chatIds)
+
+    def FollowedTeams(self) -> frozenset[str]:
+        # Every team a chat gets messages about, the default teams are only included if a chat still gets them
+        with self._lock:
+            teams = {str(value) for kind, value in self._followers if kind == 'team'}
+            return frozenset(teams | self.defaultTeams) if self._defaultChats else frozenset(teams)
+
+    def FollowedCompetitions(self) -> frozenset[int]:
+        # Every competition followed in full by a chat
+        with self._lock:
+            return frozenset(int(value) for kind, value in self._followers if kind == 'competition')
+
+    def Snapshot(self) -> frozenset[int]:
+        # Get a copy of the subscribed chats which is safe to iterate while they change
+        with self._lock:
+            return frozenset(self._chatIds)
+
+    def __contains__(self, chatId: object) -> bool:
+        return chatId in self._chatIds
+
+    def __len__(self) -> int:
+        return len(self._chatIds)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.Snapshot())
+
+    def Close(self) -> None:
+        # Write any records still waiting and stop the writer
+        if self._writer is not None:
+            self._records.put(None)
+            self._writer.join()
+
+    def _WriteRecords(self) -> None:
+        stopping = False
+
+        while not stopping:
+            # Wait for a record, then take everything else waiting so they're written together
+            records = [self._records.get()]
+            while True:
+                try:
+                    records.append(self._records.get_nowait())
+                except queue.Empty:
+                    break
+
+            # A None in the batch means stop once the batch is written
+            if None in records:
+                stopping = True
+                records = [record for record in records if record is not None]
+
+            if records:
+                try:
+                    # Append the batch and make sure it's on disk
+                    with open(self.path, 'a', encoding='utf-8') as logFile:
+                        logFile.write(''.join(f'{json.dumps(record)}\n' for record in records))
+                        logFile.flush()
+                        os.fsync(logFile.fileno())
+
+                    self._logRecords += len(records)
+
+                    # Compact the log once it holds too many stale records
+                    if self._logRecords > self._LiveRecordCount() + self.compactThreshold:
+                        self._Compact()
+                except OSError as error:
+                    log.error('Could not write subscriptions: %s', error)
+
+    def _Compact(self) -> None:
+        assert self.path is not None
+
+        # Rewrite the log with the fewest records, records still queued are written
+        # again afterwards but replaying them twice gives the same result
+        with self._lock:
+            records = self._Records()
+
+        tempPath = self.path.with_name(f'{self.path.name}.tmp')
+
+        with open(tempPath, 'w', encoding='utf-8') as logFile:
+            logFile.write(''.join(f'{json.dumps(record)}\n' for record in records))
+            logFile.flush()
+            os.fsync(logFile.fileno())
+
+        # Replace the log in one step so a crash leaves either the old or the new log
+        os.replace(tempPath, self.path)
+        self._logRecords = len(records)
@@ -0,0 +1,167 @@
+from __future__ import annotations
+import hmac
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import queue
+import secrets
+import threading
+import time
+from typing import Any, Callable, Optional
+
+import Footy.Log as Log
+import Footy.Metrics as Metrics
+
+# Log through the webhook subsystem's logger
+log = Log.GetLogger('webhook')
+
+# Address and port the webhook listens on, a reverse proxy in front of it takes care of HTTPS for Telegram
+WEBHOOK_LISTEN = '127.0.0.1'
+WEBHOOK_PORT = 8443
+
+# Header Telegram sends the secret token in, the token is given to Telegram when the webhook is set
+SECRET_HEADER = 'X-Telegram-Bot-Api-Secret-Token'
+
+# Number of threads running the handlers, and the updates which can wait for them before Telegram is asked to retry
+WORKER_COUNT = 4
+MAX_QUEUED_UPDATES = 100
+
+# Largest update accepted in bytes, updates are a few kilobytes at most
+MAX_BODY_SIZE = 1024 * 1024
+
+# Called on a worker thread with each update as decoded from the JSON
+UpdateCallback = Callable[[dict[str, Any]], None]
+
+def NewSecretToken() -> str:
+    # A random token made of the characters Telegram allows
+    return secrets.token_urlsafe(32)
+
+class _WebhookHandler(BaseHTTPRequestHandler):
+    webhook: WebhookServer
+
+    # Answer each update straight away rather than waiting to fill a packet
+    disable_nagle_algorithm = True
+
+    def _Reply(self, status: int, result: str) -> None:
+        # Answer with an empty body, Telegram only looks at the status
+        Metrics.webhookUpdates.Inc(result=result)
+        self.send_response(status)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def do_POST(self) -> None:
+        # Only the webhook's path is served
+        if self.path.split('?')[0] != self.webhook.path:
+            self._Reply(404, 'not_found')
+            return
+
+        # Only Telegram knows the secret token
+        if not hmac.compare_digest(self.headers.get(SECRET_HEADER, ''), self.webhook.secretToken):
+            log.warning('Rejected an update from %s with the wrong secret token', self.client_address[0], extra=Log.Every(60))
+            self._Reply(403, 'forbidden')
+            return
+
+        # Read the body, refusing anything too big to be an update
+        try:
+            length = int(self.headers.get('Content-Length', ''))
+        except ValueError:
+            self._Reply(411, 'bad_request')
+            return
+
+        if not 0 < length <= MAX_BODY_SIZE:
+            self._Reply(413, 'bad_request')
+            return
+
+        # An update is a JSON object with an ID
+        try:
+            update = json.loads(self.rfile.read(length))
+        except ValueError:
+            update = None
+
+        if not isinstance(update, dict) or not isinstance(update.get('update_id'), int):
+            log.warning('Rejected a malformed update', extra=Log.Every(60))
+            self._Reply(400, 'bad_request')
+            return
+
+        # Hand the update to the workers, if they've fallen too far behind Telegram sends it again later
+        if self.webhook.Enqueue(update):
+            self._Reply(200, 'accepted')
+        else:
+            log.warning('Update queue full, asking Telegram to retry', extra=Log.Every(60))
+            self._Reply(503, 'busy')
+
+    def log_message(self, format: str, *args: object) -> None:
+        # Don't log every update
+        pass
+
+class _WebhookHTTPServer(ThreadingHTTPServer):
+    # Let a burst of updates wait to be accepted rather than having their connections refused
+    request_queue_size = 128
+    daemon_threads = True
+
+class WebhookServer:
+    def __init__(
+        self,
+        onUpdate: UpdateCallback,
+        secretToken: str,
+        listen: str = WEBHOOK_LISTEN,
+        port: int = WEBHOOK_PORT,
+        path: str = '/',
+        workerCount: int = WORKER_COUNT,
+        maxQueuedUpdates: int = MAX_QUEUED_UPDATES,
+    ) -> None:
+        # The callback for each update and the secret Telegram sends with them
+        self.onUpdate = onUpdate
+        self.secretToken = secretToken
+        self.path = path
+
+        # Updates waiting for a worker with the time they arrived, None tells a worker to stop
+        self._updates: queue.Queue[Optional[tuple[dict[str, Any], float]]] = queue.Queue(maxQueuedUpdates)
+
+        # Listen for updates, each request is answered as soon as the update is queued
+        handler = type('WebhookHandler', (_WebhookHandler,), {'webhook': self})
+        self._server = _WebhookHTTPServer((listen, port), handler)
+        self.port = self._server.server_address[1]
+        threading.Thread(target=self._server.serve_forever, name='WebhookServer', daemon=True).start()
+
+        # Run the handlers on a small pool of threads so a slow command doesn't hold up the others
+        self._workers = [threading.Thread(target=self._WorkLoop, name=f'WebhookWorker{index}', daemon=True) for index in range(workerCount)]
+        for worker in self._workers:
+            worker.start()
+
+        log.info('Listening for updates on %s:%d%s', listen, self.port, path)
+
+    @property
+    def queueDepth(self) -> int:
+        # Number of updates waiting for a worker
+        return self._updates.qsize()
+
+    def Enqueue(self, update: dict[str, Any]) -> bool:
+        # Queue the update, returning False if the queue is full
+        try:
+            self._updates.put_nowait((update, time.perf_counter()))
+            return True
+        except queue.Full:
+            return False
+
+    def _WorkLoop(self) -> None:
+        while (item := self._updates.get()) is not None:
+            update, receivedAt = item
+
+            # The handlers log their own errors, anything else is logged here so the worker carries on
+            try:
+                self.onUpdate(update)
+            except Exception:
+                log.exception('Error handling update %d', update['update_id'])
+
+            # Time from the update arriving to its handlers finishing
+            Metrics.updateHandleTime.Observe(time.perf_counter() - receivedAt)
+
+    def Stop(self, timeout: Optional[float] = None) -> None:
+        # Stop taking updates, then let the workers finish the ones already queued
+        self._server.shutdown()
+        self._server.server_close()
+
+        for _ in self._workers:
+            self._updates.put(None)
+        for worker in self._workers:
+            worker.join(timeout)
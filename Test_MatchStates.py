@@ -1,67 +1,138 @@
-from Footy.MatchStates import (MatchState, 
-                                Drawing, 
-                                TeamLeadByOne, 
+import random
+import timeit
+
+from Footy.MatchStates import (MatchState,
+                                Drawing,
+                                TeamLeadByOne,
                                 TeamExtendingLead,
                                 TeamLosingLead,
                                 TeamDeficitOfOne,
                                 TeamExtendingDeficit,
-                                TeamLosingDeficit)
-
-matchState = MatchState(0, 0)
-
-matchState = matchState.FindState()
-print(matchState)
-assert(isinstance(matchState, Drawing))
-
-matchState = matchState.GoalScored(1, 0)
-print(matchState)
-assert(isinstance(matchState, TeamLeadByOne))
-
-matchState = matchState.GoalScored(2, 0)
-print(matchState)
-assert(isinstance(matchState, TeamExtendingLead))
-
-matchState = matchState.GoalScored(3, 0)
-print(matchState)
-assert(isinstance(matchState, TeamExtendingLead))
-
-matchState = matchState.GoalScored(3, 1)
-print(matchState)
-assert(isinstance(matchState, TeamLosingLead))
-
-matchState = matchState.GoalScored(3, 2)
-print(matchState)
-assert(isinstance(matchState, TeamLosingLead))
-
-matchState = matchState.GoalScored(3, 3)
+                                TeamLosingDeficit,
+                                allStates,
+                                FindState,
+                                Replay)
+
+# Reference for the expected transitions, written out rule by rule from the state descriptions
+def FindExpectedState(scoreDifference: int) -> type[MatchState]:
+    match scoreDifference:
+        case 1:
+            return TeamLeadByOne
+        case -1:
+            return TeamDeficitOfOne
+        case x if x > 1:
+            return TeamExtendingLead
+        case x if x < -1:
+            return TeamExtendingDeficit
+        case _:
+            return Drawing
+
+def ExpectedTransition(state: MatchState, oldScoreDifference: int, scoreDifference: int) -> type[MatchState]:
+    scoreDirection = scoreDifference - oldScoreDifference
+
+    match state, scoreDifference, scoreDirection:
+        case Drawing() | TeamLeadByOne() | TeamDeficitOfOne(), _, _:
+            return FindExpectedState(scoreDifference)
+        case TeamExtendingLead(), _, direction if direction < 0:
+            return TeamLosingLead
+        case TeamExtendingLead(), _, direction if direction > 0:
+            return TeamExtendingLead
+        case TeamLosingLead(), 0, _:
+            return Drawing
+        case TeamLosingLead(), _, direction if direction < 0:
+            return TeamLosingLead
+        case TeamLosingLead(), _, direction if direction > 0:
+            return TeamExtendingLead
+        case TeamExtendingDeficit(), _, direction if direction < 0:
+            return TeamExtendingDeficit
+        case TeamExtendingDeficit(), _, direction if direction > 0:
+            return TeamLosingDeficit
+        case TeamLosingDeficit(), 0, _:
+            return Drawing
+        case TeamLosingDeficit(), _, direction if direction < 0:
+            return TeamExtendingDeficit
+        case TeamLosingDeficit(), _, direction if direction > 0:
+            return TeamLosingDeficit
+        case _:
+            # Anything else isn't a valid move, so go to the state for the new score
+            return FindExpectedState(scoreDifference)
+
+# Check the states are shared singletons
+assert FindState(0) is FindState(0)
+assert len({id(state) for state in allStates}) == 7
+
+# Check the initial state for every score difference
+for scoreDifference in range(-10, 11):
+    assert isinstance(FindState(scoreDifference), FindExpectedState(scoreDifference))
+
+# Check every transition from every state
+transitionCount = 0
+for state in allStates:
+    for oldScoreDifference in range(-10, 11):
+        for scoreDifference in range(-10, 11):
+            newState = state.GoalScored(oldScoreDifference, scoreDifference)
+            expectedState = ExpectedTransition(state, oldScoreDifference, scoreDifference)
+            assert isinstance(newState, expectedState), f'{state} {oldScoreDifference} -> {scoreDifference} gave {newState}, expected {expectedState.__name__}'
+            transitionCount += 1
+
+print(f'Checked {transitionCount} transitions')
+
+# Check a whole match, goal by goal
+scorelines = [(1, 0), (2, 0), (3, 0), (3, 1), (3, 2), (3, 3), (3, 4), (3, 5), (3, 6), (4, 6), (5, 6), (6, 6), (8, 6)]
+expectedStates = [
+    TeamLeadByOne,
+    TeamExtendingLead,
+    TeamExtendingLead,
+    TeamLosingLead,
+    TeamLosingLead,
+    Drawing,
+    TeamDeficitOfOne,
+    TeamExtendingDeficit,
+    TeamExtendingDeficit,
+    TeamLosingDeficit,
+    TeamLosingDeficit,
+    Drawing,
+    TeamExtendingLead,
+]
+
+matchState = FindState()
 print(matchState)
-assert(isinstance(matchState, Drawing))
-
-matchState = matchState.GoalScored(3, 4)
-print(matchState)
-assert(isinstance(matchState, TeamDeficitOfOne))
-
-matchState = matchState.GoalScored(3, 5)
-print(matchState)
-assert(isinstance(matchState, TeamExtendingDeficit))
-
-matchState = matchState.GoalScored(3, 6)
-print(matchState)
-assert(isinstance(matchState, TeamExtendingDeficit))
-
-matchState = matchState.GoalScored(4, 6)
-print(matchState)
-assert(isinstance(matchState, TeamLosingDeficit))
-
-matchState = matchState.GoalScored(5, 6)
-print(matchState)
-assert(isinstance(matchState, TeamLosingDeficit))
-
-matchState = matchState.GoalScored(6, 6)
-print(matchState)
-assert(isinstance(matchState, Drawing))
-
-matchState = matchState.GoalScored(8, 6)
-print(matchState)
-assert(isinstance(matchState, TeamExtendingLead))
-
+assert isinstance(matchState, Drawing)
+
+oldScoreDifference = 0
+for (teamScore, oppositionScore), expectedState in zip(scorelines, expectedStates):
+    matchState = matchState.GoalScored(oldScoreDifference, teamScore - oppositionScore)
+    oldScoreDifference = teamScore - oppositionScore
+    print(f'{matchState} Team Score {teamScore} - {oppositionScore} Opposition Score')
+    assert isinstance(matchState, expectedState)
+
+# Check replaying the whole match in one call gives the same states
+assert [type(state) for state in Replay(scorelines)] == expectedStates
+
+# Check replaying random matches against the reference
+random.seed(0)
+for _ in range(1000):
+    teamScore = 0
+    oppositionScore = 0
+    randomScorelines = []
+    for _ in range(random.randint(1, 12)):
+        if random.random() < 0.5:
+            teamScore += random.randint(1, 2)
+        else:
+            oppositionScore += random.randint(1, 2)
+        randomScorelines.append((teamScore, oppositionScore))
+
+    matchState = FindState()
+    oldScoreDifference = 0
+    for (teamScore, oppositionScore), replayedState in zip(randomScorelines, Replay(randomScorelines)):
+        expectedState = ExpectedTransition(matchState, oldScoreDifference, teamScore - oppositionScore)
+        assert isinstance(replayedState, expectedState)
+        matchState = replayedState
+        oldScoreDifference = teamScore - oppositionScore
+
+# Benchmark single transitions and whole match replays
+runs = 100000
+transitionTime = min(timeit.repeat(lambda: matchState.GoalScored(1, 2), number=runs, repeat=5)) / runs * 1e9
+replayTime = min(timeit.repeat(lambda: Replay(scorelines), number=runs // 10, repeat=5)) / (runs // 10) * 1e6
+print(f'GoalScored: {transitionTime:.0f} ns per transition')
+print(f'Replay: {replayTime:.2f} us per {len(scorelines)} goal match')
@@ -1,117 +1,310 @@
-from datetime import datetime, timedelta, time
+from __future__ import annotations
+from time import perf_counter
+
+# Record the launch time before anything else is imported
+launchTime = perf_counter()
+
+from datetime import datetime, timedelta, time, timezone
 from pathlib import Path
 import random
-from typing import Optional
+import argparse
+import signal
+import subprocess
+import threading
+from typing import Callable, Iterable, Optional, TYPE_CHECKING
+from urllib.parse import urlsplit
 import warnings
 import sys
-import logging
-from zoneinfo import ZoneInfo
 
-from pytz import timezone
-from telegram import Bot, Update
-from telegram.ext import Updater, JobQueue, CallbackContext, CommandHandler
+# The telegram types are only needed for type checking, the library itself is imported when the bot starts
+if TYPE_CHECKING:
+    from telegram import Update
+    from telegram.ext import JobQueue, CallbackContext
+    from Footy.Simulator import Simulator
 
+from Footy import MissingTokenError
+import Footy.Bantz as Bantz
+import Footy.Competitions as Competitions
 from Footy.Footy import Footy
-from Footy.Table import Table
-from Footy.Match import Match
-from Footy.TeamData import teamsToWatch, allTeams, supportedTeamMapping, reverseTeamLookup
-from Footy.MatchStates import (
-    Drawing,
-    TeamLeadByOne, 
-    TeamExtendingLead,
-    TeamLosingLead,
-    TeamDeficitOfOne,
-    TeamExtendingDeficit,
-    TeamLosingDeficit
-)
+from Footy.Checkpoint import MatchCheckpoint
+from Footy.LivePoller import LivePoller
+import Footy.Log as Log
+from Footy.StandingsCache import StandingsCache
+from Footy.Match import Match, ParseUtcDate
+import Footy.MatchStatus as MatchStatus
+import Footy.Metrics as Metrics
+from Footy.Session import CloseSession, GetSession
+from Footy.TeamAliases import teamAliasIndex, TeamMention
+from Footy.TeamData import teamsToWatch, allTeams, supportedTeamMapping
+from Messaging.Broadcaster import Broadcaster, GLOBAL_MESSAGES_PER_SECOND
+import Messaging.Cluster as Cluster
+from Messaging.Cluster import ClusterBroadcaster
+from Messaging.PubSub import Event, PubSubClient, PubSubServer, SOCKET_FILE
+from Messaging.Subscriptions import Follow, SubscriptionStore, SUBSCRIPTIONS_FILE
+from Messaging.Webhook import NewSecretToken, WebhookServer, WEBHOOK_LISTEN, WEBHOOK_PORT
 
 # Set the chat ID
 CHAT_ID = -701653934
 
-class BanterBot:
-    def __init__(self) -> None:
-        # Enable logging
-        logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-                            level=logging.INFO)
+# Seconds after the poll job is added before the live matches are first polled
+FIRST_POLL_DELAY = 1
 
-        self.logger = logging.getLogger(__name__)
+# Log through the bot subsystem's logger
+log = Log.GetLogger('bot')
+
+class BanterBot:
+    def __init__(
+        self,
+        mode: str = Cluster.SINGLE,
+        workerIndex: int = 0,
+        workerCount: int = 1,
+        socketPath: Path = SOCKET_FILE,
+        webhookUrl: Optional[str] = None,
+        webhookListen: str = WEBHOOK_LISTEN,
+        webhookPort: int = WEBHOOK_PORT,
+    ) -> None:
+        # Enable logging, records are written by a background thread so logging never holds up the jobs
+        Log.ConfigureLogging()
+
+        # How this process is run, a leader polls the API and passes the messages to the workers,
+        # worker 0 also answers the commands as only one process can receive the bot's updates
+        self.mode = mode
+        self.workerIndex = workerIndex
+        self.workerCount = workerCount
+        pollsMatches = mode != Cluster.WORKER
+        handlesCommands = mode == Cluster.SINGLE or (mode == Cluster.WORKER and workerIndex == 0)
 
         try:
             # Get the token from the bot_token.txt file, this is exclued from git, so may not exist
             with open(Path('bot_token.txt'), 'r', encoding='utf8') as secretFile:
                 token = secretFile.read()
         except:
-            # If bot_token.txt is not available, print some help and exit
-            print('No bot_token.txt file found, you need to put your token from BotFather in here')
+            # If bot_token.txt is not available, log some help and exit
+            log.critical('No bot_token.txt file found, you need to put your token from BotFather in here')
             sys.exit()
 
-        # List of chat IDs to respond to
-        self.chatIdList: list[int] = []
+        # The football-data token is needed to poll the API and answer the commands, so check for it now rather than on first use
+        if pollsMatches or handlesCommands:
+            try:
+                GetSession()
+            except MissingTokenError:
+                sys.exit()
+
+        # The chats to send to, kept on disk so they survive a restart, workers keep a copy sent by the leader
+        self.subscriptions = SubscriptionStore(None if mode == Cluster.WORKER else SUBSCRIPTIONS_FILE)
+
+        # Only the process polling the API needs the matches
+        if pollsMatches:
+            # Set the teams we're interested in
+            teams = [team for team in teamsToWatch]
+
+            # Create a Footy object using the list of teams we're interested in
+            self.footy = Footy(teams)
+
+            # Render the banter for every team once, each chat draws from its own shuffle bags
+            self.bantz = Bantz.Bantz()
 
-        # Set the teams we're interested in
-        teams = [team for team in teamsToWatch]
+            # Create a poller to batch the score updates for all live matches, saving them after each poll
+            self.checkpoint = MatchCheckpoint()
+            self.poller = LivePoller(self.footy, self.checkpoint)
 
-        # Create a Footy object using the list of teams we're interested in
-        self.footy = Footy(teams)
+        if handlesCommands:
+            # Create a cache for the league standings used by /table and /can, the poller says when it's changed
+            self.standings = StandingsCache()
+
+        # The season simulator is created on first use as NumPy is slow to import
+        self.simulator: Optional[Simulator] = None
+
+        # Import the telegram library now it's needed
+        from telegram.ext import Updater, CommandHandler
 
         # Create the Updater and pass it your bot's token.
         # Make sure to set use_context=True to use the new context based callbacks
         # Post version 12 this will no longer be necessary
         self.updater = Updater(token, use_context=True)
 
+        # Get the job queue
+        self.jq: JobQueue = self.updater.job_queue
+
+        if mode == Cluster.LEADER:
+            # Pass the messages to the workers, which send any subscription changes back
+            self.server = PubSubServer(socketPath, self._OnWorkerEvent, self._OnWorkerConnected, self._OnWorkerDisconnected)
+            self.broadcaster = ClusterBroadcaster(self.server, workerCount)
+            self._subscriptionWatchers: dict[int, Callable[[dict], None]] = {}
+        else:
+            # Send outgoing messages from a pool of threads so the polling jobs never wait on Telegram,
+            # workers share Telegram's limit between them
+            self.broadcaster = Broadcaster(self.updater.bot, messagesPerSecond=GLOBAL_MESSAGES_PER_SECOND / workerCount)
+
+        if mode == Cluster.WORKER:
+            # Get the messages for this worker's chats and the subscriptions from the leader,
+            # sending any changes made by the commands back to it
+            self.client = PubSubClient(workerIndex, self._OnLeaderEvent, socketPath)
+            self.subscriptions.Watch(lambda record: self.client.Send(Cluster.SubscriptionEvent(record)))
+
+        # Serve the latency and queue metrics, the queue depths are read when the metrics are scraped,
+        # each process in a cluster has a port of its own
+        Metrics.outgoingQueueDepth.SetFunction(lambda: self.broadcaster.queueDepth)
+        Metrics.jobQueueDepth.SetFunction(lambda: len(self.jq.jobs()))
+        Metrics.StartMetricsServer(Metrics.METRICS_PORT + (1 + workerIndex if mode == Cluster.WORKER else 0))
+
         # Get the dispatcher to register handlers
         self.dp = self.updater.dispatcher
 
-        # On receipt of a /start command call the start() function and /stop command to call the stop() function
-        self.dp.add_handler(CommandHandler('start', self.start))
-        self.dp.add_handler(CommandHandler('stop', self.stop))
+        if handlesCommands:
+            # On receipt of a /start command call the start() function and /stop command to call the stop() function
+            self.dp.add_handler(CommandHandler('start', self.start))
+            self.dp.add_handler(CommandHandler('stop', self.stop))
 
-        # Add chat IDs and list the chat IDs from another chat
-        self.dp.add_handler(CommandHandler('add', self.add))
-        self.dp.add_handler(CommandHandler('list', self.list))
+            # Add chat IDs and list the chat IDs from another chat
+            self.dp.add_handler(CommandHandler('add', self.add))
+            self.dp.add_handler(CommandHandler('list', self.list))
 
-        # Add a handler to get the table
-        self.dp.add_handler(CommandHandler('table', self.GetTable))
+            # Add a handler to get the table
+            self.dp.add_handler(CommandHandler('table', self.GetTable))
 
-        # Add a handler to answer questions
-        self.dp.add_handler(CommandHandler('can', self.can))
+            # Add a handler to answer questions
+            self.dp.add_handler(CommandHandler('can', self.can))
 
-        # Get the job queue
-        self.jq: JobQueue = self.updater.job_queue
+            # Add a handler to give each team's chances for the rest of the season
+            self.dp.add_handler(CommandHandler('chances', self.chances))
 
-        # Add a job which gets todays matches once a day at 1am
-        matchUpdateTime = time(1, 0, tzinfo=timezone('UTC'))
-        nowTime = datetime.now(tz=ZoneInfo('UTC')).timetz()
-        self.jq.run_daily(self.MatchUpdateHandler, matchUpdateTime)
+            # Add handlers to choose the teams and competitions each chat gets messages about
+            self.dp.add_handler(CommandHandler('follow', self.follow))
+            self.dp.add_handler(CommandHandler('unfollow', self.unfollow))
+            self.dp.add_handler(CommandHandler('following', self.following))
 
-        # Call Get Matches if this is started after the update time
-        if nowTime > matchUpdateTime:
-            self.GetMatches()
+        # The matches already scheduled, so a refresh after a follow doesn't schedule them twice
+        self.scheduledMatches: dict[int, datetime] = {}
+
+        if pollsMatches:
+            # Add a job which gets todays matches once a day at 1am
+            # The job queue's scheduler needs the time zone to come from pytz
+            from pytz import utc
+            matchUpdateTime = time(1, 0, tzinfo=utc)
+            nowTime = datetime.now(tz=timezone.utc).timetz()
+            self.jq.run_daily(self.MatchUpdateHandler, matchUpdateTime)
+
+            # Restore any matches which were live when the bot last stopped, with the state they had reached,
+            # these are added before today's matches so they aren't replaced by fresh copies
+            for match in self.checkpoint.Load():
+                self.poller.AddMatch(match, self.SendScoreUpdates)
+
+            # Call Get Matches if this is started after the update time
+            if nowTime > matchUpdateTime:
+                self.GetMatches()
+
+            # Add a job which polls all live matches every 20 seconds, starting as soon as the job queue is running
+            # so that polling resumes straight away after a restart during a match. The first poll is timed from now,
+            # if the job queue starts after it the first poll waits for the whole interval, so this comes after the downloads
+            self.firstPoll = True
+            self.jq.run_repeating(self.PollLiveMatches, 20, first=FIRST_POLL_DELAY)
 
         # Add the error handler to log errors
         self.dp.add_error_handler(self.error)
 
-        # Start the bot polling
-        self.updater.start_polling()
-
-        # Run the bot until you press Ctrl-C or the process receives SIGINT,
-        # SIGTERM or SIGABRT. This should be used most of the time, since
-        # start_polling() is non-blocking and will stop the bot gracefully.
-        self.updater.idle()
+        if handlesCommands and webhookUrl is not None:
+            # Only the job queue needs running alongside the webhook, started before setting the webhook so the first poll isn't held up
+            self.jq.start()
+
+            # Have Telegram post the updates to the webhook, with a new secret each run so only Telegram can send them
+            secretToken = NewSecretToken()
+            self.webhook = WebhookServer(self._ProcessUpdate, secretToken, webhookListen, webhookPort, urlsplit(webhookUrl).path or '/')
+            self.updater.bot.set_webhook(webhookUrl, allowed_updates=['message'], api_kwargs={'secret_token': secretToken})
+            Metrics.webhookQueueDepth.SetFunction(lambda: self.webhook.queueDepth)
+
+            # Run until a signal stops the process
+            self._WaitForSignal()
+            self.webhook.Stop(10)
+            self.jq.stop()
+        elif handlesCommands:
+            # Start the bot polling
+            self.updater.start_polling()
+
+            # Run the bot until you press Ctrl-C or the process receives SIGINT,
+            # SIGTERM or SIGABRT. This should be used most of the time, since
+            # start_polling() is non-blocking and will stop the bot gracefully.
+            self.updater.idle()
+        else:
+            # Without polling for updates only the job queue needs running, until a signal stops the process
+            self.jq.start()
+            self._WaitForSignal()
+            self.jq.stop()
+
+        # Send any messages still queued, write any subscription changes and write out the log before exiting
+        self.broadcaster.Stop(10)
+        if mode == Cluster.WORKER:
+            self.client.Close(10)
+        self.subscriptions.Close()
+        CloseSession()
+        Log.StopLogging()
+
+    @staticmethod
+    def _WaitForSignal() -> None:
+        # Wait for Ctrl-C or the process being told to stop, as the updater's idle does
+        stopEvent = threading.Event()
+        for signalNumber in (signal.SIGINT, signal.SIGTERM, signal.SIGABRT):
+            signal.signal(signalNumber, lambda *args: stopEvent.set())
+        stopEvent.wait()
+
+    def _ProcessUpdate(self, data: dict) -> None:
+        # Pass an update from the webhook to the handlers, as the updater does with those it polls for
+        from telegram import Update
+        self.dp.process_update(Update.de_json(data, self.updater.bot))
+
+    def _OnWorkerConnected(self, index: int) -> None:
+        # Send the worker the subscriptions, then every change to them, replacing any it had from before
+        self._OnWorkerDisconnected(index)
+        self.server.SendTo(index, {'type': 'reset'})
+
+        watcher = lambda record: self.server.SendTo(index, Cluster.SubscriptionEvent(record))
+        self._subscriptionWatchers[index] = watcher
+        self.subscriptions.Watch(watcher)
+
+    def _OnWorkerDisconnected(self, index: int) -> None:
+        # Stop sending it subscription changes, it's sent them all again when it reconnects
+        if (watcher := self._subscriptionWatchers.pop(index, None)) is not None:
+            self.subscriptions.Unwatch(watcher)
+
+    def _OnWorkerEvent(self, index: int, event: Event) -> None:
+        # A command on a worker changed the subscriptions, so make the change here where they're kept
+        if event.get('type') == 'subscription':
+            # Pick up any of today's matches for a newly followed team or competition
+            followedBefore = self._Followed()
+            if self.subscriptions.Change(event['record']):
+                self._GetNewlyFollowedMatches(followedBefore)
+
+    def _OnLeaderEvent(self, event: Event) -> None:
+        match event.get('type'):
+            case 'message':
+                # Send a message to this worker's chats
+                eventTime = datetime.fromisoformat(event['eventTime']) if event.get('eventTime') is not None else None
+                self.broadcaster.Broadcast(event['chatIds'], event['text'], eventTime)
+            case 'reset':
+                # The leader is about to send all of the subscriptions
+                self.subscriptions.Clear()
+            case 'subscription':
+                # A change to the subscriptions, possibly one this worker made
+                self.subscriptions.Apply(event['record'])
+            case 'standings':
+                # A Premier League match has finished so the table has changed, only worker 0 is sent this as it keeps the standings
+                self.standings.Invalidate()
 
     def start(self, update: Update, context: CallbackContext) -> None:
-        # Add the chat ID to the list if it isn't already in there
-        if update.message.chat_id not in self.chatIdList:
-            self.chatIdList.append(update.message.chat_id)
-            print(f'Chat ID {update.message.chat_id} added')
+        # Subscribe the chat if it isn't already subscribed
+        followedBefore = self._Followed()
+        if self.subscriptions.Add(update.message.chat_id):
+            log.info('Chat ID %d added', update.message.chat_id)
+
+            # The first chat on the default teams brings them back, so pick up any of their matches today
+            self._GetNewlyFollowedMatches(followedBefore)
 
     def stop(self, update: Update, context: CallbackContext) -> None:
         # If the user is me
         if update.message.from_user.first_name == 'Stephen' and update.message.from_user.last_name == 'Schleising':
-            # If the chat ID is in the list remove it
-            if update.message.chat_id in self.chatIdList:
-                self.chatIdList.remove(update.message.chat_id)
-                print(f'Chat ID {update.message.chat_id} removed')
+            # If the chat is subscribed unsubscribe it
+            if self.subscriptions.Remove(update.message.chat_id):
+                log.info('Chat ID %d removed', update.message.chat_id)
         else:
             # Otherwise respond rejecting the request to stop me
             update.message.reply_text('Only my master can stop me !!', quote=False)
@@ -127,223 +320,347 @@ class BanterBot:
                 try:
                     chatId = int(commands[1])
                 except:
-                    print('Need to enter a single integer only')
+                    log.info('Need to enter a single integer only')
                     update.message.reply_text('Need to enter a single integer only')
                 else:
-                    if chatId not in self.chatIdList:
-                        self.chatIdList.append(chatId)
-                        print(f'Chat ID {chatId} added')
+                    followedBefore = self._Followed()
+                    if self.subscriptions.Add(chatId):
+                        log.info('Chat ID %d added', chatId)
                         update.message.reply_text(f'Chat ID {chatId} added')
 
+                        # Pick up any of today's matches for the default teams if no chat was getting them
+                        self._GetNewlyFollowedMatches(followedBefore)
+
     def list(self, update: Update, context: CallbackContext) -> None:
         # If the user is me send back the list of chats the bot is going to send to
         if update.message.from_user.first_name == 'Stephen' and update.message.from_user.last_name == 'Schleising':
-            chatIds = '\n'.join(str(chatId) for chatId in self.chatIdList)
-            print(f'Chat IDs:\n{chatIds}')
+            chatIds = '\n'.join(str(chatId) for chatId in self.subscriptions)
+            log.info('Chat IDs:\n%s', chatIds)
             update.message.reply_text(f'Chat IDs:\n{chatIds}', quote=False)
 
     def GetTable(self, update: Update, context: CallbackContext) -> None:
-        table = Table()
-        print(table.condensedTable)
+        table = self.standings.GetTable()
+        log.debug('%s', table.condensedTable)
         update.message.reply_markdown_v2(table.condensedTable, quote=False)
 
     def can(self, update: Update, context: CallbackContext) -> None:
         # Log the request
-        print(f'{update.message.from_user.first_name} {update.message.from_user.last_name} in chat {update.message.chat.title} asked {update.message.text}')
-
-        # Get the request
-        request = update.message.text.lower().replace('?', '').split()[1:]
+        log.info('%s %s in chat %s asked %s', update.message.from_user.first_name, update.message.from_user.last_name, update.message.chat.title, update.message.text)
 
-        # Get a table object
-        table = Table()
+        # Split the request into words with the team mentions picked out, leaving out the command itself
+        request = teamAliasIndex.Parse(' '.join(update.message.text.split()[1:]))
 
-        # Test for the first team name being in two parts
-        test = ''.join(request[0:2])
-
-        # If the first team name is in two parts join them together and insert that at the start of the
-        # list replacing the original two entries
-        if test in reverseTeamLookup:
-            request.insert(0, ''.join((request.pop(0), request.pop(0))))
+        # Get the current table
+        table = self.standings.GetTable()
 
         # Match the request
         match request:
             # Can team A still beat team B
-            case [teamA, 'beat', *teamB] | [teamA, 'still', 'beat', *teamB]:
-                # If team B is in two parts join them togther
-                teamB = ''.join(teamB)
-                # Ensure both teams are in the lookup table
-                if teamA in reverseTeamLookup and teamB in reverseTeamLookup:
-                    # Check whether team A can beat team B
-                    if table.CanTeamABeatTeamB(reverseTeamLookup[teamA], reverseTeamLookup[teamB]):
-                        response = 'Yes'
-                    else:
-                        response = 'No'
+            case [TeamMention(team=teamA), 'beat', TeamMention(team=teamB)] | [TeamMention(team=teamA), 'still', 'beat', TeamMention(team=teamB)]:
+                # Check whether team A can beat team B
+                if table.CanTeamABeatTeamB(teamA, teamB):
+                    response = 'Yes'
                 else:
-                    # Standard response
-                    response = "Don't ask stupid questions"
+                    response = 'No'
             # Can team still win the league
-            case [team, 'win', 'the', 'league'] | [team, 'still', 'win', 'the', 'league']:
-                # Check the team is in the lookup table
-                if team in reverseTeamLookup:
-                    # Check whether the team can win the league
-                    if table.CanTeamWinTheLeague(reverseTeamLookup[team]):
-                        response = 'Yes'
-                    else:
-                        response = 'No'
+            case [TeamMention(team=team), 'win', 'the', 'league'] | [TeamMention(team=team), 'still', 'win', 'the', 'league']:
+                # Check whether the team can win the league
+                if table.CanTeamWinTheLeague(team):
+                    response = 'Yes'
                 else:
-                    # Standard response
-                    response = "Don't ask stupid questions"
+                    response = 'No'
             case _:
-                # Standard response
+                # Standard response
                 response = "Don't ask stupid questions"
 
         # Log and send the response
-        print(response)
+        log.info('Answered %s', response)
         update.message.reply_text(response)
 
+    def chances(self, update: Update, context: CallbackContext) -> None:
+        # Create the simulator the first time it's needed
+        if self.simulator is None:
+            from Footy.Simulator import Simulator
+            self.simulator = Simulator()
+
+        # Simulate the rest of the season, the result is reused until the standings change
+        result = self.simulator.GetResult(self.standings.GetTable())
+
+        if result is not None:
+            log.debug('%s', result.condensedChances)
+            update.message.reply_markdown_v2(result.condensedChances, quote=False)
+        else:
+            update.message.reply_text('Error, cannot simulate the season, no fixtures downloaded', quote=False)
+
+    def _ParseFollow(self, update: Update) -> Optional[Follow]:
+        # Get the team or competition named after the command
+        text = ' '.join(update.message.text.split()[1:])
+
+        if (team := teamAliasIndex.Resolve(text)) is not None:
+            return ('team', team)
+        if (competitionId := Competitions.FindCompetition(text)) is not None:
+            return ('competition', competitionId)
+
+        update.message.reply_text(f"I don't know who {text} are" if text else 'Follow who?', quote=False)
+        return None
+
+    @staticmethod
+    def _FollowName(follow: Follow) -> str:
+        # The name to show for a followed team or competition
+        kind, value = follow
+        if kind == 'team':
+            return allTeams[str(value)]['team'] if value in allTeams else str(value)
+        return Competitions.competitionNames.get(int(value), str(value))
+
+    def _Followed(self) -> tuple[frozenset[str], frozenset[int]]:
+        # The teams and competitions any chat gets messages about
+        return self.subscriptions.FollowedTeams(), self.subscriptions.FollowedCompetitions()
+
+    def _GetNewlyFollowedMatches(self, followedBefore: tuple[frozenset[str], frozenset[int]]) -> None:
+        # Refresh today's matches straight away if a change means a team or competition is now followed which wasn't before,
+        # in a cluster the leader does this when it gets the change
+        if self.mode == Cluster.WORKER:
+            return
+
+        teamsBefore, competitionsBefore = followedBefore
+        teams, competitions = self._Followed()
+        if not teams <= teamsBefore or not competitions <= competitionsBefore:
+            self.GetMatches()
+
+    def follow(self, update: Update, context: CallbackContext) -> None:
+        if (follow := self._ParseFollow(update)) is None:
+            return
+
+        # Check what was already followed before adding the chat
+        followedBefore = self._Followed()
+
+        if self.subscriptions.Follow(update.message.chat_id, follow):
+            log.info('Chat ID %d followed %s', update.message.chat_id, follow[1])
+            update.message.reply_text(f'Following {self._FollowName(follow)}', quote=False)
+
+            # Pick up any of today's matches for it straight away
+            self._GetNewlyFollowedMatches(followedBefore)
+        else:
+            update.message.reply_text(f'Already following {self._FollowName(follow)}', quote=False)
+
+    def unfollow(self, update: Update, context: CallbackContext) -> None:
+        if (follow := self._ParseFollow(update)) is None:
+            return
+
+        if self.subscriptions.Unfollow(update.message.chat_id, follow):
+            log.info('Chat ID %d unfollowed %s', update.message.chat_id, follow[1])
+            update.message.reply_text(f'No longer following {self._FollowName(follow)}', quote=False)
+        else:
+            update.message.reply_text(f'Not following {self._FollowName(follow)}', quote=False)
+
+    def following(self, update: Update, context: CallbackContext) -> None:
+        # List what the chat follows, or the default teams if it hasn't chosen any
+        follows = self.subscriptions.Following(update.message.chat_id)
+
+        if follows:
+            names = '\n'.join(sorted(self._FollowName(follow) for follow in follows))
+            update.message.reply_text(f'Following:\n{names}', quote=False)
+        else:
+            names = '\n'.join(sorted(allTeams[team]['team'] for team in self.subscriptions.defaultTeams))
+            update.message.reply_text(f'Following the usual teams:\n{names}', quote=False)
+
     def MatchUpdateHandler(self, context: CallbackContext) -> None:
         # Call get matches, this allows the function to be called directly
         self.GetMatches()
 
     def GetMatches(self) -> None:
         # Log that we are updating today's matches
-        print('Updating matches')
+        log.info('Updating matches')
+
+        # Get the matches for every team and competition followed by a chat, each match is polled once however many chats follow it
+        followedCompetitions = self.subscriptions.FollowedCompetitions()
+        self.footy.teams = sorted(self.subscriptions.FollowedTeams())
+        self.footy.competitions = sorted(set(Competitions.defaultCompetitions) | followedCompetitions)
+        self.footy.wholeCompetitions = set(followedCompetitions)
 
         # Get today's matches for the teams in the list
         self.todaysMatches = self.footy.GetMatches()
 
+        # Forget matches from previous days
+        yesterday = datetime.now(timezone.utc) - timedelta(days=1)
+        self.scheduledMatches = {matchId: matchDate for matchId, matchDate in self.scheduledMatches.items() if matchDate > yesterday}
+
         # If the download was successful, print the matches
         if self.todaysMatches is not None:
-            # Iterate over the matches
+            # Iterate over the matches, skipping any already scheduled
             for match in self.todaysMatches:
-                print(match)
+                if match.id in self.scheduledMatches:
+                    continue
+                self.scheduledMatches[match.id] = match.matchDate
+
+                log.info('%s', match)
 
                 # Get a random time offset between 0 and 30 seconds to ensure
                 # the easy win and empty seats messages don't appear all at once
                 timeOffsetSeconds = random.randint(0, 30)
 
-                # Set the context to the supported team name if My Team is not playing, otherwise set it to the opposition
-                teamContext=match.teamName
+                # Every job gets the match, so its messages go to the chats following either team or the competition
+                matchContext = match
 
                 # If the match is in the future
-                if (match.matchDate - timedelta(minutes=5)) > datetime.now(ZoneInfo('UTC')):
+                if (match.matchDate - timedelta(minutes=5)) > datetime.now(timezone.utc):
                     # Add a job to send a message that this should be an easy game 5 minutes before the game starts
-                    self.jq.run_once(self.SendEasyWin, match.matchDate - timedelta(minutes=5, seconds=-timeOffsetSeconds), context=teamContext)
+                    self.jq.run_once(self.SendEasyWin, match.matchDate - timedelta(minutes=5, seconds=-timeOffsetSeconds), context=matchContext)
 
-                # Add a job to check the scores once the game starts
-                matchContext = match
-                runTime = match.matchDate if match.matchDate > datetime.now(ZoneInfo('UTC')) else 0
-                self.jq.run_once(self.SendScoreUpdates, runTime, context=matchContext)
+                # Add a job to start polling the scores once the game starts
+                runTime = match.matchDate if match.matchDate > datetime.now(timezone.utc) else 0
+                self.jq.run_once(self.StartMatchPolling, runTime, context=matchContext)
 
-                if (match.matchDate + timedelta(minutes=5)) > datetime.now(ZoneInfo('UTC')):
+                if (match.matchDate + timedelta(minutes=5)) > datetime.now(timezone.utc):
                     # If this is a home game for one of the teams we're interested in, add the empty seats message
                     if match.homeTeam in supportedTeamMapping:
                         # Add a job to send the empty seats message 5 minutes after the game starts
-                        self.jq.run_once(self.SendEmptySeats, match.matchDate + timedelta(minutes=5, seconds=timeOffsetSeconds), context=teamContext)
+                        self.jq.run_once(self.SendEmptySeats, match.matchDate + timedelta(minutes=5, seconds=timeOffsetSeconds), context=matchContext)
         else:
-            print('Download Failed')
+            log.warning('Download Failed')
+
+    def ChatsForMatch(self, match: Match) -> frozenset[int]:
+        # The chats following either team or the match's competition
+        return self.subscriptions.ChatsFor((match.homeTeam, match.awayTeam), match.competitionId)
+
+    def ChatsBySide(self, match: Match) -> dict[str, frozenset[int]]:
+        # The chats following the match grouped by the team they're on, chats following only the opposition get its side,
+        # everyone else, following the match's own team, both teams or only the competition, gets the match's own team's side
+        oppositionName = match.awayTeam if match.IsTeamSide(match.homeTeam) else match.homeTeam
+        teamChats = self.subscriptions.ChatsFor((match.teamName,))
+        oppositionChats = self.subscriptions.ChatsFor((oppositionName,)) - teamChats
+
+        return {match.teamName: self.ChatsForMatch(match) - oppositionChats, oppositionName: oppositionChats}
 
-    def SendMessage(self, bot: Bot, message: Optional[str]):
+    def SendMessage(self, message: Optional[str], chatIds: Iterable[int], eventTime: Optional[datetime] = None):
         if message is not None:
-            for chatId in self.chatIdList:
-                bot.send_message(chat_id=chatId, text=message)
-            print(message)
+            # Queue the message for the chats, the broadcaster sends it within Telegram's limits,
+            # the event time lets it measure how long the message took to arrive
+            self.broadcaster.Broadcast(chatIds, message, eventTime)
+            log.info('Sending %s', message)
         else:
-            print('No Status Change')
+            # Most updates don't need a message, so only log this now and then
+            log.debug('No Status Change', extra=Log.Every(60))
 
-    def SendScoreUpdates(self, context: CallbackContext) -> None:
+    def StartMatchPolling(self, context: CallbackContext) -> None:
         if context.job is not None and isinstance(context.job.context, Match):
-            oldMatchData: Match = context.job.context
-            newMatchData: Optional[Match] = self.footy.GetMatch(oldMatchData)
-
-            if newMatchData is not None:
-                # Get the dict details of the team we're sending a message about
-                teamDict = allTeams[newMatchData.teamName]
-
-                message = None
-
-                # Check if this is the start of the match
-                if newMatchData.matchChanges.fullTime:
-                    if newMatchData.matchChanges.teamWon:
-                        message = newMatchData.bantzStrings.teamWon[random.randint(0, len(newMatchData.bantzStrings.teamWon ) - 1)].format(**teamDict)
-                    if newMatchData.matchChanges.teamLost:
-                        message = newMatchData.bantzStrings.teamLost[random.randint(0, len(newMatchData.bantzStrings.teamLost ) - 1)].format(**teamDict)
-                    if newMatchData.matchChanges.teamDrew:
-                        message = newMatchData.bantzStrings.teamDrew[random.randint(0, len(newMatchData.bantzStrings.teamDrew ) - 1)].format(**teamDict)
-                else:
-                    if newMatchData.matchChanges.firstHalfStarted:
-                        message = newMatchData.bantzStrings.teamMatchStarted[random.randint(0, len(newMatchData.bantzStrings.teamMatchStarted ) - 1)].format(**teamDict)
-                    elif newMatchData.matchChanges.goalScored:
-                        # Check for a goal
-                        match newMatchData.matchState:
-                            case Drawing():
-                                message = newMatchData.bantzStrings.drawing[random.randint(0, len(newMatchData.bantzStrings.drawing) - 1)].format(**teamDict)
-                            case TeamLeadByOne():
-                                message = newMatchData.bantzStrings.teamLeadByOne[random.randint(0, len(newMatchData.bantzStrings.teamLeadByOne) - 1)].format(**teamDict)
-                            case TeamExtendingLead():
-                                message = newMatchData.bantzStrings.teamExtendingLead[random.randint(0, len(newMatchData.bantzStrings.teamExtendingLead) - 1)].format(**teamDict)
-                            case TeamLosingLead():
-                                message = newMatchData.bantzStrings.teamLosingLead[random.randint(0, len(newMatchData.bantzStrings.teamLosingLead) - 1)].format(**teamDict)
-                            case TeamDeficitOfOne():
-                                message = newMatchData.bantzStrings.teamDeficitOfOne[random.randint(0, len(newMatchData.bantzStrings.teamDeficitOfOne) - 1)].format(**teamDict)
-                            case TeamExtendingDeficit():
-                                message = newMatchData.bantzStrings.teamExtendingDeficit[random.randint(0, len(newMatchData.bantzStrings.teamExtendingDeficit) - 1)].format(**teamDict)
-                            case TeamLosingDeficit():
-                                message = newMatchData.bantzStrings.teamLosingDeficit[random.randint(0, len(newMatchData.bantzStrings.teamLosingDeficit) - 1)].format(**teamDict)
-
-                    # Add a job to check the scores again in 20 seconds
-                    self.jq.run_once(self.SendScoreUpdates, 20, context=newMatchData)
-
-                # If there is a message, add the scoreline
-                if message is not None:
-                    message = f'{message}'
-
-                self.SendMessage(context.bot, message)
+            # Add the match to the live poller, score updates are sent from the poller's handler
+            self.poller.AddMatch(context.job.context, self.SendScoreUpdates)
+
+    def PollLiveMatches(self, context: CallbackContext) -> None:
+        # Get the latest data for all live matches
+        self.poller.Poll()
+
+        # Log the startup time the first time the matches are polled
+        if self.firstPoll:
+            self.firstPoll = False
+            log.info('First poll completed %.2fs after launch', perf_counter() - launchTime)
+
+    def SendScoreUpdates(self, newMatchData: Match) -> None:
+        # If a Premier League match has finished the table has changed, so refresh it
+        if newMatchData.status == MatchStatus.finished and newMatchData.competitionId == Competitions.premierLeague:
+            if self.mode == Cluster.LEADER:
+                # The standings are kept by the worker answering the commands, it's told even if it's not connected yet
+                self.server.SendTo(0, Cluster.StandingsChangedEvent())
             else:
-                # This update failed, try again in 20 seconds using the old match data as the context
-                self.jq.run_once(self.SendScoreUpdates, 20, context=oldMatchData)
-        else:
+                self.standings.Invalidate()
+
+        # Work out what has happened, most updates don't need a message
+        if Bantz.EventFor(newMatchData) is None:
+            self.SendMessage(None, ())
             return
 
+        # Send the message only to the chats following the match, timed from when the API last updated it
+        eventTime = ParseUtcDate(newMatchData.lastUpdated) if newMatchData.lastUpdated is not None else None
+
+        # Each chat gets the banter for the side it follows, with the event as that side sees it
+        for teamName, sideChatIds in self.ChatsBySide(newMatchData).items():
+            if not sideChatIds or (event := Bantz.EventFor(newMatchData, teamName)) is None:
+                continue
+
+            # Each chat gets the next phrase from its own shuffle bag, the chats getting the same phrase are sent it together
+            for message, chatIds in self.bantz.Messages(teamName, event, sideChatIds).items():
+                self.SendMessage(message, chatIds, eventTime)
+
     def SendEmptySeats(self, context: CallbackContext) -> None:
-        if  context.job is not None and isinstance(context.job.context, str):
+        if  context.job is not None and isinstance(context.job.context, Match):
             # Get the full team name
-            team = context.job.context
+            team = context.job.context.teamName
 
-            # Get the ground for this tean
+            # Get the ground for this tean
             ground = allTeams[team]['ground'] if team in allTeams else None
 
             if ground is not None:
                 # Send the message
-                self.SendMessage(context.bot, f'Plenty of empty seats at {ground}')
+                self.SendMessage(f'Plenty of empty seats at {ground}', self.ChatsForMatch(context.job.context))
 
     def SendEasyWin(self, context: CallbackContext) -> None:
-        if  context.job is not None and isinstance(context.job.context, str):
-            # Get the full name for this team
-            team = context.job.context
-
-            # Get the shorter name for this team
-            teamName = allTeams[team]['team'] if team in allTeams else team
-
-            # Send easy win if not supported, tough game if supported
-            if team in supportedTeamMapping:
-                # Send the message
-                self.SendMessage(context.bot, f'Should be an easy win for {teamName}')
-            else:
-                # Send the message
-                self.SendMessage(context.bot, f'{teamName} will probably lose today')
+        if  context.job is not None and isinstance(context.job.context, Match):
+            # Get the full name of the team each chat following the match is on
+            for team, chatIds in self.ChatsBySide(context.job.context).items():
+                if not chatIds:
+                    continue
+
+                # Get the shorter name for this team
+                teamName = allTeams[team]['team'] if team in allTeams else team
+
+                # Send easy win if not supported, tough game if supported
+                if team in supportedTeamMapping:
+                    # Send the message
+                    self.SendMessage(f'Should be an easy win for {teamName}', chatIds)
+                else:
+                    # Send the message
+                    self.SendMessage(f'{teamName} will probably lose today', chatIds)
 
     # Log errors
     def error(self, update, context: CallbackContext) -> None:
-        self.logger.warning('Update "%s" caused error "%s"', update, context.error)
+        log.warning('Update "%s" caused error "%s"', update, context.error)
 
 # Main function
 def main() -> None:
     # Filter out a warning from dateparser
     warnings.filterwarnings('ignore', message='The localize method is no longer necessary')
 
-    # Start the banter bot
-    BanterBot()
+    # Choose how to run, by default everything runs in this one process
+    parser = argparse.ArgumentParser(description='Send football banter to Telegram chats')
+    parser.add_argument('--mode', choices=[Cluster.SINGLE, Cluster.LEADER, Cluster.WORKER], default=Cluster.SINGLE, help='run everything, only poll the API, or only send messages')
+    parser.add_argument('--worker-index', type=int, default=0, help='which worker this is, worker 0 also answers commands')
+    parser.add_argument('--workers', type=int, default=1, help='number of workers sending messages')
+    parser.add_argument('--socket', type=Path, default=SOCKET_FILE, help='socket the leader and workers talk over')
+    parser.add_argument('--cluster', type=int, metavar='N', help='start a leader and N workers on this machine')
+    parser.add_argument('--webhook-url', help='public HTTPS URL for Telegram to post updates to, instead of polling for them')
+    parser.add_argument('--webhook-listen', default=WEBHOOK_LISTEN, help='address the webhook listens on')
+    parser.add_argument('--webhook-port', type=int, default=WEBHOOK_PORT, help='port the webhook listens on')
+    args = parser.parse_args()
+
+    if args.cluster is not None:
+        # Start the leader and the workers as separate processes, and stop them all together
+        RunCluster(args.cluster, args.socket, args.webhook_url, args.webhook_listen, args.webhook_port)
+    else:
+        # Start the banter bot
+        BanterBot(args.mode, args.worker_index, args.workers, args.socket, args.webhook_url, args.webhook_listen, args.webhook_port)
+
+def RunCluster(workerCount: int, socketPath: Path, webhookUrl: Optional[str], webhookListen: str, webhookPort: int) -> None:
+    # The same script is run for each process, the leader first so its socket is there for the workers
+    command = [sys.executable, __file__, '--workers', str(workerCount), '--socket', str(socketPath)]
+    processes = [subprocess.Popen(command + ['--mode', Cluster.LEADER])]
+
+    # Worker 0 answers the commands, so it's the one which gets the updates
+    webhookOptions = ['--webhook-url', webhookUrl, '--webhook-listen', webhookListen, '--webhook-port', str(webhookPort)] if webhookUrl is not None else []
+    processes += [subprocess.Popen(command + ['--mode', Cluster.WORKER, '--worker-index', str(index)] + (webhookOptions if index == 0 else [])) for index in range(workerCount)]
+
+    try:
+        # Wait for any of them to stop
+        while all(process.poll() is None for process in processes):
+            threading.Event().wait(1)
+    except KeyboardInterrupt:
+        pass
+
+    # Stop the workers first so they've sent their messages, then the leader
+    for process in reversed(processes):
+        if process.poll() is None:
+            process.send_signal(signal.SIGINT)
+            process.wait()
 
 if __name__ == '__main__':
     # Call the main function
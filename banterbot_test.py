@@ -0,0 +1,156 @@
+import os
+from pathlib import Path
+import tempfile
+from types import SimpleNamespace
+from unittest import mock
+
+import telegram.ext
+
+from banterbot import BanterBot
+from Footy.Bantz import Bantz
+import Footy.Log as Log
+import Footy.Metrics as Metrics
+from Footy.Match import Match
+from Footy.TeamData import teamsToWatch
+import Footy.Session as Session
+from Footy.Session import FootySession
+import Messaging.Cluster as Cluster
+
+def MatchData(homeScore: int, awayScore: int) -> dict:
+    # Arsenal at home to Burnley, neither of them one of the usual teams
+    return {
+        'id': 1,
+        'homeTeam': {'name': 'Arsenal FC'},
+        'awayTeam': {'name': 'Burnley FC'},
+        'utcDate': '2022-05-01T14:00:00Z',
+        'stage': 'REGULAR_SEASON',
+        'group': None,
+        'status': 'IN_PLAY',
+        'score': {'fullTime': {'homeTeam': homeScore, 'awayTeam': awayScore}},
+    }
+
+class FakeJobQueue:
+    def __init__(self) -> None:
+        # The jobs added, by the callback's name
+        self.added: list[str] = []
+
+    def run_daily(self, callback, *args, **kwargs) -> None:
+        self.added.append(callback.__name__)
+
+    def run_repeating(self, callback, *args, **kwargs) -> None:
+        self.added.append(callback.__name__)
+
+    def run_once(self, callback, *args, **kwargs) -> None:
+        self.added.append(callback.__name__)
+
+    def jobs(self) -> tuple:
+        return ()
+
+    def start(self) -> None:
+        pass
+
+    def stop(self) -> None:
+        pass
+
+class FakeDispatcher:
+    def __init__(self) -> None:
+        # The commands handled
+        self.commands: list[str] = []
+
+    def add_handler(self, handler) -> None:
+        self.commands.extend(handler.command)
+
+    def add_error_handler(self, callback) -> None:
+        pass
+
+class FakeUpdater:
+    def __init__(self, token: str, use_context: bool = True) -> None:
+        # An updater which never talks to Telegram, idle returns straight away so the constructor finishes
+        self.token = token
+        self.bot = None
+        self.job_queue = FakeJobQueue()
+        self.dispatcher = FakeDispatcher()
+        self.polling = False
+
+    def start_polling(self) -> None:
+        self.polling = True
+
+    def idle(self) -> None:
+        pass
+
+# Build the bot without Telegram, the metrics on any free port, and don't wait for a signal to stop
+telegram.ext.Updater = FakeUpdater
+Metrics.METRICS_PORT = 0
+BanterBot._WaitForSignal = staticmethod(lambda: None)
+testDirectory = Path(__file__).resolve().parent
+
+# Only the bot's errors are logged, the setting is put back afterwards so later tests in the same process aren't affected
+with mock.patch.dict(os.environ, {Log.LEVELS_VARIABLE: 'banterbot=ERROR'}), tempfile.TemporaryDirectory() as directory:
+    # Run where the token, subscriptions and cache files can be written, with the API pointed somewhere that refuses connections
+    os.chdir(directory)
+    Path('bot_token.txt').write_text('123456:TEST', encoding='utf-8')
+    Session._session = FootySession(baseUrl='http://127.0.0.1:1/v2', headers={'X-Auth-Token': 'test-token'})
+
+    # Everything runs in one process by default, polling the API and answering the commands
+    bot = BanterBot()
+    assert bot.updater.token == '123456:TEST'
+    assert bot.updater.polling
+    assert {'start', 'stop', 'add', 'list', 'table', 'can', 'chances', 'follow', 'unfollow', 'following'} <= set(bot.dp.commands), bot.dp.commands
+    assert {'MatchUpdateHandler', 'PollLiveMatches'} <= set(bot.jq.added), bot.jq.added
+
+    # Until a chat is subscribed no teams are followed, the first chat to start brings in the usual teams straight away
+    refreshes = []
+    bot.GetMatches = lambda: refreshes.append(sorted(bot.subscriptions.FollowedTeams()))
+    bot.start(SimpleNamespace(message=SimpleNamespace(chat_id=10)), None)
+    assert refreshes == [sorted(teamsToWatch)], refreshes
+
+    # Another chat on the same teams doesn't need a refresh
+    bot.start(SimpleNamespace(message=SimpleNamespace(chat_id=11)), None)
+    assert len(refreshes) == 1
+    del bot.GetMatches
+
+    # Chats get the banter for the side they follow, whoever the usual teams are
+    sent: list[tuple[str, frozenset[int]]] = []
+    bot.broadcaster = SimpleNamespace(Broadcast=lambda chatIds, text, eventTime=None: sent.append((text, frozenset(chatIds))))
+    bot.bantz = Bantz(seed=0)
+    for chatId, follow in [(1, ('team', 'Arsenal FC')), (2, ('team', 'Burnley FC')), (3, ('competition', 2021))]:
+        bot.subscriptions.Add(chatId)
+        bot.subscriptions.Follow(chatId, follow)
+
+    match = Match(MatchData(0, 0), 'Premier League', competitionId=2021)
+    match.Update(MatchData(1, 0))
+    bot.SendScoreUpdates(match)
+    arsenalPhrases = bot.bantz.Phrases('Arsenal FC', 'teamLeadByOne')
+    burnleyPhrases = bot.bantz.Phrases('Burnley FC', 'teamDeficitOfOne')
+    assert any(text in arsenalPhrases and chatIds == {1} for text, chatIds in sent), sent
+    assert all(text in burnleyPhrases for text, chatIds in sent if chatIds & {2, 3}), sent
+    assert {chatId for _, chatIds in sent for chatId in chatIds} == {1, 2, 3}
+
+    # A leader polls the API but doesn't answer commands
+    leader = BanterBot(Cluster.LEADER, workerCount=1, socketPath=Path(directory) / 'banterbot.sock')
+    assert not leader.updater.polling and not leader.dp.commands
+    assert 'PollLiveMatches' in leader.jq.added
+
+    # A worker doesn't poll the API, worker 0 answers the commands
+    worker = BanterBot(Cluster.WORKER, workerIndex=0, workerCount=1, socketPath=Path(directory) / 'banterbot.sock')
+    assert worker.updater.polling and 'follow' in worker.dp.commands
+    assert not hasattr(worker, 'footy') and 'PollLiveMatches' not in worker.jq.added
+
+    # Only worker 0 keeps the standings, the leader tells it when a Premier League match finishes
+    assert not hasattr(leader, 'standings')
+    published: list[tuple[int, dict]] = []
+    leader.server = SimpleNamespace(SendTo=lambda index, event: published.append((index, event)))
+    leader.broadcaster = SimpleNamespace(Broadcast=lambda chatIds, text, eventTime=None: None)
+    finished = Match(MatchData(1, 0), 'Premier League', competitionId=2021)
+    finished.Update(dict(MatchData(1, 0), status='FINISHED'))
+    leader.SendScoreUpdates(finished)
+    assert published == [(0, Cluster.StandingsChangedEvent())], published
+
+    invalidated = []
+    worker.standings.Invalidate = lambda: invalidated.append(True)
+    worker._OnLeaderEvent(Cluster.StandingsChangedEvent())
+    assert invalidated == [True]
+
+    os.chdir(testDirectory)
+
+print('BanterBot tests passed')
@@ -0,0 +1,90 @@
+import random
+from typing import Optional
+
+from Footy.Bantz import Bantz, EventFor, ShuffleBag
+from Footy.Match import Match, MatchChanges
+from Footy import MatchStates
+from Footy import SupportedBantzStrings, UnsupportedBantzStrings
+
+# Every phrase is filled in for every team when the templates are loaded
+teams = {
+    'Tottenham Hotspur FC': {'team': 'Tottenham', 'name': 'Thommo'},
+    'Arsenal FC': {'team': 'Arsenal', 'name': 'Gooner'},
+}
+bantz = Bantz(teams, supportedTeams=['Tottenham Hotspur FC'], seed=1)
+assert bantz.Phrases('Tottenham Hotspur FC', 'teamWon') == tuple(phrase.format(team='Tottenham', name='Thommo') for phrase in SupportedBantzStrings.teamWon)
+assert bantz.Phrases('Arsenal FC', 'drawing') == tuple(phrase.format(team='Arsenal', name='Gooner') for phrase in UnsupportedBantzStrings.drawing)
+assert not any('{' in phrase for phrase in bantz.Phrases('Arsenal FC', 'teamExtendingLead'))
+
+# A team not in the team data is added with its full name the first time it's needed
+assert bantz.Phrases('Real Madrid CF', 'teamMatchStarted')[0] == UnsupportedBantzStrings.teamMatchStarted[0].format(team='Real Madrid CF', name='')
+
+# A chat sees every phrase once before any is repeated, and never the same one twice in a row
+phrases = bantz.Phrases('Arsenal FC', 'teamLeadByOne')
+seen = []
+for _ in range(3 * len(phrases)):
+    [(message, chatIds)] = bantz.Messages('Arsenal FC', 'teamLeadByOne', [42]).items()
+    assert chatIds == [42]
+    seen.append(message)
+for start in range(0, len(seen), len(phrases)):
+    assert sorted(seen[start:start + len(phrases)]) == sorted(phrases)
+assert all(first != second for first, second in zip(seen, seen[1:]))
+
+# Each chat has its own bags, and chats getting the same phrase are grouped so it's sent once
+messages = bantz.Messages('Arsenal FC', 'drawing', range(100))
+assert sorted(chatId for chatIds in messages.values() for chatId in chatIds) == list(range(100))
+assert 1 < len(messages) <= len(UnsupportedBantzStrings.drawing)
+
+# A bag of one always gives the one phrase
+bag = ShuffleBag(1)
+assert [bag.Draw(random.Random(0)) for _ in range(3)] == [0, 0, 0]
+
+# The event for each change to a match
+def MatchData(homeTeam: str, awayTeam: str, status: str, homeScore: Optional[int] = None, awayScore: Optional[int] = None) -> dict:
+    return {
+        'id': 1,
+        'homeTeam': {'name': homeTeam},
+        'awayTeam': {'name': awayTeam},
+        'utcDate': '2022-05-01T14:00:00Z',
+        'stage': 'REGULAR_SEASON',
+        'group': None,
+        'status': status,
+        'score': {'fullTime': {'homeTeam': homeScore, 'awayTeam': awayScore}},
+    }
+
+def FakeMatch(matchState: MatchStates.MatchState = MatchStates.drawing, **changes: bool) -> Match:
+    match = Match(MatchData('Chelsea FC', 'Burnley FC', 'IN_PLAY'), 'Premier League')
+    match.matchChanges = MatchChanges(**changes)
+    match.matchState = matchState
+    return match
+
+assert EventFor(FakeMatch()) is None
+assert EventFor(FakeMatch(firstHalfStarted=True)) == 'teamMatchStarted'
+assert EventFor(FakeMatch(goalScored=True, matchState=MatchStates.teamLosingLead)) == 'teamLosingLead'
+assert EventFor(FakeMatch(fullTime=True, teamDrew=True)) == 'teamDrew'
+assert EventFor(FakeMatch(halfTime=True)) is None
+
+# Neither side is one of the usual teams, so the match's own team is the away side, but a chat following the home side gets its view
+match = Match(MatchData('Arsenal FC', 'Burnley FC', 'IN_PLAY', 0, 0), 'Premier League')
+match.Update(MatchData('Arsenal FC', 'Burnley FC', 'IN_PLAY', 1, 0))
+assert match.teamName == 'Burnley FC'
+assert EventFor(match) == EventFor(match, 'Burnley FC') == 'teamDeficitOfOne'
+assert EventFor(match, 'Arsenal FC') == 'teamLeadByOne'
+match.Update(MatchData('Arsenal FC', 'Burnley FC', 'IN_PLAY', 2, 0))
+assert EventFor(match, 'Arsenal FC') == 'teamExtendingLead' and EventFor(match, 'Burnley FC') == 'teamExtendingDeficit'
+match.Update(MatchData('Arsenal FC', 'Burnley FC', 'IN_PLAY', 2, 1))
+assert EventFor(match, 'Arsenal FC') == 'teamLosingLead' and EventFor(match, 'Burnley FC') == 'teamLosingDeficit'
+match.Update(MatchData('Arsenal FC', 'Burnley FC', 'FINISHED', 2, 1))
+assert EventFor(match, 'Arsenal FC') == 'teamWon' and EventFor(match, 'Burnley FC') == 'teamLost'
+assert match.ScoresFor('Arsenal FC') == (2, 1) and match.ScoresFor('Burnley FC') == (1, 2)
+
+# The opposition's state survives a restart
+restored = Match.FromCheckpoint(match.ToCheckpoint())
+assert restored.StateFor('Arsenal FC') is match.StateFor('Arsenal FC') and restored.StateFor('Burnley FC') is match.StateFor('Burnley FC')
+
+# A draw is a draw for either side, whoever is playing
+match = Match(MatchData('Arsenal FC', 'Burnley FC', 'IN_PLAY', 1, 1), 'Premier League')
+match.Update(MatchData('Arsenal FC', 'Burnley FC', 'FINISHED', 1, 1))
+assert EventFor(match, 'Arsenal FC') == EventFor(match, 'Burnley FC') == 'teamDrew'
+
+print('Bantz tests passed')
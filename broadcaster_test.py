@@ -0,0 +1,87 @@
+import threading
+import time
+
+from telegram.error import RetryAfter, Unauthorized
+
+import Footy.Metrics as Metrics
+import Messaging.Broadcaster as Broadcaster
+from Messaging.Broadcaster import Broadcaster as MessageBroadcaster
+
+# Make the limits short so the test runs quickly
+Broadcaster.PRIVATE_CHAT_INTERVAL = 0.05
+Broadcaster.GROUP_CHAT_INTERVAL = 0.1
+
+class FakeBot:
+    def __init__(self) -> None:
+        # Messages sent to each chat with the time they were sent
+        self.sent: dict[int, list[tuple[float, str]]] = {}
+        self.floodControlled = False
+        self._lock = threading.Lock()
+
+    def send_message(self, chat_id: int, text: str) -> None:
+        # Pretend each send takes a little while
+        time.sleep(0.01)
+
+        # Flood control the first message to chat 3 once
+        if chat_id == 3 and not self.floodControlled:
+            self.floodControlled = True
+            raise RetryAfter(0.2)
+
+        # Chat 4 has removed the bot
+        if chat_id == 4:
+            raise Unauthorized('Forbidden: bot was kicked from the group chat')
+
+        with self._lock:
+            self.sent.setdefault(chat_id, []).append((time.monotonic(), text))
+
+bot = FakeBot()
+broadcaster = MessageBroadcaster(bot, workerCount=4, messagesPerSecond=200)
+
+# Broadcasting must not block the caller
+chatIds = [1, 2, 3, 4, -5] + list(range(10, 50))
+startTime = time.monotonic()
+for goal in range(3):
+    broadcaster.Broadcast(chatIds, f'Goal {goal}')
+queueTime = time.monotonic() - startTime
+print(f'Queued {3 * len(chatIds)} messages in {queueTime * 1000:.2f} ms')
+assert queueTime < 0.05
+
+broadcaster.Stop(10)
+print(f'Sent {broadcaster.sentCount}, retried {broadcaster.retryCount}, dropped {broadcaster.droppedCount}, average delay {broadcaster.totalDelay / broadcaster.sentCount * 1000:.0f} ms')
+
+# Every chat apart from the one that removed the bot gets every message, in order
+for chatId in chatIds:
+    if chatId == 4:
+        assert chatId not in bot.sent
+        continue
+
+    times, texts = zip(*bot.sent[chatId])
+    assert list(texts) == ['Goal 0', 'Goal 1', 'Goal 2'], (chatId, texts)
+
+    # Messages to the same chat are spaced out by the per chat limit
+    interval = Broadcaster.GROUP_CHAT_INTERVAL if chatId < 0 else Broadcaster.PRIVATE_CHAT_INTERVAL
+    assert all(later - earlier >= interval * 0.9 for earlier, later in zip(times, times[1:])), chatId
+
+# The flood controlled message was retried after the requested delay
+assert broadcaster.retryCount == 1
+assert broadcaster.droppedCount == 3
+assert broadcaster.sentCount == 3 * (len(chatIds) - 1)
+assert broadcaster.queueDepth == 0
+
+# An unexpected error drops the message without stopping the worker, which carries on with its other chats
+class BrokenBot(FakeBot):
+    def send_message(self, chat_id: int, text: str) -> None:
+        if chat_id == 6 and text == 'Goal 0':
+            raise ValueError('Bad markup')
+        super().send_message(chat_id, text)
+
+bot = BrokenBot()
+broadcaster = MessageBroadcaster(bot, workerCount=1, messagesPerSecond=200)
+broadcaster.Broadcast([6, 7], 'Goal 0')
+broadcaster.Broadcast([6, 7], 'Goal 1')
+broadcaster.Stop(10)
+assert [text for _, text in bot.sent[6]] == ['Goal 1'], bot.sent
+assert [text for _, text in bot.sent[7]] == ['Goal 0', 'Goal 1'], bot.sent
+assert broadcaster.droppedCount == 1 and list(Metrics.sendErrors.Samples()) == ['telegram_send_errors_total 1']
+
+print('Broadcaster tests passed')
@@ -0,0 +1,71 @@
+import json
+import os
+from pathlib import Path
+import tempfile
+import time
+
+from Footy.Checkpoint import MAX_CHECKPOINT_AGE, MatchCheckpoint
+from Footy.Match import Match
+
+def MatchData(matchId: int, homeScore: int, awayScore: int) -> dict:
+    return {
+        'id': matchId,
+        'homeTeam': {'name': 'Arsenal FC'},
+        'awayTeam': {'name': 'Burnley FC'},
+        'utcDate': '2022-05-01T14:00:00Z',
+        'stage': 'REGULAR_SEASON',
+        'group': None,
+        'status': 'IN_PLAY',
+        'lastUpdated': '2022-05-01T14:30:00Z',
+        'score': {'fullTime': {'homeTeam': homeScore, 'awayTeam': awayScore}},
+    }
+
+with tempfile.TemporaryDirectory() as directory:
+    path = Path(directory) / 'checkpoint.json'
+    checkpoint = MatchCheckpoint(path)
+
+    # No checkpoint, nothing to restore
+    assert checkpoint.Load() == []
+
+    # A match part way through, which has moved on from its first state, and one that hasn't started scoring
+    leading = Match(MatchData(1, 0, 0), 'Premier League', competitionId=2021)
+    leading.Update(MatchData(1, 1, 0))
+    leading.Update(MatchData(1, 2, 0))
+    level = Match(MatchData(2, 0, 0), 'FA Cup')
+    checkpoint.Save([leading, level])
+
+    # The matches come back as they were saved, in the states they had reached
+    restored = MatchCheckpoint(path).Load()
+    assert [match.ToCheckpoint() for match in restored] == [leading.ToCheckpoint(), level.ToCheckpoint()]
+    assert restored[0].matchState is leading.matchState and restored[0].oppositionState is leading.oppositionState
+    assert (restored[0].homeScore, restored[0].awayScore, restored[0].competitionId) == (2, 0, 2021)
+    assert restored[1].competitionId is None
+
+    # Nothing is written when the matches haven't changed, and the temporary file never outlives a save
+    os.utime(path, (0, 0))
+    checkpoint.Save([leading, level])
+    assert path.stat().st_mtime == 0
+    checkpoint.Save([leading])
+    assert path.stat().st_mtime > 0 and len(MatchCheckpoint(path).Load()) == 1
+    assert not path.with_name('checkpoint.json.tmp').exists()
+
+    # A checkpoint from a previous match day is ignored
+    data = json.loads(path.read_text(encoding='utf-8'))
+    data['savedAt'] = time.time() - MAX_CHECKPOINT_AGE - 60
+    path.write_text(json.dumps(data), encoding='utf-8')
+    assert MatchCheckpoint(path).Load() == []
+    assert len(MatchCheckpoint(path, maxAge=MAX_CHECKPOINT_AGE + 120).Load()) == 1
+
+    # A torn, corrupt or wrongly shaped file is ignored rather than stopping the bot
+    checkpoint.Save([leading, level])
+    contents = path.read_bytes()
+    for broken in [contents[:len(contents) // 2], b'', b'\xff\xfe\x00garbage', b'[]', b'{"matches": []}', b'{"savedAt": "soon", "matches": []}', b'{"savedAt": 0, "matches": 5}']:
+        path.write_bytes(broken)
+        assert MatchCheckpoint(path, maxAge=float('inf')).Load() == [], broken
+
+    # A match which can't be restored is skipped, the rest are still restored
+    data = {'savedAt': time.time(), 'matches': [leading.ToCheckpoint(), {'match': {}}, dict(level.ToCheckpoint(), matchState='Winning')]}
+    path.write_text(json.dumps(data), encoding='utf-8')
+    assert [match.id for match in MatchCheckpoint(path).Load()] == [1]
+
+print('Checkpoint tests passed')
@@ -0,0 +1,43 @@
+import itertools
+import random
+
+from Footy.Elimination import CanTeamsWinTheLeague
+
+# A team too far behind with too few games left is out, level on points still counts as top
+points = {'Arsenal FC': 80, 'Chelsea FC': 74, 'Everton FC': 70}
+fixtures = [('Arsenal FC', 'Chelsea FC'), ('Chelsea FC', 'Everton FC')]
+assert CanTeamsWinTheLeague(points, fixtures) == {'Arsenal FC': True, 'Chelsea FC': True, 'Everton FC': False}
+
+# Arsenal need Chelsea to drop points against Everton, but a draw takes Everton above them and a Chelsea win takes Chelsea
+# above them, sharing out the points can't show that, only the search for real results finds it
+points = {'Arsenal FC': 10, 'Chelsea FC': 8, 'Everton FC': 10}
+fixtures = [('Chelsea FC', 'Everton FC')]
+assert CanTeamsWinTheLeague(points, fixtures) == {'Arsenal FC': False, 'Chelsea FC': True, 'Everton FC': True}
+
+# With no outcomes left to try the team is assumed to still be able to win
+assert CanTeamsWinTheLeague(points, fixtures, maxSearchNodes=0)['Arsenal FC'] is True
+
+# A season where the exact search has to try a lot of outcomes
+generator = random.Random(33)
+teams = [f'Team {index}' for index in range(20)]
+fixtures = list(itertools.combinations(teams, 2))
+generator.shuffle(fixtures)
+fixtures = fixtures[:50]
+points = {team: 40 + generator.randint(0, 6) for team in teams}
+
+# The default budget is enough to settle it, giving the same answer as an unlimited search
+exact = CanTeamsWinTheLeague(points, fixtures, maxSearchNodes=10 ** 9)
+assert CanTeamsWinTheLeague(points, fixtures) == exact
+
+# The searches share the budget, a small one gives the same answer every time however busy the machine is
+limited = CanTeamsWinTheLeague(points, fixtures, maxSearchNodes=2000)
+assert all(CanTeamsWinTheLeague(points, fixtures, maxSearchNodes=2000) == limited for _ in range(3))
+
+# Every team the flow bound rules out is still ruled out and running out of budget never rules a team out,
+# so the answer always lies between the flow bound alone and the exact answer
+flowBoundOnly = CanTeamsWinTheLeague(points, fixtures, maxSearchNodes=0)
+assert all(flowBoundOnly[team] for team in teams if limited[team])
+assert all(limited[team] for team in teams if exact[team])
+assert sum(exact.values()) < sum(flowBoundOnly.values())
+
+print('Elimination tests passed')
@@ -0,0 +1,75 @@
+import asyncio
+import os
+from pathlib import Path
+import tempfile
+import threading
+import time
+
+from Footy import MissingTokenError
+import Footy.EventLoop as EventLoop
+from Footy.EventLoop import GetEventLoop, RunSync
+import Footy.Session as Session
+from Footy.Table import Table
+
+# Check the loop often so the test doesn't wait
+EventLoop.LOOP_CHECK_INTERVAL = 0.05
+
+async def Add(first: int, second: int) -> int:
+    await asyncio.sleep(0.01)
+    return first + second
+
+async def Stop() -> None:
+    # Something escaping the loop, as sys.exit on its thread would
+    raise SystemExit()
+
+async def Forever() -> None:
+    await asyncio.sleep(3600)
+
+# Coroutines run on the shared loop from any thread
+assert RunSync(Add(1, 2)) == 3
+results = []
+threads = [threading.Thread(target=lambda: results.append(RunSync(Add(2, 2)))) for _ in range(4)]
+for thread in threads:
+    thread.start()
+for thread in threads:
+    thread.join()
+assert results == [4] * 4
+
+# If the loop's thread dies a caller waiting on it gets an error rather than waiting forever
+loop = GetEventLoop()
+waiting: list[BaseException] = []
+def Wait() -> None:
+    try:
+        RunSync(Forever())
+    except RuntimeError as error:
+        waiting.append(error)
+waiter = threading.Thread(target=Wait)
+waiter.start()
+time.sleep(0.1)
+asyncio.run_coroutine_threadsafe(Stop(), loop)
+waiter.join(5)
+assert not waiter.is_alive() and len(waiting) == 1, waiting
+
+# The next call starts a new loop
+assert RunSync(Add(3, 4)) == 7
+assert GetEventLoop() is not loop
+
+# Without the football-data token a table can't be downloaded, which is raised straight away rather than hanging
+testDirectory = Path(__file__).resolve().parent
+with tempfile.TemporaryDirectory() as directory:
+    os.chdir(directory)
+    try:
+        Session._session = None
+        startTime = time.monotonic()
+        Table()
+    except MissingTokenError:
+        assert time.monotonic() - startTime < 5
+    else:
+        assert False, 'Expected MissingTokenError'
+    finally:
+        os.chdir(testDirectory)
+
+    # The loop is still running afterwards
+    assert RunSync(Add(5, 6)) == 11
+
+print('EventLoop tests passed')
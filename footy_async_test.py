@@ -0,0 +1,166 @@
+import asyncio
+from datetime import date
+from pathlib import Path
+import re
+import tempfile
+import threading
+import time
+
+from aiohttp import web
+
+from Footy.EventLoop import RunSync
+from Footy.Footy import Footy
+from Footy.RateLimiter import RateLimiter
+from Footy.ResponseCache import ResponseCache
+from Footy.Session import FootySession
+from Footy.Table import Table
+
+# Time the fake server takes to answer, so requests only finish quickly if they're in flight together
+RESPONSE_DELAY = 0.1
+
+# Number of match polls made at the same time
+POLL_COUNT = 300
+
+today = date.today().isoformat()
+
+def MatchData(matchId: int, homeTeam: str, awayTeam: str, competitionId: int = 2021) -> dict:
+    return {
+        'id': matchId,
+        'homeTeam': {'name': homeTeam},
+        'awayTeam': {'name': awayTeam},
+        'score': {'fullTime': {'homeTeam': None, 'awayTeam': None}},
+        'utcDate': f'{today}T14:00:00Z',
+        'stage': 'REGULAR_SEASON',
+        'group': None,
+        'status': 'SCHEDULED',
+        'lastUpdated': f'{today}T12:00:00Z',
+        'competition': {'id': competitionId, 'name': 'Premier League'},
+    }
+
+def StandingsData(teams: list[tuple[str, int, int]]) -> dict:
+    table = [
+        {'position': position, 'team': {'name': name}, 'playedGames': played, 'won': 0, 'draw': 0, 'lost': 0, 'points': points, 'goalsFor': 0, 'goalsAgainst': 0, 'goalDifference': 0}
+        for position, (name, points, played) in enumerate(teams, start=1)
+    ]
+    return {'competition': {'id': 2021, 'name': 'Premier League'}, 'standings': [{'table': table}]}
+
+class FakeApi:
+    def __init__(self) -> None:
+        # The data served, the requests seen and the most requests in flight at once
+        self.matches = {1: MatchData(1, 'Arsenal FC', 'Chelsea FC'), 2: MatchData(2, 'Everton FC', 'Fulham FC', 2001)}
+        self.standings = StandingsData([('Arsenal FC', 6, 2), ('Chelsea FC', 3, 2), ('Everton FC', 0, 2)])
+        self.requests: list[tuple[str, str]] = []
+        self.inFlight = 0
+        self.maxInFlight = 0
+
+    async def Handle(self, request: web.Request) -> web.Response:
+        self.requests.append((request.path_qs, request.headers.get('X-Auth-Token', '')))
+        self.inFlight += 1
+        self.maxInFlight = max(self.maxInFlight, self.inFlight)
+        try:
+            await asyncio.sleep(RESPONSE_DELAY)
+        finally:
+            self.inFlight -= 1
+
+        headers = {'X-Requests-Available-Minute': '100'}
+
+        # The standings are served with an ETag so they can be revalidated
+        if request.path.endswith('/standings'):
+            if request.headers.get('If-None-Match') == '"v1"':
+                return web.Response(status=304, headers=headers)
+            return web.json_response(self.standings, headers={**headers, 'ETag': '"v1"'})
+
+        if (found := re.search(r'/competitions/(\d+)/matches', request.path)) is not None:
+            competitionId = int(found.group(1))
+            matches = [match for match in self.matches.values() if match['competition']['id'] == competitionId]
+            return web.json_response({'competition': {'id': competitionId, 'name': 'Premier League'}, 'matches': matches}, headers=headers)
+
+        if (found := re.search(r'/matches/(\d+)$', request.path)) is not None:
+            if (match := self.matches.get(int(found.group(1)))) is None:
+                return web.json_response({'message': 'Not found'}, status=404, headers=headers)
+            return web.json_response({'match': match}, headers=headers)
+
+        return web.json_response({'matches': list(self.matches.values())}, headers=headers)
+
+async def StartServer(api: FakeApi) -> tuple[web.AppRunner, str]:
+    # Serve the fake API on a free local port
+    app = web.Application()
+    app.router.add_get('/{path:.*}', api.Handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = runner.addresses[0][1]
+    return runner, f'http://127.0.0.1:{port}/v2'
+
+def MakeSession(baseUrl: str, directory: str) -> FootySession:
+    # A session for the fake server with a cache of its own and a rate limiter which won't get in the way
+    session = FootySession(ResponseCache(Path(directory)), baseUrl, headers={'X-Auth-Token': 'test-token'})
+    session.rateLimiter = RateLimiter(requestsPerMinute=100000)
+    return session
+
+async def TestAsync(directory: str) -> None:
+    api = FakeApi()
+    runner, baseUrl = await StartServer(api)
+    session = MakeSession(baseUrl, directory)
+    footy = Footy(['Arsenal FC'], session=session, competitions=[2021, 2001])
+
+    # Today's matches for the followed teams, with the token sent
+    matches = await footy.GetMatchesAsync()
+    assert [match.id for match in matches] == [1], matches
+    assert all(token == 'test-token' for _, token in api.requests)
+
+    # Hundreds of polls in flight at once on this one thread
+    threadCount = threading.active_count()
+    startTime = time.perf_counter()
+    results = await asyncio.gather(*(footy.GetMatchAsync(matches[0]) for _ in range(POLL_COUNT)))
+    elapsed = time.perf_counter() - startTime
+    assert all(result is matches[0] for result in results)
+    assert threading.active_count() == threadCount
+    assert api.maxInFlight > 1, api.maxInFlight
+    assert elapsed < POLL_COUNT * RESPONSE_DELAY / 5, elapsed
+
+    # A missing match gives None rather than raising
+    assert await footy.GetMatchDataAsync(99) is None
+
+    # The table is downloaded, then served from the cache, then revalidated when asked for fresher data
+    table = await Table.GetTableAsync(session)
+    assert list(table.Entries) == ['Arsenal FC', 'Chelsea FC', 'Everton FC'], table.Entries
+    assert table.CanTeamWinTheLeague('Arsenal FC')
+    standingsRequests = sum(path.endswith('/standings') for path, _ in api.requests)
+    await Table.GetTableAsync(session)
+    assert sum(path.endswith('/standings') for path, _ in api.requests) == standingsRequests
+    assert (await Table.GetTableAsync(session, maxAge=0)).Entries == table.Entries
+    assert sum(path.endswith('/standings') for path, _ in api.requests) == standingsRequests + 1
+
+    await session.Close()
+    await runner.cleanup()
+
+def TestSync(directory: str) -> None:
+    # The blocking API runs the same coroutines on the shared event loop, so the server runs on a loop of its own
+    api = FakeApi()
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    runner, baseUrl = asyncio.run_coroutine_threadsafe(StartServer(api), loop).result()
+    session = MakeSession(baseUrl, directory)
+
+    footy = Footy(['Everton FC'], session=session, competitions=[2021, 2001])
+    matches = footy.GetMatches()
+    assert matches is not None and [match.id for match in matches] == [2], matches
+    assert footy.GetMatch(matches[0]) is matches[0]
+    assert footy.GetLiveMatchesData([2021, 2001], date.today(), date.today())['matches']
+
+    table = Table(session)
+    assert table.HasAnyTeamWonTheLeague() is None and len(table.Entries) == 3
+
+    RunSync(session.Close())
+    asyncio.run_coroutine_threadsafe(runner.cleanup(), loop).result()
+    loop.call_soon_threadsafe(loop.stop)
+
+with tempfile.TemporaryDirectory() as directory:
+    asyncio.run(TestAsync(directory))
+
+with tempfile.TemporaryDirectory() as directory:
+    TestSync(directory)
+
+print('Async Footy tests passed')
@@ -0,0 +1,149 @@
+import json
+from pathlib import Path
+import tempfile
+from typing import Optional
+from urllib.parse import parse_qs, urlparse
+
+import requests
+from requests import Response
+
+from Footy.Checkpoint import MatchCheckpoint
+from Footy.Footy import Footy
+from Footy.LivePoller import LivePoller
+from Footy.Match import Match
+from Footy.RateLimiter import Priority
+
+def MatchData(matchId: int, homeTeam: str, awayTeam: str, competitionId: int) -> dict:
+    return {
+        'id': matchId,
+        'homeTeam': {'name': homeTeam},
+        'awayTeam': {'name': awayTeam},
+        'score': {'fullTime': {'homeTeam': 0, 'awayTeam': 0}},
+        'utcDate': '2022-05-01T14:00:00Z',
+        'stage': 'REGULAR_SEASON',
+        'group': None,
+        'status': 'IN_PLAY',
+        'lastUpdated': '2022-05-01T14:10:00Z',
+        'competition': {'id': competitionId},
+    }
+
+class StubSession:
+    def __init__(self, matches: list[dict]) -> None:
+        # The latest data for each match, the URLs asked for and whether the API is up
+        self.matches = {matchData['id']: matchData for matchData in matches}
+        self.urls: list[str] = []
+        self.statusCode = requests.codes.ok
+
+    def Set(self, matchId: int, homeScore: Optional[int] = None, awayScore: Optional[int] = None, status: Optional[str] = None, lastUpdated: Optional[str] = None) -> None:
+        # Change a match as the API would
+        matchData = self.matches[matchId]
+        if homeScore is not None:
+            matchData['score']['fullTime']['homeTeam'] = homeScore
+        if awayScore is not None:
+            matchData['score']['fullTime']['awayTeam'] = awayScore
+        if status is not None:
+            matchData['status'] = status
+        if lastUpdated is not None:
+            matchData['lastUpdated'] = lastUpdated
+
+    async def Get(self, url: str, priority: Priority = Priority.NORMAL, maxAge: Optional[float] = None) -> Response:
+        self.urls.append(url)
+        parsedUrl = urlparse(url)
+
+        if parsedUrl.path.endswith('/matches'):
+            # All the matches in the competitions asked for
+            competitionIds = {int(competitionId) for competitionId in parse_qs(parsedUrl.query)['competitions'][0].split(',')}
+            data = {'matches': [matchData for matchData in self.matches.values() if matchData['competition']['id'] in competitionIds]}
+        else:
+            # A single match
+            data = {'match': self.matches[int(parsedUrl.path.rsplit('/', 1)[1])]}
+
+        response = Response()
+        response.status_code = self.statusCode
+        response.url = url
+        response._content = json.dumps(data).encode('utf-8')
+        return response
+
+def Tick() -> tuple[list[tuple[int, str, str, str]], list[str]]:
+    # Poll once, returning the changes handled and the URLs asked for
+    handled.clear()
+    session.urls.clear()
+    poller.Poll()
+    return list(handled), list(session.urls)
+
+def LiveRequests(urls: list[str]) -> list[str]:
+    return [url for url in urls if '/matches?' in url]
+
+# Two Premier League matches and one in the Champions League, and a match with no competition which is polled on its own
+matchData = [
+    MatchData(1, 'Arsenal FC', 'Burnley FC', 2021),
+    MatchData(2, 'Chelsea FC', 'Everton FC', 2021),
+    MatchData(3, 'Liverpool FC', 'FC Porto', 2001),
+    MatchData(4, 'Fulham FC', 'Leeds United FC', 2021),
+]
+session = StubSession(matchData)
+footy = Footy(['Arsenal FC'], session)
+
+handled: list[tuple[int, str, str, str]] = []
+def Handler(match: Match) -> None:
+    handled.append((match.id, match.status, str(match.homeScore), str(match.awayScore)))
+
+with tempfile.TemporaryDirectory() as directory:
+    checkpoint = MatchCheckpoint(Path(directory) / 'checkpoint.json')
+    poller = LivePoller(footy, checkpoint)
+    for data in matchData[:3]:
+        competition = data['competition']['id']
+        poller.AddMatch(Match(json.loads(json.dumps(data)), 'Test', competitionId=competition), Handler)
+    poller.AddMatch(Match(json.loads(json.dumps(matchData[3])), 'Test'), Handler)
+
+    # Adding a match again doesn't replace the one being polled
+    poller.AddMatch(Match(json.loads(json.dumps(matchData[0])), 'Test', competitionId=2021), lambda match: None)
+
+    # Nothing has changed, so no handlers are called, one request covers both competitions and the match with no competition has its own
+    changes, urls = Tick()
+    assert changes == [], changes
+    assert len(LiveRequests(urls)) == 1 and 'competitions=2001,2021' in urls[-1], urls
+    assert any(url.endswith('/matches/4') for url in urls) and len(urls) == 2, urls
+
+    # A goal and a status change are handled, an update with neither isn't
+    session.Set(1, homeScore=1)
+    session.Set(2, status='PAUSED')
+    session.Set(3, lastUpdated='2022-05-01T14:20:00Z')
+    changes, urls = Tick()
+    assert sorted(changes) == [(1, 'IN_PLAY', '1', '0'), (2, 'PAUSED', '0', '0')], changes
+    assert len(LiveRequests(urls)) == 1
+
+    # The same data again isn't a change
+    changes, urls = Tick()
+    assert changes == [] and len(LiveRequests(urls)) == 1
+
+    # A failed poll changes nothing and the matches are tried again next time
+    session.statusCode = requests.codes.internal_server_error
+    session.Set(3, awayScore=1)
+    changes, urls = Tick()
+    assert changes == [] and len(LiveRequests(urls)) == 1
+    session.statusCode = requests.codes.ok
+    changes, urls = Tick()
+    assert changes == [(3, 'IN_PLAY', '0', '1')], changes
+
+    # A finished match is handled once and then no longer polled
+    session.Set(3, status='FINISHED')
+    session.Set(4, status='FINISHED')
+    changes, urls = Tick()
+    assert sorted(changes) == [(3, 'FINISHED', '0', '1'), (4, 'FINISHED', '0', '0')], changes
+    assert poller.GetMatch(3) is None and poller.GetMatch(4) is None
+
+    # Only the Premier League is left to poll, still in a single request
+    changes, urls = Tick()
+    assert changes == [] and len(urls) == 1 and 'competitions=2021&' in urls[0], urls
+
+    # The matches still being polled were saved after the last poll
+    assert sorted(match.id for match in MatchCheckpoint(checkpoint.path).Load()) == [1, 2]
+
+    # A removed match isn't updated or handled
+    poller.RemoveMatch(2)
+    session.Set(2, homeScore=3)
+    changes, urls = Tick()
+    assert changes == [] and len(urls) == 1
+
+print('LivePoller tests passed')
@@ -0,0 +1,80 @@
+import io
+import json
+import logging
+import os
+import time
+from unittest import mock
+
+import Footy.Log as Log
+import Footy.Metrics as Metrics
+
+# Log to a buffer, with the footy subsystem turned down
+stream = io.StringIO()
+Log.ConfigureLogging({'banterbot.footy': 'WARNING'}, jsonOutput=True, stream=stream)
+bot = Log.GetLogger('bot')
+footy = Log.GetLogger('footy')
+
+def Records() -> list[dict]:
+    # Write out everything queued and decode what was written
+    Log.StopLogging()
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+# Each record is a JSON object, with any extra fields included
+bot.info('Sending %s', 'Goal!', extra={'chatCount': 3})
+footy.info('Not shown')
+footy.warning('Shown')
+try:
+    1 / 0
+except ZeroDivisionError:
+    bot.error('Failed', exc_info=True)
+
+records = Records()
+assert [record['message'] for record in records] == ['Sending Goal!', 'Shown', 'Failed'], records
+assert records[0]['logger'] == 'banterbot.bot' and records[0]['level'] == 'INFO' and records[0]['chatCount'] == 3, records[0]
+assert 'ZeroDivisionError' in records[2]['exception']
+assert 'rateLimit' not in records[0]
+
+# Repeats of a rate limited message are dropped, with the count given on the next one through
+stream = io.StringIO()
+Log.ConfigureLogging(jsonOutput=True, stream=stream)
+for index in range(100):
+    bot.info('Polling %d', index, extra=Log.Every(0.2))
+time.sleep(0.25)
+bot.info('Polling %d', 100, extra=Log.Every(0.2))
+
+records = Records()
+assert [record['message'] for record in records] == ['Polling 0', 'Polling 100'], records
+assert records[1]['suppressed'] == 99, records[1]
+
+# Logging never waits for the writer, if the queue is full records are dropped and counted
+class SlowStream(io.StringIO):
+    def write(self, text: str) -> int:
+        time.sleep(0.01)
+        return super().write(text)
+
+Log.QUEUE_SIZE = 10
+Log.ConfigureLogging(stream=SlowStream())
+droppedBefore = Metrics.logRecordsDropped._values[()]
+startTime = time.perf_counter()
+for index in range(1000):
+    bot.info('Record %d', index)
+elapsed = time.perf_counter() - startTime
+assert elapsed < 0.5, elapsed
+assert Metrics.logRecordsDropped._values[()] > droppedBefore
+Log.StopLogging()
+
+# Text output uses the old format
+stream = io.StringIO()
+Log.ConfigureLogging(jsonOutput=False, stream=stream)
+bot.warning('Plain')
+Log.StopLogging()
+assert stream.getvalue().rstrip().endswith(' - banterbot.bot - WARNING - Plain'), stream.getvalue()
+
+# Levels can be set from the environment
+with mock.patch.dict(os.environ, {Log.LEVELS_VARIABLE: 'banterbot.poller=DEBUG, root=error'}):
+    Log.ConfigureLogging(stream=io.StringIO())
+    assert Log.GetLogger('poller').isEnabledFor(logging.DEBUG)
+    assert logging.getLogger().level == logging.ERROR
+    Log.StopLogging()
+
+print('Log tests passed')
@@ -0,0 +1,55 @@
+import timeit
+import warnings
+
+from dateparser import parse
+
+from Footy.Match import Match, ParseUtcDate
+
+# Filter out a warning from dateparser
+warnings.filterwarnings('ignore', message='The localize method is no longer necessary')
+
+# Number of times to run each benchmark
+RUNS = 2000
+
+# A match in the format returned by the API
+matchData = {
+    'id': 327117,
+    'utcDate': '2022-05-01T15:30:00Z',
+    'status': 'IN_PLAY',
+    'stage': 'REGULAR_SEASON',
+    'group': 'Regular Season',
+    'homeTeam': {'id': 65, 'name': 'Manchester City FC'},
+    'awayTeam': {'id': 63, 'name': 'Fulham FC'},
+    'score': {'fullTime': {'homeTeam': 1, 'awayTeam': 0}},
+}
+
+# The same match with a date that isn't ISO-8601, forcing the dateparser fallback
+slowMatchData = matchData | {'utcDate': 'Sunday 1 May 2022 15:30 UTC'}
+
+# Check both paths give the same date
+assert ParseUtcDate(matchData['utcDate']) == ParseUtcDate(slowMatchData['utcDate'])
+assert Match(matchData, 'Premier League').matchDate == Match(slowMatchData, 'Premier League').matchDate
+
+def Benchmark(name: str, statement) -> float:
+    # Get the best time per call in microseconds
+    timePerCall = min(timeit.repeat(statement, number=RUNS, repeat=5)) / RUNS * 1e6
+    print(f'{name:40}{timePerCall:10.2f} us')
+    return timePerCall
+
+fastParse = Benchmark('ParseUtcDate', lambda: ParseUtcDate(matchData['utcDate']))
+slowParse = Benchmark('dateparser.parse', lambda: parse(matchData['utcDate']))
+print(f'Date parsing speedup: {slowParse / fastParse:.0f}x')
+
+print()
+
+fastMatch = Benchmark('Match() with ISO-8601 date', lambda: Match(matchData, 'Premier League'))
+slowMatch = Benchmark('Match() with dateparser fallback', lambda: Match(slowMatchData, 'Premier League'))
+print(f'Match construction speedup: {slowMatch / fastMatch:.0f}x')
+
+print()
+
+# Compare rebuilding a match for each poll against updating it in place, for the usual poll where nothing has changed
+liveMatch = Match(matchData, 'Premier League')
+rebuildMatch = Benchmark('Poll by rebuilding Match()', lambda: Match(matchData, 'Premier League', liveMatch))
+updateMatch = Benchmark('Poll by Match.Update()', lambda: liveMatch.Update(matchData))
+print(f'Poll update speedup: {rebuildMatch / updateMatch:.0f}x')
@@ -0,0 +1,67 @@
+import urllib.error
+import urllib.request
+
+from Footy.Metrics import Counter, Gauge, Histogram, MetricsRegistry, StartMetricsServer
+
+# Use a registry of our own so the bot's metrics aren't affected
+registry = MetricsRegistry()
+requests = Counter('test_requests_total', 'Requests made', ('endpoint',), registry=registry)
+depth = Gauge('test_queue_depth', 'Messages waiting', registry=registry)
+latency = Histogram('test_latency_seconds', 'Time taken', buckets=(0.1, 1.0), registry=registry)
+
+# Counters add up for each set of labels
+requests.Inc(endpoint='live')
+requests.Inc(2, endpoint='live')
+requests.Inc(endpoint='say "hi"')
+text = registry.Render()
+assert 'test_requests_total{endpoint="live"} 3' in text, text
+assert 'test_requests_total{endpoint="say \\"hi\\""} 1' in text, text
+
+# A gauge isn't exported until its value is known, and a function is read when rendering
+assert '\ntest_queue_depth ' not in text
+depth.Set(4)
+assert 'test_queue_depth 4' in registry.Render()
+depth.SetFunction(lambda: 7)
+assert 'test_queue_depth 7' in registry.Render()
+
+# Histogram buckets are cumulative, with the sum and count
+latency.Observe(0.05)
+latency.Observe(0.5)
+latency.Observe(5)
+text = registry.Render()
+assert 'test_latency_seconds_bucket{le="0.1"} 1' in text, text
+assert 'test_latency_seconds_bucket{le="1"} 2' in text, text
+assert 'test_latency_seconds_bucket{le="+Inf"} 3' in text, text
+assert 'test_latency_seconds_sum 5.55' in text, text
+assert 'test_latency_seconds_count 3' in text, text
+
+# The timer records a block of code
+with latency.Time():
+    pass
+assert 'test_latency_seconds_count 4' in registry.Render()
+
+# A metric can't be registered twice
+try:
+    Counter('test_requests_total', 'Again', registry=registry)
+except ValueError:
+    pass
+else:
+    assert False, 'Duplicate metric registered'
+
+# The metrics are served over HTTP
+server = StartMetricsServer(0, registry=registry)
+url = f'http://127.0.0.1:{server.server_address[1]}'
+with urllib.request.urlopen(f'{url}/metrics') as response:
+    assert response.headers['Content-Type'].startswith('text/plain')
+    assert 'test_queue_depth 7' in response.read().decode('utf-8')
+
+# Anything else isn't found
+try:
+    urllib.request.urlopen(f'{url}/other')
+except urllib.error.HTTPError as error:
+    assert error.code == 404
+else:
+    assert False, 'Unknown path served'
+
+server.shutdown()
+print('Metrics tests passed')
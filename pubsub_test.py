@@ -0,0 +1,120 @@
+from datetime import datetime, timezone
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from Messaging.Cluster import ClusterBroadcaster, SubscriptionEvent, WorkerFor
+import Messaging.PubSub as PubSub
+from Messaging.PubSub import PubSubClient, PubSubServer
+from Messaging.Subscriptions import SubscriptionStore
+
+# Reconnect quickly so the test doesn't wait
+PubSub.RECONNECT_DELAY = 0.05
+
+def WaitFor(condition, timeout: float = 5) -> bool:
+    # Poll until the condition holds or the timeout passes
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+class Recorder:
+    def __init__(self) -> None:
+        # Keep every event received, with a lock as they arrive on the connection's thread
+        self.events = []
+        self.lock = threading.Lock()
+
+    def __call__(self, *args) -> None:
+        with self.lock:
+            self.events.append(args[-1])
+
+    def OfType(self, eventType: str) -> list:
+        with self.lock:
+            return [event for event in self.events if event.get('type') == eventType]
+
+with tempfile.TemporaryDirectory() as directory:
+    path = Path(directory) / 'banterbot.sock'
+
+    # Chats are split between the workers by ID, always to the same worker
+    assert WorkerFor(7, 3) == 1 and WorkerFor(-701653934, 3) == WorkerFor(-701653934, 3)
+
+    # Events from the workers, and the workers coming and going
+    fromWorkers = Recorder()
+    connected = []
+    disconnected = []
+    server = PubSubServer(path, fromWorkers, connected.append, disconnected.append)
+    broadcaster = ClusterBroadcaster(server, 2)
+
+    # Messages for a worker which hasn't connected yet are kept for it
+    broadcaster.Broadcast([1, 2, 3, 4], 'Goal!')
+    assert broadcaster.queueDepth == 2
+    assert server.connectedWorkers == frozenset()
+
+    # Once they connect each worker gets only its own chats
+    workers = [Recorder(), Recorder()]
+    clients = [PubSubClient(index, workers[index], path) for index in range(2)]
+    assert all(client.WaitUntilConnected(5) for client in clients)
+    assert WaitFor(lambda: server.connectedWorkers == {0, 1})
+    assert WaitFor(lambda: all(worker.OfType('message') for worker in workers))
+    assert workers[0].OfType('message')[0]['chatIds'] == [2, 4], workers[0].events
+    assert workers[1].OfType('message')[0]['chatIds'] == [1, 3], workers[1].events
+    assert broadcaster.queueDepth == 0
+    assert sorted(connected) == [0, 1]
+
+    # The event time goes with the message so the worker can measure latency
+    goalTime = datetime.now(timezone.utc)
+    broadcaster.Broadcast([5], 'Goal again!', goalTime)
+    assert WaitFor(lambda: len(workers[1].OfType('message')) == 2)
+    assert datetime.fromisoformat(workers[1].OfType('message')[1]['eventTime']) == goalTime
+
+    # Events from a worker reach the leader
+    clients[0].Send({'type': 'ping', 'value': 1})
+    assert WaitFor(lambda: fromWorkers.OfType('ping'))
+    assert fromWorkers.OfType('ping') == [{'type': 'ping', 'value': 1}]
+
+    # Publish goes to every connected worker
+    server.Publish({'type': 'notice'})
+    assert WaitFor(lambda: all(worker.OfType('notice') for worker in workers))
+
+    # The leader's subscriptions are copied to a worker and kept up to date
+    leader = SubscriptionStore(Path(directory) / 'subscriptions.jsonl')
+    leader.Add(10)
+    leader.Follow(10, ('team', 'Arsenal FC'))
+    replica = SubscriptionStore(None)
+    leader.Watch(lambda record: server.SendTo(0, SubscriptionEvent(record)))
+    leader.Add(11)
+    assert WaitFor(lambda: len(workers[0].OfType('subscription')) == 3)
+    for event in workers[0].OfType('subscription'):
+        replica.Apply(event['record'])
+    assert replica.Snapshot() == {10, 11}
+    assert replica.Following(10) == {('team', 'Arsenal FC')}
+
+    # A change made on a worker is passed back to the leader, and applying the echo again changes nothing
+    changes = []
+    replica.Watch(changes.append)
+    assert replica.Follow(11, ('competition', 2021))
+    assert leader.Change(changes[-1])
+    assert not leader.Change(changes[-1])
+    replica.Apply(changes[-1])
+    assert leader.ChatsFor([], 2021) == replica.ChatsFor([], 2021) == {11}
+
+    # Clearing the copy before it's rebuilt doesn't touch the leader
+    replica.Clear()
+    assert len(replica) == 0 and len(leader) == 2
+    leader.Close()
+
+    # A worker which loses the leader reconnects to a new one and gets what was kept for it
+    server.Close(5)
+    assert WaitFor(lambda: not path.exists())
+    server = PubSubServer(path, fromWorkers)
+    server.SendTo(1, {'type': 'message', 'text': 'Back', 'chatIds': [9], 'eventTime': None})
+    assert WaitFor(lambda: any(event['text'] == 'Back' for event in workers[1].OfType('message')), 10)
+
+    for client in clients:
+        client.Close(5)
+    server.Close(5)
+
+print('PubSub tests passed')
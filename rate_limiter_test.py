@@ -0,0 +1,81 @@
+import asyncio
+import threading
+import time
+
+from Footy.RateLimiter import AVAILABLE_HEADER, RESET_HEADER, Priority, RateLimiter, RateLimitExceeded
+
+def Shed(limiter: RateLimiter, priority: Priority, maxWait: float = 0) -> bool:
+    # Try to make a request, returning whether it was shed
+    try:
+        limiter.Acquire(priority, maxWait)
+    except RateLimitExceeded:
+        return True
+    return False
+
+# A normal request has to leave the live reserve in the bucket, so with three tokens and a reserve of two only one gets through
+limiter = RateLimiter(requestsPerMinute=3, liveReserve=2)
+assert not Shed(limiter, Priority.NORMAL)
+assert Shed(limiter, Priority.NORMAL)
+assert limiter.shedCount == 1
+
+# The reserve is still there for live requests, once it's gone they're shed too
+assert not Shed(limiter, Priority.LIVE)
+assert not Shed(limiter, Priority.LIVE)
+assert Shed(limiter, Priority.LIVE)
+assert limiter.shedCount == 2
+
+# The async version sheds in the same way
+assert limiter.tokens < 1
+try:
+    asyncio.run(limiter.AcquireAsync(Priority.NORMAL, maxWait=0))
+    assert False, 'The request should have been shed'
+except RateLimitExceeded:
+    pass
+
+# With the bucket empty, a live request arriving after a normal one still goes first, a token comes every 0.1s
+limiter = RateLimiter(requestsPerMinute=600, liveReserve=0)
+limiter.tokens = 0
+order: list[str] = []
+
+def Request(priority: Priority) -> None:
+    limiter.Acquire(priority, maxWait=5)
+    order.append(priority.name)
+
+normalThread = threading.Thread(target=Request, args=(Priority.NORMAL,))
+normalThread.start()
+time.sleep(0.02)
+liveThread = threading.Thread(target=Request, args=(Priority.LIVE,))
+liveThread.start()
+normalThread.join(5)
+liveThread.join(5)
+assert order == ['LIVE', 'NORMAL'], order
+assert limiter.delayedCount == 2
+
+# The API's count of requests left replaces ours, and a bigger count than expected means a bigger quota
+limiter = RateLimiter(requestsPerMinute=10)
+limiter.Update({AVAILABLE_HEADER: '4'}, 200)
+assert limiter.quotaRemaining == 4 and limiter.tokens == 4
+limiter.Update({AVAILABLE_HEADER: '30'}, 200)
+assert limiter.capacity == 30 and limiter.tokens == 30
+
+# Headers it can't read are ignored
+limiter.Update({AVAILABLE_HEADER: 'lots'}, 200)
+assert limiter.quotaRemaining == 30
+
+# A 429 empties the bucket until the counter resets, whatever the headers say is left
+limiter.Update({AVAILABLE_HEADER: '5', RESET_HEADER: '30'}, 429)
+assert limiter.quotaRemaining == 0 and limiter.tokens == 0
+assert Shed(limiter, Priority.LIVE, maxWait=1)
+assert Shed(limiter, Priority.NORMAL, maxWait=1)
+
+# Once the reset time passes the whole quota is back
+limiter.Update({RESET_HEADER: '0.05'}, 429)
+time.sleep(0.1)
+assert not Shed(limiter, Priority.NORMAL)
+assert limiter.tokens == limiter.capacity - 1
+
+# Running out of quota without a 429 pauses requests in the same way
+limiter.Update({AVAILABLE_HEADER: '0', RESET_HEADER: '30'}, 200)
+assert Shed(limiter, Priority.LIVE, maxWait=1)
+
+print('RateLimiter tests passed')
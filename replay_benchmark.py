@@ -0,0 +1,169 @@
+import argparse
+from contextlib import redirect_stdout
+from datetime import datetime, timezone
+import io
+from pathlib import Path
+import statistics
+import time
+from typing import Iterable, Optional
+
+from banterbot import BanterBot
+from Footy.Bantz import Bantz
+import Footy.Competitions as Competitions
+from Footy.Footy import Footy
+from Footy.LivePoller import LivePoller
+from Footy.Match import Match
+from Footy.Replay import Recording, RecordingSession, ReplaySession, SynthesiseMatchday, VirtualClock, VirtualJobQueue
+from Footy.Session import GetSession
+from Footy.TeamData import allTeams, teamsToWatch
+
+# Seconds between polls of the live matches, as used by the bot
+POLL_INTERVAL = 20
+
+# Number of times the matchday is replayed for the timings
+RUNS = 5
+
+class StubStandings:
+    def __init__(self) -> None:
+        self.invalidations = 0
+
+    def Invalidate(self) -> None:
+        self.invalidations += 1
+
+class StubBroadcaster:
+    def __init__(self, replay: 'MatchdayReplay') -> None:
+        self.replay = replay
+
+    def Broadcast(self, chatIds: frozenset[int], text: str, eventTime: Optional[datetime] = None) -> None:
+        self.replay.MessageQueued(chatIds, text)
+
+class StubSubscriptions:
+    def __init__(self, chatIds: set[int]) -> None:
+        # Every chat gets the default teams
+        self.chatIds = frozenset(chatIds)
+
+    def Snapshot(self) -> frozenset[int]:
+        return self.chatIds
+
+    def ChatsFor(self, teams: Iterable[str], competitionId: Optional[int] = None) -> frozenset[int]:
+        return self.chatIds if any(team in teamsToWatch for team in teams) else frozenset()
+
+    def FollowedTeams(self) -> frozenset[str]:
+        return frozenset(teamsToWatch)
+
+    def FollowedCompetitions(self) -> frozenset[int]:
+        return frozenset()
+
+class MatchdayReplay:
+    def __init__(self, recording: Recording, chatCount: int = 10) -> None:
+        # Start the virtual clock at the real time now, the match dates in the recording are moved to match
+        self.clock = VirtualClock()
+        self.session = ReplaySession(recording, self.clock)
+        self.jobQueue = VirtualJobQueue(self.clock)
+        self.recording = recording
+
+        # Set up the bot with stand ins for Telegram and the standings, without running its constructor
+        self.bot = BanterBot.__new__(BanterBot)
+        self.bot.footy = Footy(list(teamsToWatch), session=self.session)
+        self.bot.poller = LivePoller(self.bot.footy)
+        self.bot.standings = StubStandings()
+        self.bot.broadcaster = StubBroadcaster(self)
+        self.bot.subscriptions = StubSubscriptions(set(range(chatCount)))
+        self.bot.jq = self.jobQueue
+        self.bot.firstPoll = False
+        self.bot.scheduledMatches = {}
+        self.bot.bantz = Bantz(seed=0)
+
+        # Record which change each score update is for, so the messages can be timed from when it appeared in the feed
+        self._currentMatch: Optional[Match] = None
+        self.bot.SendScoreUpdates = self._SendScoreUpdates
+
+        # Virtual seconds from each score change appearing in the feed to its message being queued,
+        # and the real seconds from the feed being read to the message being queued
+        self.feedLatencies: list[float] = []
+        self.processingLatencies: list[float] = []
+        self.messages: list[str] = []
+
+    def _SendScoreUpdates(self, match: Match) -> None:
+        self._currentMatch = match
+        try:
+            BanterBot.SendScoreUpdates(self.bot, match)
+        finally:
+            self._currentMatch = None
+
+    def MessageQueued(self, chatIds: frozenset[int], text: str) -> None:
+        self.messages.append(text)
+
+        # Only score updates have a change in the feed to time them from
+        if self._currentMatch is not None:
+            self.feedLatencies.append(self.clock.now - self.session.changedAt[self._currentMatch.id])
+            self.processingLatencies.append(time.perf_counter() - self.session.lastServedAt)
+
+    def Run(self) -> float:
+        # Get the matchday's matches, then poll every 20 seconds, as the bot does
+        self.bot.GetMatches()
+        self.jobQueue.run_repeating(self.bot.PollLiveMatches, POLL_INTERVAL, first=1)
+
+        # Run a poll past the end of the recording so the final whistle is seen, returning the real time taken
+        startTime = time.perf_counter()
+        self.jobQueue.RunUntil(self.recording.duration + 2 * POLL_INTERVAL)
+        return time.perf_counter() - startTime
+
+def Percentile(values: list[float], percentile: float) -> float:
+    return sorted(values)[min(int(len(values) * percentile), len(values) - 1)] if values else 0.0
+
+def DefaultRecording() -> Recording:
+    # A busy Saturday, every Premier League team plays, with a Champions League match later on
+    teams = list(allTeams)
+    fixtures = [(teams[index], teams[index + 1], Competitions.premierLeague, 'Premier League') for index in range(0, 20, 2)]
+    fixtures.append(('Manchester City FC', 'Real Madrid CF', Competitions.championsLeague, 'UEFA Champions League'))
+    return SynthesiseMatchday(fixtures, kickOffGap=15 * 60)
+
+def Record(path: Path, minutes: float) -> None:
+    # Poll the real API for all of the default competitions and record every change seen
+    session = RecordingSession(GetSession(), path)
+    footy = Footy(list(teamsToWatch), session=session)
+    endTime = time.monotonic() + minutes * 60
+
+    try:
+        while time.monotonic() < endTime:
+            today = datetime.now(timezone.utc).date()
+            footy.GetLiveMatchesData(Competitions.defaultCompetitions, today, today)
+            time.sleep(POLL_INTERVAL)
+    finally:
+        session.Close()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Replay a recorded matchday through the bot at accelerated time')
+    parser.add_argument('--record', type=Path, help='record the live API to this file instead of replaying')
+    parser.add_argument('--minutes', type=float, default=180, help='how long to record for')
+    parser.add_argument('--recording', type=Path, help='recording to replay, a synthesised matchday is used if not given')
+    parser.add_argument('--runs', type=int, default=RUNS, help='number of times to replay the matchday')
+    arguments = parser.parse_args()
+
+    if arguments.record is not None:
+        Record(arguments.record, arguments.minutes)
+        return
+
+    recording = Recording.Load(arguments.recording) if arguments.recording is not None else DefaultRecording()
+
+    # Replay the matchday several times, keeping the bot's logging out of the report
+    wallTimes: list[float] = []
+    for _ in range(arguments.runs):
+        replay = MatchdayReplay(recording)
+        with redirect_stdout(io.StringIO()):
+            wallTimes.append(replay.Run())
+
+    wallTime = statistics.median(wallTimes)
+    virtualTime = replay.clock.now
+    polls = int(virtualTime // POLL_INTERVAL)
+
+    print(f'Replayed {len(recording.records)} feed changes over {virtualTime / 3600:.1f} virtual hours')
+    print(f'Wall time: median {wallTime * 1000:.1f} ms, {virtualTime / wallTime:,.0f}x real time')
+    print(f'Throughput: {polls / wallTime:,.0f} polls/s, {replay.session.requestCount / wallTime:,.0f} requests/s, {len(replay.messages) / wallTime:,.0f} messages/s')
+    print(f'Messages queued: {len(replay.messages)}, of which {len(replay.feedLatencies)} score updates')
+    print(f'Feed to queue latency (virtual): median {statistics.median(replay.feedLatencies):.1f} s, p95 {Percentile(replay.feedLatencies, 0.95):.1f} s, max {max(replay.feedLatencies):.1f} s')
+    print(f'Processing latency (real): median {statistics.median(replay.processingLatencies) * 1e6:.0f} us, p95 {Percentile(replay.processingLatencies, 0.95) * 1e6:.0f} us')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+import asyncio
+import json
+import os
+from pathlib import Path
+import tempfile
+import time
+from typing import Optional
+
+from requests import Response
+from requests.structures import CaseInsensitiveDict
+
+from Footy.ResponseCache import ResponseCache
+from Footy.Session import BASE_URL, FootySession
+
+TEAMS_URL = f'{BASE_URL}/competitions/2021/teams'
+STANDINGS_URL = f'{BASE_URL}/competitions/2021/standings'
+FIXTURES_URL = f'{BASE_URL}/competitions/2021/matches'
+
+def MakeResponse(url: str, body: str, etag: Optional[str] = None) -> Response:
+    response = Response()
+    response.status_code = 200
+    response.url = url
+    response._content = body.encode('utf-8')
+    response.headers = CaseInsensitiveDict({'Content-Type': 'application/json'})
+    if etag is not None:
+        response.headers['ETag'] = etag
+    return response
+
+def Age(cache: ResponseCache, url: str, seconds: float) -> None:
+    # Make the stored entry look older than it is
+    entry = cache.Get(url)
+    entry.storedAt -= seconds
+    cache._Write(entry)
+
+class FakeClientResponse:
+    def __init__(self, status: int, headers: dict[str, str], body: bytes) -> None:
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+    async def read(self) -> bytes:
+        return self.body
+
+    async def __aenter__(self) -> 'FakeClientResponse':
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        pass
+
+class FakeClientSession:
+    def __init__(self) -> None:
+        # The headers sent with each request, the standings have the ETag "v1" and never change
+        self.requests: list[dict[str, str]] = []
+
+    def get(self, url: str, headers: dict[str, str]) -> FakeClientResponse:
+        self.requests.append(headers)
+        if headers.get('If-None-Match') == '"v1"':
+            return FakeClientResponse(304, {'ETag': '"v1"'}, b'')
+        return FakeClientResponse(200, {'ETag': '"v1"', 'Content-Type': 'application/json'}, b'{"standings": []}')
+
+with tempfile.TemporaryDirectory() as directory:
+    # Each endpoint has its own freshness, anything else, like the live match polls, isn't cached
+    cache = ResponseCache(Path(directory) / 'rules')
+    assert cache.Freshness(TEAMS_URL) == 24 * 60 * 60
+    assert cache.Freshness(STANDINGS_URL) == 5 * 60
+    assert cache.Freshness(FIXTURES_URL) == 10 * 60
+    assert cache.Freshness(f'{BASE_URL}/matches?competitions=2021,2001') is None
+    assert cache.Freshness(f'{BASE_URL}/matches/1') is None
+
+    # An entry is read back as it was stored, with the validators for a conditional request
+    cache.Put(STANDINGS_URL, MakeResponse(STANDINGS_URL, '{"standings": []}', etag='"v1"'))
+    entry = cache.Get(STANDINGS_URL)
+    assert entry is not None and entry.ToResponse().json() == {'standings': []}
+    assert entry.validatorHeaders == {'If-None-Match': '"v1"'}
+    assert cache.Get(TEAMS_URL) is None
+
+    # An entry is fresh for as long as its endpoint's rule allows
+    Age(cache, STANDINGS_URL, 4 * 60)
+    assert cache.Get(STANDINGS_URL).IsFresh(cache.Freshness(STANDINGS_URL))
+    Age(cache, STANDINGS_URL, 2 * 60)
+    assert not cache.Get(STANDINGS_URL).IsFresh(cache.Freshness(STANDINGS_URL))
+    assert cache.Get(STANDINGS_URL).IsFresh(cache.Freshness(TEAMS_URL))
+
+    # A file that can't be read is a miss
+    cache._PathForUrl(FIXTURES_URL).write_text('{"url":', encoding='utf-8')
+    assert cache.Get(FIXTURES_URL) is None
+
+    # Past the size limit the least recently used entries go first, until the cache is back under 90% of the limit
+    body = 'x' * 900
+    entrySize = len(json.dumps({'url': f'{BASE_URL}/competitions/0/matches', 'body': body, 'contentType': 'application/json', 'etag': None, 'lastModified': None, 'storedAt': time.time()}))
+    cache = ResponseCache(Path(directory) / 'lru', maxSize=int(4.2 * entrySize))
+    urls = [f'{BASE_URL}/competitions/{index}/matches' for index in range(4)]
+    for age, url in zip(range(4, 0, -1), urls):
+        cache.Put(url, MakeResponse(url, body))
+        path = cache._PathForUrl(url)
+        os.utime(path, (time.time() - age * 60, time.time() - age * 60))
+
+    # Reading the oldest entry makes it the most recently used
+    assert cache.Get(urls[0]) is not None
+
+    # Adding a fifth entry takes the cache over the limit, so the two least recently used are removed
+    newUrl = f'{BASE_URL}/competitions/4/matches'
+    cache.Put(newUrl, MakeResponse(newUrl, body))
+    assert cache.Get(urls[1]) is None and cache.Get(urls[2]) is None
+    assert all(cache.Get(url) is not None for url in (urls[0], urls[3], newUrl))
+    assert cache._size <= 0.9 * cache.maxSize
+    assert cache._size == sum(path.stat().st_size for path in cache.directory.glob('*.json'))
+
+    # A fresh cached response is served without asking the API
+    session = FootySession(ResponseCache(Path(directory) / 'session'), headers={})
+    client = FakeClientSession()
+    session._ClientSession = lambda: client
+    assert asyncio.run(session.Get(STANDINGS_URL)).json() == {'standings': []}
+    assert asyncio.run(session.Get(STANDINGS_URL)).json() == {'standings': []}
+    assert client.requests == [{}], client.requests
+
+    # Once it's stale the API is asked if it has changed, a 304 serves the stored copy and makes it fresh again
+    Age(session.responseCache, STANDINGS_URL, 6 * 60)
+    response = asyncio.run(session.Get(STANDINGS_URL))
+    assert response.status_code == 200 and response.json() == {'standings': []}
+    assert client.requests[-1] == {'If-None-Match': '"v1"'}, client.requests
+    assert session.responseCache.Get(STANDINGS_URL).IsFresh(60)
+    asyncio.run(session.Get(STANDINGS_URL))
+    assert len(client.requests) == 2
+
+    # Asking for fresher data than the rule allows revalidates too
+    asyncio.run(session.Get(STANDINGS_URL, maxAge=0))
+    assert client.requests[-1] == {'If-None-Match': '"v1"'} and len(client.requests) == 3
+
+print('ResponseCache tests passed')
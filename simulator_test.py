@@ -0,0 +1,71 @@
+import numpy as np
+
+import Footy.Simulator as SimulatorModule
+from Footy.Simulator import Simulate, Simulator
+from Footy.Table import Table, TableEntry
+
+def MakeTable(points: dict[str, int], played: int, version: int = 0) -> Table:
+    # Build a table from each team's points, in order of points
+    table = Table(download=False)
+    for position, (teamName, teamPoints) in enumerate(sorted(points.items(), key=lambda item: -item[1]), start=1):
+        table.Entries[teamName] = TableEntry(position, teamName, played, 0, 0, 0, teamPoints, 0, 0, 0)
+    table.MaxGames = 2 * (len(points) - 1)
+    table.Version = version
+    return table
+
+# Four teams with two rounds of games left, everyone plays everyone once more
+teams = ['Arsenal FC', 'Chelsea FC', 'Everton FC', 'Fulham FC']
+fixtures = [(home, away) for index, home in enumerate(teams) for away in teams[index + 1:]]
+
+# Each team finishes somewhere and each position is taken by someone
+table = MakeTable({'Arsenal FC': 10, 'Chelsea FC': 9, 'Everton FC': 8, 'Fulham FC': 7}, played=3)
+result = Simulate(table, fixtures, runs=2000, seed=1)
+assert result.runs == 2000 and result.teams == teams
+assert np.allclose(result.positionProbabilities.sum(axis=0), 1)
+assert np.allclose(result.positionProbabilities.sum(axis=1), 1)
+assert all(0 < result.Title(team) < 1 for team in teams)
+
+# The same seed gives the same result
+assert np.array_equal(Simulate(table, fixtures, runs=2000, seed=1).positionProbabilities, result.positionProbabilities)
+
+# A team which can't be caught has won the league in every season, and no other team finishes first
+table = MakeTable({'Arsenal FC': 30, 'Chelsea FC': 9, 'Everton FC': 8, 'Fulham FC': 0}, played=3)
+result = Simulate(table, fixtures, runs=2000, seed=1)
+assert result.Title('Arsenal FC') == 1.0 and result.TopFour('Arsenal FC') == 1.0
+assert all(result.Title(team) == 0.0 for team in teams[1:]) and result.Relegation('Fulham FC') == 1.0
+assert result.Title('Burnley FC') == 0.0
+
+# Count the simulations run by the simulator
+runs: list[int] = []
+def CountingSimulate(*args, **kwargs):
+    runs.append(args[0].Version)
+    return simulate(*args, **kwargs)
+simulate = SimulatorModule.Simulate
+SimulatorModule.Simulate = CountingSimulate
+
+# Without the fixtures there's nothing to simulate
+simulator = Simulator(runs=500)
+table = MakeTable({'Arsenal FC': 10, 'Chelsea FC': 9, 'Everton FC': 8, 'Fulham FC': 7}, played=3, version=1)
+assert simulator.GetResult(table) is None and runs == []
+
+# The result is reused for the same standings and worked out again when they change
+table.RemainingFixtures = fixtures
+first = simulator.GetResult(table)
+assert simulator.GetResult(table) is first and runs == [1]
+changed = MakeTable({'Arsenal FC': 10, 'Chelsea FC': 12, 'Everton FC': 8, 'Fulham FC': 7}, played=4, version=2)
+changed.RemainingFixtures = fixtures[1:]
+second = simulator.GetResult(changed)
+assert second is not first and second.version == 2 and runs == [1, 2]
+assert second.teams[0] == 'Chelsea FC'
+assert simulator.GetResult(changed) is second and runs == [1, 2]
+
+# A table that isn't from the standings cache is always simulated again
+uncached = MakeTable({'Arsenal FC': 10, 'Chelsea FC': 9, 'Everton FC': 8, 'Fulham FC': 7}, played=3)
+uncached.RemainingFixtures = fixtures
+simulator.GetResult(uncached)
+simulator.GetResult(uncached)
+assert runs == [1, 2, 0, 0]
+
+SimulatorModule.Simulate = simulate
+
+print('Simulator tests passed')
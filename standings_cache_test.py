@@ -0,0 +1,69 @@
+import asyncio
+import json
+import threading
+import time
+from typing import Optional
+
+from requests import Response
+
+from Footy.RateLimiter import Priority
+from Footy.StandingsCache import StandingsCache
+
+def WaitFor(condition, timeout: float = 5) -> bool:
+    # Poll until the condition holds or the timeout passes
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+class BlockingSession:
+    def __init__(self) -> None:
+        # The max age of each download, which waits until it's let go
+        self.maxAges: list[Optional[float]] = []
+        self.release = threading.Event()
+        self.points = 3
+
+    async def Get(self, url: str, priority: Priority = Priority.NORMAL, maxAge: Optional[float] = None) -> Response:
+        if url.endswith('/standings'):
+            self.maxAges.append(maxAge)
+            while not self.release.is_set():
+                await asyncio.sleep(0.01)
+
+        table = [{'position': 1, 'team': {'name': 'Arsenal FC'}, 'playedGames': 1, 'won': 1, 'draw': 0, 'lost': 0, 'points': self.points, 'goalsFor': 1, 'goalsAgainst': 0, 'goalDifference': 1}]
+        response = Response()
+        response.status_code = 200
+        response._content = json.dumps({'competition': {'id': 2021, 'name': 'Premier League'}, 'standings': [{'table': table}]} if url.endswith('/standings') else {'matches': []}).encode('utf-8')
+        return response
+
+session = BlockingSession()
+cache = StandingsCache(ttl=0, session=session)
+
+# The first table is downloaded straight away
+session.release.set()
+assert cache.GetTable().Version == 1
+session.release.clear()
+
+# The snapshot is out of date, so a background refresh starts which may get the standings from the cache
+cache.GetTable()
+assert WaitFor(lambda: session.maxAges == [None, None]), session.maxAges
+
+# A match finishes while it's running, so once it's done the standings are downloaded again from the API
+cache.Invalidate()
+cache.Invalidate()
+session.release.set()
+assert WaitFor(lambda: cache.version == 3), cache.version
+assert session.maxAges == [None, None, 0], session.maxAges
+
+# A refresh after the TTL while another is running doesn't need to run again
+session.release.clear()
+cache.GetTable()
+assert WaitFor(lambda: len(session.maxAges) == 4)
+cache.GetTable()
+session.release.set()
+assert WaitFor(lambda: cache.version == 4)
+time.sleep(0.1)
+assert session.maxAges == [None, None, 0, None], session.maxAges
+
+print('StandingsCache tests passed')
@@ -0,0 +1,115 @@
+import os
+from pathlib import Path
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# Directory the bot is imported from when it's launched from a temporary directory
+REPO_DIRECTORY = Path(__file__).resolve().parent
+
+# Number of times to launch the interpreter for each measurement
+RUNS = 5
+
+# Number of the slowest imports to list
+SLOWEST_IMPORTS = 15
+
+# Script which runs the bot's constructor as far as the first poll of the live matches, from a directory with
+# a dummy bot token. The updater never talks to Telegram and the API session points at a closed local port,
+# so there's no network access and no setup needed. The poll starts 50 ms after it's added rather than after its usual delay
+FIRST_POLL_SCRIPT = '''
+import os
+import threading
+import time
+
+import banterbot
+from banterbot import BanterBot
+import Footy.Log as Log
+import Footy.Metrics as Metrics
+import Footy.Session as Session
+from Footy.Session import FootySession
+import telegram.ext
+
+polled = threading.Event()
+
+class BenchmarkUpdater(telegram.ext.Updater):
+    def start_polling(self) -> None:
+        # Only the job queue runs, there are no updates to get
+        self.job_queue.start()
+
+    def idle(self) -> None:
+        # Wait for the first poll, then let the bot shut down
+        polled.wait(30)
+        self.job_queue.stop()
+
+pollLiveMatches = BanterBot.PollLiveMatches
+def PollLiveMatches(self, context) -> None:
+    pollLiveMatches(self, context)
+    if not polled.is_set():
+        print(f'polled {time.time()}', flush=True)
+        polled.set()
+
+telegram.ext.Updater = BenchmarkUpdater
+BanterBot.PollLiveMatches = PollLiveMatches
+banterbot.FIRST_POLL_DELAY = 0.05
+Metrics.METRICS_PORT = 0
+os.environ[Log.LEVELS_VARIABLE] = 'banterbot=CRITICAL'
+with open('bot_token.txt', 'w', encoding='utf8') as tokenFile:
+    tokenFile.write('123456:BENCHMARK')
+Session._session = FootySession(baseUrl='http://127.0.0.1:1/v2', headers={'X-Auth-Token': 'benchmark'})
+
+BanterBot()
+'''
+
+def TraceImports() -> dict[str, int]:
+    # Import the bot with import time tracing turned on
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import banterbot'], capture_output=True, text=True, check=True)
+
+    # Parse the cumulative time for each module from lines like 'import time:  self [us] | cumulative | imported package'
+    importTimes: dict[str, int] = {}
+    for line in result.stderr.splitlines():
+        if line.startswith('import time:') and not line.endswith('imported package'):
+            _, cumulative, module = line.removeprefix('import time:').split('|')
+            importTimes[module.strip()] = int(cumulative)
+
+    return importTimes
+
+def TimeToFirstPoll() -> float:
+    # Time from launching the interpreter to the first poll completing, the bot's files are written to a directory of its own
+    with tempfile.TemporaryDirectory() as directory:
+        environment = {**os.environ, 'PYTHONPATH': os.pathsep.join([str(REPO_DIRECTORY), os.environ.get('PYTHONPATH', '')])}
+        startTime = time.time()
+        result = subprocess.run([sys.executable, '-c', FIRST_POLL_SCRIPT], cwd=directory, env=environment, capture_output=True, text=True, check=True)
+
+    polledLines = [line for line in result.stdout.splitlines() if line.startswith('polled ')]
+    assert polledLines, result.stdout + result.stderr
+
+    return float(polledLines[0].split()[1]) - startTime
+
+def main() -> None:
+    # Trace the imports several times and take the median time for each module
+    traces = [TraceImports() for _ in range(RUNS)]
+    importTimes = {module: statistics.median(trace.get(module, 0) for trace in traces) for module in traces[0]}
+
+    print(f'Total import time for banterbot: {importTimes["banterbot"] / 1000:.1f} ms')
+    print()
+    print(f'Slowest {SLOWEST_IMPORTS} imports (cumulative):')
+
+    # Only list the top level modules, their submodules are included in the cumulative time
+    topLevel = {module: cumulative for module, cumulative in importTimes.items() if '.' not in module and module != 'banterbot'}
+    for module, cumulative in sorted(topLevel.items(), key=lambda item: item[1], reverse=True)[:SLOWEST_IMPORTS]:
+        print(f'{module:30}{cumulative / 1000:10.1f} ms')
+
+    # Check the heavy dependencies are no longer loaded at startup
+    print()
+    for module in ['telegram', 'aiohttp', 'dateparser', 'pytz', 'zoneinfo']:
+        print(f'{module:30}{"imported" if module in importTimes else "not imported"}')
+
+    # Time from launch to the first poll
+    firstPollTimes = [TimeToFirstPoll() for _ in range(RUNS)]
+    print()
+    print(f'Launch to first poll: median {statistics.median(firstPollTimes) * 1000:.1f} ms, best {min(firstPollTimes) * 1000:.1f} ms')
+
+if __name__ == '__main__':
+    main()
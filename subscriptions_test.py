@@ -0,0 +1,118 @@
+import tempfile
+import time
+from pathlib import Path
+
+from Messaging.Subscriptions import SubscriptionStore
+
+with tempfile.TemporaryDirectory() as directory:
+    path = Path(directory) / 'subscriptions.jsonl'
+
+    # Add and remove some chats
+    store = SubscriptionStore(path)
+    assert store.Add(1)
+    assert store.Add(-2)
+    assert not store.Add(1)
+    assert store.Add(3)
+    assert store.Remove(3)
+    assert not store.Remove(3)
+    assert 1 in store and -2 in store and 3 not in store
+    store.Close()
+
+    # The subscriptions survive a restart
+    store = SubscriptionStore(path)
+    assert store.Snapshot() == {1, -2}, store.Snapshot()
+
+    # A partly written record from a crash is skipped
+    store.Close()
+    with open(path, 'a', encoding='utf-8') as logFile:
+        logFile.write('{"op": "add", "ch')
+    store = SubscriptionStore(path)
+    assert store.Snapshot() == {1, -2}
+
+    # Records written after the corrupt one are kept
+    assert store.Add(5)
+    store.Close()
+    store = SubscriptionStore(path)
+    assert store.Snapshot() == {1, -2, 5}
+    assert store.Remove(5)
+    store.Close()
+
+    # The log is compacted once it has grown enough
+    store = SubscriptionStore(path, compactThreshold=10)
+    for _ in range(20):
+        store.Add(4)
+        store.Remove(4)
+    store.Close()
+    recordCount = len(path.read_text(encoding='utf-8').splitlines())
+    print(f'Log holds {recordCount} records after 40 changes')
+    assert recordCount <= 2 + 10 + 1
+    assert SubscriptionStore(path).Snapshot() == {1, -2}
+
+    # Chats following nothing get the default teams, others only what they follow
+    path.unlink()
+    store = SubscriptionStore(path, defaultTeams={'Manchester City FC'})
+    store.Add(1)
+    assert store.Follow(2, ('team', 'Arsenal FC'))
+    assert not store.Follow(2, ('team', 'Arsenal FC'))
+    assert store.Follow(3, ('competition', 2001))
+    assert store.Follow(3, ('team', 'Arsenal FC'))
+    assert store.Snapshot() == {1, 2, 3}
+    assert store.ChatsFor(('Manchester City FC', 'Chelsea FC'), 2021) == {1}
+    assert store.ChatsFor(('Manchester City FC', 'Arsenal FC'), 2021) == {1, 2, 3}
+    assert store.ChatsFor(('Chelsea FC', 'Real Madrid CF'), 2001) == {3}
+    assert store.ChatsFor(('Chelsea FC', 'Everton FC'), 2021) == set()
+    assert store.FollowedTeams() == {'Manchester City FC', 'Arsenal FC'}
+    assert store.FollowedCompetitions() == {2001}
+
+    # Unfollowing everything goes back to the default teams, and removing a chat drops its follows
+    assert store.Unfollow(2, ('team', 'Arsenal FC'))
+    assert not store.Unfollow(2, ('team', 'Arsenal FC'))
+    assert store.ChatsFor(('Manchester City FC',)) == {1, 2}
+    assert store.Remove(3)
+    assert store.FollowedTeams() == {'Manchester City FC'} and store.FollowedCompetitions() == set()
+    assert store.Follow(4, ('team', 'Chelsea FC'))
+    store.Close()
+
+    # Follows survive a restart and compaction
+    store = SubscriptionStore(path, compactThreshold=0, defaultTeams={'Manchester City FC'})
+    assert store.Following(4) == {('team', 'Chelsea FC')} and store.Following(1) == set()
+    assert store.ChatsFor(('Chelsea FC',)) == {4}
+    assert store.ChatsFor(('Manchester City FC',)) == {1, 2}
+    store.Close()
+    assert len(path.read_text(encoding='utf-8').splitlines()) == 4
+
+    # Finding the chats for a match only looks at its followers, however many chats there are
+    store = SubscriptionStore(path, defaultTeams=set())
+    for chatId in range(10000, 30000):
+        store.Follow(chatId, ('team', 'Everton FC' if chatId % 100 else 'Arsenal FC'))
+    startTime = time.perf_counter()
+    for _ in range(1000):
+        chatIds = store.ChatsFor(('Arsenal FC', 'Brentford FC'), 2021)
+    lookupTime = (time.perf_counter() - startTime) * 1000
+    print(f'ChatsFor: {lookupTime:.3f} us per match for {len(chatIds)} of {len(store)} chats')
+    assert len(chatIds) == 200
+    store.Close()
+    path.unlink()
+    store = SubscriptionStore(path)
+    store.Add(1)
+    store.Add(-2)
+    store.Close()
+
+    # Writes don't wait on the disk
+    store = SubscriptionStore(path)
+    startTime = time.perf_counter()
+    for chatId in range(10000, 20000):
+        store.Add(chatId)
+    addTime = (time.perf_counter() - startTime) / 10000 * 1e6
+    store.Close()
+    print(f'Add: {addTime:.2f} us per chat')
+
+    # Loading is quick even with lots of chats
+    startTime = time.perf_counter()
+    store = SubscriptionStore(path)
+    loadTime = (time.perf_counter() - startTime) * 1000
+    print(f'Loaded {len(store)} chats in {loadTime:.1f} ms')
+    assert len(store) == 10002
+    store.Close()
+
+print('Subscription tests passed')
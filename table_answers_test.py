@@ -0,0 +1,120 @@
+from typing import Optional
+
+from Footy.Table import Table, TableEntry
+
+def MakeTable(rows: list[tuple[str, int, int]], canWinLeague: Optional[dict[str, bool]] = None) -> Table:
+    # Build a table from each team's games played and points, in table order, without downloading anything
+    table = Table(download=False)
+    for position, (teamName, played, points) in enumerate(rows, start=1):
+        table.Entries[teamName] = TableEntry(position, teamName, played, 0, 0, 0, points, 0, 0, 0)
+    table.MaxGames = 2 * (len(rows) - 1)
+    table._canWinLeague = canWinLeague
+    table._BuildAnswers()
+    return table
+
+def OldCanTeamABeatTeamB(table: Table, teamA: str, teamB: str) -> bool:
+    # The answer worked out a pair at a time, as it was before the answers were built once for the table
+    if teamA not in table.Entries or teamB not in table.Entries:
+        return False
+
+    teamAEntry = table.Entries[teamA]
+    teamBEntry = table.Entries[teamB]
+    if teamAEntry.Played == table.MaxGames and teamBEntry.Played == table.MaxGames:
+        return teamAEntry.Position < teamBEntry.Position
+
+    return teamAEntry.Points + table.PointsForWin * (table.MaxGames - teamAEntry.Played) >= teamBEntry.Points
+
+def OldCanTeamWinTheLeague(table: Table, team: str) -> bool:
+    if table._canWinLeague is not None:
+        return table._canWinLeague.get(team, False)
+    return all(OldCanTeamABeatTeamB(table, team, otherTeam) for otherTeam in table.Entries if otherTeam != team)
+
+def OldHasTeamWonTheLeague(table: Table, team: str) -> bool:
+    if table._canWinLeague is not None:
+        return team in table._canWinLeague and not any(canWin for otherTeam, canWin in table._canWinLeague.items() if otherTeam != team)
+    # The old code raised a KeyError for a team not in the table, it hasn't won the league
+    return team in table.Entries and not any(OldCanTeamABeatTeamB(table, otherTeam, team) for otherTeam in table.Entries if otherTeam != team)
+
+def CheckAgainstOldAnswers(table: Table) -> None:
+    # Every pair, including each team against itself and a team not in the table, gives the same answer as before
+    teams = list(table.Entries) + ['Burnley FC']
+    for teamA in teams:
+        for teamB in teams:
+            assert table.CanTeamABeatTeamB(teamA, teamB) == OldCanTeamABeatTeamB(table, teamA, teamB), (teamA, teamB)
+
+        assert table.CanTeamWinTheLeague(teamA) == OldCanTeamWinTheLeague(table, teamA), teamA
+        assert table.HasTeamWonTheLeague(teamA) == OldHasTeamWonTheLeague(table, teamA), teamA
+
+    winners = [team for team in table.Entries if OldHasTeamWonTheLeague(table, team)]
+    assert table.HasAnyTeamWonTheLeague() == (winners[0] if winners else None)
+
+# Six teams with ten games each, two left to play for most of them
+# Arsenal and Chelsea are level, Everton can only just catch Arsenal, Fulham and Leeds are out of contention,
+# and Leeds and Wolves have finished their seasons
+midSeason = MakeTable([
+    ('Arsenal FC', 8, 20),
+    ('Chelsea FC', 8, 20),
+    ('Everton FC', 8, 14),
+    ('Fulham FC', 8, 10),
+    ('Leeds United FC', 10, 9),
+    ('Wolverhampton Wanderers FC', 10, 5),
+])
+CheckAgainstOldAnswers(midSeason)
+
+# Check the matrix itself, a team can always match its own points, except once its season is over
+assert midSeason.CanTeamABeatTeamB('Arsenal FC', 'Arsenal FC')
+assert not midSeason.CanTeamABeatTeamB('Leeds United FC', 'Leeds United FC')
+assert midSeason.CanTeamABeatTeamB('Everton FC', 'Arsenal FC')
+assert not midSeason.CanTeamABeatTeamB('Fulham FC', 'Arsenal FC')
+assert midSeason.CanTeamABeatTeamB('Leeds United FC', 'Wolverhampton Wanderers FC')
+assert not midSeason.CanTeamABeatTeamB('Wolverhampton Wanderers FC', 'Leeds United FC')
+assert midSeason.CanTeamWinTheLeague('Everton FC') and not midSeason.CanTeamWinTheLeague('Fulham FC')
+assert midSeason.HasAnyTeamWonTheLeague() is None
+
+# One team far enough ahead to have won the league, the rest out of contention
+decided = MakeTable([
+    ('Arsenal FC', 5, 15),
+    ('Chelsea FC', 5, 9),
+    ('Everton FC', 6, 6),
+    ('Fulham FC', 6, 3),
+])
+CheckAgainstOldAnswers(decided)
+assert decided.HasAnyTeamWonTheLeague() == 'Arsenal FC'
+
+# The season over for everyone, positions are final even for teams level on points
+finished = MakeTable([
+    ('Arsenal FC', 6, 12),
+    ('Chelsea FC', 6, 12),
+    ('Everton FC', 6, 6),
+    ('Fulham FC', 6, 3),
+])
+CheckAgainstOldAnswers(finished)
+assert not finished.CanTeamABeatTeamB('Chelsea FC', 'Arsenal FC')
+assert finished.HasAnyTeamWonTheLeague() == 'Arsenal FC'
+
+# With the remaining fixtures known, whether a team can still win comes from them, the pairs don't change
+withFixtures = MakeTable([
+    ('Arsenal FC', 8, 20),
+    ('Chelsea FC', 8, 20),
+    ('Everton FC', 8, 14),
+    ('Fulham FC', 8, 10),
+    ('Leeds United FC', 10, 9),
+    ('Wolverhampton Wanderers FC', 10, 5),
+], canWinLeague={'Arsenal FC': True, 'Chelsea FC': True, 'Everton FC': False})
+CheckAgainstOldAnswers(withFixtures)
+assert not withFixtures.CanTeamWinTheLeague('Everton FC') and withFixtures.CanTeamABeatTeamB('Everton FC', 'Arsenal FC')
+
+onlyOneCanWin = MakeTable([
+    ('Arsenal FC', 2, 6),
+    ('Chelsea FC', 2, 6),
+    ('Everton FC', 2, 3),
+], canWinLeague={'Arsenal FC': True, 'Chelsea FC': False, 'Everton FC': False})
+CheckAgainstOldAnswers(onlyOneCanWin)
+assert onlyOneCanWin.HasAnyTeamWonTheLeague() == 'Arsenal FC'
+
+# An empty table has no answers
+empty = MakeTable([])
+assert not empty.CanTeamABeatTeamB('Arsenal FC', 'Chelsea FC')
+assert not empty.CanTeamWinTheLeague('Arsenal FC') and empty.HasAnyTeamWonTheLeague() is None
+
+print('Table answers tests passed')
@@ -0,0 +1,35 @@
+from Footy.TeamAliases import TeamMention, teamAliasIndex
+
+# Each question with the teams it should find
+questions = {
+    'Can Spurs beat Man Utd?': ['Tottenham Hotspur FC', 'Manchester United FC'],
+    'can man city still win the league': ['Manchester City FC'],
+    'Can Brighton & Hove Albion beat Arsenal': ['Brighton & Hove Albion FC', 'Arsenal FC'],
+    'can mancity beat nottm forest': ['Manchester City FC', 'Nottingham Forest FC'],
+    'can West Ham United FC beat the reds': ['West Ham United FC', 'Liverpool FC'],
+    'can AFC Bournemouth beat wolves': ['AFC Bournemouth', 'Wolverhampton Wanderers FC'],
+    # Typos within one edit are matched
+    'can arsneal beat tottenahm': ['Arsenal FC', 'Tottenham Hotspur FC'],
+    'can forrest still win the league': ['Nottingham Forest FC'],
+    # Short words and ordinary words aren't matched
+    'can xyz beat the league': [],
+    'will city finish above leeds': ['Manchester City FC', 'Leeds United FC'],
+}
+
+for question, expectedTeams in questions.items():
+    teams = [mention.team for mention in teamAliasIndex.FindTeams(question.lower().replace('?', '').split())]
+    print(f'{question:45} {teams}')
+    assert teams == expectedTeams, (question, teams)
+
+# The parsed request can be matched against directly
+match teamAliasIndex.Parse('Spurs still beat Chelsea?'):
+    case [TeamMention(team=teamA), 'still', 'beat', TeamMention(team=teamB)]:
+        assert (teamA, teamB) == ('Tottenham Hotspur FC', 'Chelsea FC')
+    case request:
+        raise AssertionError(request)
+
+# Resolve only accepts text which is exactly one team
+assert teamAliasIndex.Resolve('Man Utd') == 'Manchester United FC'
+assert teamAliasIndex.Resolve('Man Utd beat') is None
+
+print('Team alias tests passed')
@@ -0,0 +1,189 @@
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import logging
+import statistics
+import threading
+import time
+from typing import Any, Optional
+import urllib.error
+import urllib.request
+
+from requests import Response
+from telegram.ext import CommandHandler, Updater
+
+from banterbot import BanterBot
+import Footy.Log as Log
+from Footy.RateLimiter import Priority
+from Footy.Table import Table
+from Footy.TeamData import allTeams
+from Messaging.Webhook import SECRET_HEADER, WORKER_COUNT, NewSecretToken, WebhookServer
+
+# Number of updates in the burst and how many are posted at the same time
+UPDATE_COUNT = 500
+CONCURRENCY = 32
+
+# Time in seconds before an update Telegram was told to retry is posted again
+RETRY_DELAY = 0.05
+
+# The commands in the burst, answered from the standings
+COMMANDS = ['/table', '/can arsenal win the league', '/can spurs beat chelsea', '/can leeds still beat city']
+
+class StaticSession:
+    def __init__(self) -> None:
+        # A finished season with every team on a different number of points, so the table is built without the API
+        teams = list(allTeams)[:20]
+        table = [
+            {'position': position, 'team': {'name': name}, 'playedGames': 38, 'won': 0, 'draw': 0, 'lost': 0, 'points': 100 - 4 * position, 'goalsFor': 0, 'goalsAgainst': 0, 'goalDifference': 0}
+            for position, name in enumerate(teams, start=1)
+        ]
+        self.standings = {'competition': {'id': 2021, 'name': 'Premier League'}, 'standings': [{'table': table}]}
+
+    async def Get(self, url: str, priority: Priority = Priority.NORMAL, maxAge: Optional[float] = None) -> Response:
+        response = Response()
+        response.status_code = 200
+        response._content = json.dumps(self.standings if url.endswith('/standings') else {'matches': []}).encode('utf-8')
+        return response
+
+class StubStandings:
+    def __init__(self, table: Table) -> None:
+        self.table = table
+
+    def GetTable(self) -> Table:
+        return self.table
+
+class FakeBotApi:
+    def __init__(self) -> None:
+        # The time each chat got its reply
+        self.repliedAt: dict[int, float] = {}
+        self.lock = threading.Lock()
+
+        api = self
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            # Send each reply straight away, as the headers and body are written separately
+            disable_nagle_algorithm = True
+
+            def do_POST(self) -> None:
+                length = int(self.headers.get('Content-Length', 0))
+                request = json.loads(self.rfile.read(length)) if length else {}
+
+                if self.path.endswith('/getMe'):
+                    # The bot's own details, used to check commands addressed to it
+                    result: dict[str, Any] = {'id': 123456, 'is_bot': True, 'first_name': 'Banter', 'username': 'banter_load_test_bot'}
+                else:
+                    # Record the reply, answering as Telegram does with the message sent
+                    chatId = int(request['chat_id'])
+                    with api.lock:
+                        api.repliedAt.setdefault(chatId, time.perf_counter())
+                    result = {'message_id': 1, 'date': int(time.time()), 'chat': {'id': chatId, 'type': 'group', 'title': 'Load test'}, 'text': request.get('text', '')}
+
+                body = json.dumps({'ok': True, 'result': result}).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args: object) -> None:
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+def MakeUpdate(updateId: int, chatId: int, text: str) -> dict[str, Any]:
+    # A command sent to a group, as Telegram would post it
+    command = text.split()[0]
+    return {
+        'update_id': updateId,
+        'message': {
+            'message_id': updateId,
+            'date': int(time.time()),
+            'chat': {'id': chatId, 'type': 'group', 'title': 'Load test'},
+            'from': {'id': 1, 'is_bot': False, 'first_name': 'Load', 'last_name': 'Test'},
+            'text': text,
+            'entities': [{'type': 'bot_command', 'offset': 0, 'length': len(command)}],
+        },
+    }
+
+def Post(url: str, update: dict[str, Any], secretToken: str) -> int:
+    # Post an update, returning the status code
+    request = urllib.request.Request(url, json.dumps(update).encode('utf-8'), {'Content-Type': 'application/json', SECRET_HEADER: secretToken})
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status
+    except urllib.error.HTTPError as error:
+        return error.code
+
+def Percentile(values: list[float], percentile: float) -> float:
+    return sorted(values)[min(int(len(values) * percentile), len(values) - 1)] if values else 0.0
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Post a burst of commands to a local webhook and time the replies')
+    parser.add_argument('--updates', type=int, default=UPDATE_COUNT, help='number of updates in the burst')
+    parser.add_argument('--concurrency', type=int, default=CONCURRENCY, help='number of updates posted at the same time')
+    parser.add_argument('--workers', type=int, default=WORKER_COUNT, help='number of webhook workers running the handlers')
+    arguments = parser.parse_args()
+
+    # Keep the bot's logging out of the report, the rejected updates and retries are expected
+    Log.ConfigureLogging({'banterbot': logging.ERROR}, jsonOutput=False)
+
+    # A bot talking to a fake Bot API, with enough connections for every worker to reply at once
+    botApi = FakeBotApi()
+    updater = Updater(bot=None, token='123456:LOADTEST', base_url=f'http://127.0.0.1:{botApi.server.server_port}/bot', request_kwargs={'con_pool_size': arguments.workers + 4})
+
+    # The bot's own handlers for the commands, answering from a fixed table
+    bot = BanterBot.__new__(BanterBot)
+    bot.updater = updater
+    bot.dp = updater.dispatcher
+    bot.standings = StubStandings(Table(StaticSession()))
+    bot.dp.add_handler(CommandHandler('table', bot.GetTable))
+    bot.dp.add_handler(CommandHandler('can', bot.can))
+
+    secretToken = NewSecretToken()
+    webhook = WebhookServer(bot._ProcessUpdate, secretToken, port=0, path='/telegram', workerCount=arguments.workers)
+    url = f'http://127.0.0.1:{webhook.port}/telegram'
+
+    # Updates without the secret or which aren't updates are turned away
+    assert Post(url, MakeUpdate(0, 0, '/table'), 'wrong') == 403
+    assert Post(url, {'message': 'no update ID'}, secretToken) == 400
+
+    # Post the burst, retrying anything Telegram would be asked to send again
+    postedAt: dict[int, float] = {}
+    retries = 0
+    retriesLock = threading.Lock()
+
+    def Send(index: int) -> None:
+        nonlocal retries
+        chatId = index + 1
+        update = MakeUpdate(index + 1, chatId, COMMANDS[index % len(COMMANDS)])
+        postedAt[chatId] = time.perf_counter()
+        while Post(url, update, secretToken) == 503:
+            with retriesLock:
+                retries += 1
+            time.sleep(RETRY_DELAY)
+
+    startTime = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=arguments.concurrency) as executor:
+        list(executor.map(Send, range(arguments.updates)))
+
+    # Wait for every reply
+    deadline = time.monotonic() + 60
+    while len(botApi.repliedAt) < arguments.updates and time.monotonic() < deadline:
+        time.sleep(0.01)
+    wallTime = time.perf_counter() - startTime
+
+    webhook.Stop(10)
+    Log.StopLogging()
+    assert len(botApi.repliedAt) == arguments.updates, f'Only {len(botApi.repliedAt)} of {arguments.updates} commands were answered'
+
+    latencies = [botApi.repliedAt[chatId] - postedAt[chatId] for chatId in postedAt]
+    print(f'Answered {arguments.updates} commands in {wallTime:.2f} s, {arguments.updates / wallTime:,.0f} commands/s, with {arguments.workers} workers and {arguments.concurrency} posting at once')
+    print(f'Updates Telegram would have been asked to retry: {retries}')
+    print(f'Command response latency: median {statistics.median(latencies) * 1000:.1f} ms, p95 {Percentile(latencies, 0.95) * 1000:.1f} ms, max {max(latencies) * 1000:.1f} ms')
+
+if __name__ == '__main__':
+    main()